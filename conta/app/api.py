@@ -0,0 +1,257 @@
+"""
+API HTTP sobre los servicios de contabilidad.
+
+    uvicorn conta.app.api:app        (make api)
+
+- Cada petición usa su propia sesión, sacada del pool del engine (db.py).
+- Al arrancar se crean, si faltan, los índices de búsqueda (busqueda.py).
+- Si está instalado el extra `async` (aiosqlite), las lecturas usan el motor
+  asíncrono y no ocupan un hilo por petición; si no, o con
+  CONTA_ASYNC_DB=0, se ejecutan en el pool de hilos con el motor síncrono.
+- Los listados se paginan por clave (fecha, id): la respuesta trae `next`,
+  que se pasa como `after` para pedir la página siguiente.
+- Los endpoints agregados (IVA, IRPF, totales) devuelven ETag y responden
+  304 a un If-None-Match que coincida.
+- Los importes se serializan como cadenas ("1234.50") para no perder
+  precisión por pasar por float.
+"""
+
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import date
+from decimal import Decimal
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+
+from .db import async_available, get_async_session, get_session
+from .enums import Actividad
+from .models import FacturaEmitida, GastoDeducible
+from .schemas import FacturaIn, GastoIn
+from .services.busqueda import asegurar_indices
+from .services.consultas import (
+    despues_de,
+    filtrar_facturas,
+    filtrar_gastos,
+    totales_facturas,
+    totales_facturas_async,
+    totales_gastos,
+    totales_gastos_async,
+)
+from .services.importes import porcentaje
+from .services.irpf import irpf_snapshot_acumulado, irpf_snapshot_acumulado_async
+from .services.iva import iva_trimestre, iva_trimestre_async
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # Los índices de búsqueda (y las migraciones, en la primera conexión) se
+    # preparan al arrancar y en un hilo: creados en la primera petición con
+    # `texto`, bloquearían el bucle de eventos y todas las demás peticiones
+    await run_in_threadpool(asegurar_indices)
+    yield
+
+
+app = FastAPI(title="Conta", description="Contabilidad personal para autónomos", lifespan=_lifespan)
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+ASYNC_DB = os.getenv("CONTA_ASYNC_DB", "1") != "0" and async_available()
+
+
+def session():
+    """Sesión por petición; se cierra (y devuelve la conexión al pool) al terminar."""
+    with get_session() as s:
+        yield s
+
+
+async def _leer(async_fn, sync_fn, *args, **kwargs):
+    if ASYNC_DB:
+        return await async_fn(*args, **kwargs)
+    return await run_in_threadpool(sync_fn, *args, **kwargs)
+
+
+def _filas_sync(stmt) -> list:
+    with get_session() as s:
+        return list(s.exec(stmt).all())
+
+
+async def _filas_async(stmt) -> list:
+    async with get_async_session() as s:
+        return list((await s.exec(stmt)).all())
+
+
+def _periodo(periodo: str) -> tuple[int, int]:
+    try:
+        year = int(periodo[:4])
+        q = int(periodo[-1])
+        if len(periodo) != 6 or periodo[4].upper() != "Q" or q not in (1, 2, 3, 4):
+            raise ValueError
+    except ValueError:
+        raise HTTPException(422, "Periodo inválido. Usa formato YYYYQ#, ej: 2025Q4")
+    return year, q
+
+
+def _cursor(after: str | None) -> tuple[date, int] | None:
+    if after is None:
+        return None
+    try:
+        fecha, id_ = after.split(",")
+        return date.fromisoformat(fecha), int(id_)
+    except ValueError:
+        raise HTTPException(422, "Cursor inválido. Usa el valor `next` de la página anterior")
+
+
+def _dump(m) -> dict:
+    # SQLite devuelve los Numeric con 10 decimales; todos son importes o
+    # porcentajes de 2 decimales
+    return {k: f"{v:.2f}" if isinstance(v, Decimal) else v for k, v in m.model_dump().items()}
+
+
+def _pagina(items: list, limit: int, fecha_attr: str) -> dict:
+    last = items[-1] if len(items) == limit else None
+    return {
+        "items": [_dump(i) for i in items],
+        "next": f"{getattr(last, fecha_attr).isoformat()},{last.id}" if last else None,
+    }
+
+
+def _con_etag(request: Request, data: dict) -> Response:
+    """Respuesta JSON con ETag fuerte (hash del cuerpo) y soporte de 304."""
+    body = json.dumps(data, default=str, ensure_ascii=False, sort_keys=True).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    # no-cache: el cliente puede guardar la respuesta pero debe revalidarla
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    candidatos = {
+        t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")
+    }
+    if etag in candidatos or "*" in candidatos:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# Agregados
+# ---------------------------------------------------------------------------
+
+
+@app.get("/iva/{periodo}")
+async def get_iva(periodo: str, request: Request):
+    """IVA devengado y deducible de un trimestre (Modelo 303)."""
+    data = await _leer(iva_trimestre_async, iva_trimestre, *_periodo(periodo))
+    return _con_etag(request, data)
+
+
+@app.get("/irpf/{periodo}")
+async def get_irpf(periodo: str, request: Request, solo_programacion: bool = False):
+    """Snapshot acumulado del Modelo 130 hasta el final del trimestre."""
+    year, q = _periodo(periodo)
+    data = await _leer(
+        irpf_snapshot_acumulado_async, irpf_snapshot_acumulado, year, q, solo_programacion
+    )
+    return _con_etag(request, data)
+
+
+@app.get("/facturas/totales")
+async def get_totales_facturas(
+    request: Request,
+    year: int | None = None,
+    quarter: int | None = Query(None, ge=1, le=4),
+    cliente: str | None = None,
+    actividad: Actividad | None = None,
+    texto: str | None = None,
+):
+    data = await _leer(
+        totales_facturas_async,
+        totales_facturas,
+        year=year, quarter=quarter, cliente=cliente, actividad=actividad, texto=texto,
+    )
+    return _con_etag(request, data)
+
+
+@app.get("/gastos/totales")
+async def get_totales_gastos(
+    request: Request,
+    year: int | None = None,
+    quarter: int | None = Query(None, ge=1, le=4),
+    proveedor: str | None = None,
+):
+    data = await _leer(
+        totales_gastos_async, totales_gastos, year=year, quarter=quarter, proveedor=proveedor
+    )
+    return _con_etag(request, data)
+
+
+# ---------------------------------------------------------------------------
+# Facturas
+# ---------------------------------------------------------------------------
+
+
+@app.get("/facturas")
+async def list_facturas(
+    year: int | None = None,
+    quarter: int | None = Query(None, ge=1, le=4),
+    cliente: str | None = None,
+    actividad: Actividad | None = None,
+    texto: str | None = None,
+    after: str | None = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Facturas emitidas por fecha de emisión, paginadas por clave."""
+    stmt = filtrar_facturas(
+        select(FacturaEmitida),
+        year=year, quarter=quarter, cliente=cliente, actividad=actividad, texto=texto,
+    )
+    stmt = despues_de(stmt, FacturaEmitida.fecha_emision, FacturaEmitida.id, _cursor(after))
+    items = await _leer(_filas_async, _filas_sync, stmt.limit(limit))
+    return _pagina(items, limit, "fecha_emision")
+
+
+@app.post("/facturas", status_code=201)
+def create_factura(f: FacturaIn, s: Session = Depends(session)):
+    """Añade una factura emitida (mismo cálculo que `conta emite`)."""
+    if s.exec(select(FacturaEmitida.id).where(FacturaEmitida.numero == f.numero)).first():
+        raise HTTPException(409, "Ya existe una factura con ese número")
+    m = FacturaEmitida(
+        **f.model_dump(),
+        cuota_iva=porcentaje(f.base_eur, f.tipo_iva),
+        ret_irpf_importe=porcentaje(f.base_eur, f.ret_irpf_pct),
+    )
+    s.add(m)
+    s.commit()
+    s.refresh(m)
+    return _dump(m)
+
+
+# ---------------------------------------------------------------------------
+# Gastos
+# ---------------------------------------------------------------------------
+
+
+@app.get("/gastos")
+async def list_gastos(
+    year: int | None = None,
+    quarter: int | None = Query(None, ge=1, le=4),
+    proveedor: str | None = None,
+    after: str | None = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Gastos deducibles por fecha, paginados por clave."""
+    stmt = filtrar_gastos(select(GastoDeducible), year=year, quarter=quarter, proveedor=proveedor)
+    stmt = despues_de(stmt, GastoDeducible.fecha, GastoDeducible.id, _cursor(after))
+    items = await _leer(_filas_async, _filas_sync, stmt.limit(limit))
+    return _pagina(items, limit, "fecha")
+
+
+@app.post("/gastos", status_code=201)
+def create_gasto(g: GastoIn, s: Session = Depends(session)):
+    """Añade un gasto deducible (mismo cálculo que `conta gasto`)."""
+    m = GastoDeducible(**g.model_dump(), cuota_iva=porcentaje(g.base_eur, g.tipo_iva))
+    s.add(m)
+    s.commit()
+    s.refresh(m)
+    return _dump(m)
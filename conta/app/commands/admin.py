@@ -0,0 +1,174 @@
+import typer
+from rich import print
+from datetime import datetime
+from pathlib import Path
+import shutil
+
+
+app = typer.Typer()
+
+
+@app.command()
+def init():
+    """Crea la base de datos y tablas."""
+    from ..db import init_db
+    init_db(); print("[green]Base de datos inicializada[/green]")
+
+
+@app.command("backup-db")
+def backup_db(
+    dest_dir: str = typer.Option(
+        str(Path.home() / "repos/conta/backups"),
+        "--dir",
+        help="Carpeta destino del backup (por defecto: ~/repos/conta/backups)",
+    ),
+):
+    """Crea una copia de seguridad de la base de datos SQLite."""
+    from ..db import DB_PATH
+    src = DB_PATH
+    src_path = Path(src)
+
+    if not src_path.exists():
+        typer.secho(f"No se encontró la base de datos en {src}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    dest_dir_path = Path(dest_dir)
+    dest_dir_path.mkdir(parents=True, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y-%m-%d-%H%M")
+    dest_path = dest_dir_path / f"conta-{timestamp}.db"
+
+    shutil.copy2(src_path, dest_path)
+    typer.secho(f"Backup creado en {dest_path}", fg=typer.colors.GREEN)
+
+
+@app.command("tui")
+def launch_tui() -> None:
+    """Lanza la interfaz TUI interactiva (Textual)."""
+    from ..tui.app import run
+    run()
+
+
+@app.command("export")
+def exportar_pdf(
+    year: int = typer.Argument(..., help="Año a exportar, ej. 2025"),
+    output: str | None = typer.Option(None, "--output", "-o", help="Ruta de salida (opcional, por defecto reports/conta_export_YYYY.pdf)"),
+):
+    """Genera un informe anual en PDF con facturas, gastos, cuotas y resumen fiscal."""
+    from pathlib import Path
+    from ..services.exportar import generar_pdf
+
+    output_path = Path(output) if output else None
+    try:
+        result_path = generar_pdf(year, output_path)
+        print(f"[green]✓ PDF generado:[/green] {result_path}")
+    except Exception as e:
+        print(f"[red]✗ Error generando PDF:[/red] {e}")
+        raise typer.Exit(code=1)
+
+
+@app.command("serve")
+def serve(
+    socket: str = typer.Option(
+        ...,
+        "--socket",
+        envvar="CONTA_SOCKET",
+        help="Ruta del socket Unix (por defecto: $CONTA_SOCKET)",
+    ),
+):
+    """Arranca un servidor persistente: con CONTA_SOCKET definido, `conta` le reenvía los comandos."""
+    from ..daemon import serve as run_server
+
+    def ready(db_path: str) -> None:
+        print(f"[green]Servidor escuchando en {socket}[/green] (base de datos {db_path}). Ctrl+C para parar.")
+
+    try:
+        run_server(socket, on_ready=ready)
+    except RuntimeError as e:
+        typer.secho(str(e), fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+
+@app.command("recalc")
+def recalc(
+    ctx: typer.Context,
+    year: int | None = typer.Option(None, "--year", help="Solo las filas de este año"),
+    todo: bool = typer.Option(False, "--all", help="Todas las filas"),
+    tabla: list[str] = typer.Option(
+        ["facturas"], "--tabla", help="facturas y/o gastos (repetible; por defecto solo facturas)"
+    ),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Solo muestra las diferencias, no corrige nada"),
+    max_filas: int = typer.Option(50, "--max", help="Diferencias a mostrar como máximo"),
+):
+    """
+    Recalcula cuota de IVA y retención IRPF desde base y porcentaje y corrige las que no cuadran.
+    Los gastos solo con --tabla gastos, y nunca los de cuota introducida a mano (--cuota-iva).
+    """
+    from dataclasses import asdict
+    from rich.table import Table
+    from ..services.recalculo import RECALCULOS, aplicar, diferencias
+    from .common import Salida, emitir, salida
+
+    if (year is None) == (not todo):
+        typer.secho("Indica --year YYYY o --all", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    invalidas = [t for t in tabla if t not in RECALCULOS]
+    if invalidas:
+        typer.secho(f"Tabla inválida: {', '.join(invalidas)}. Usa facturas o gastos", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    modo = salida(ctx)
+    revisadas = 0
+    cambios = []
+    n_cambios = 0
+    for t in dict.fromkeys(tabla):
+        for n, lote in diferencias(t, year):
+            revisadas += n
+            n_cambios += len(lote)
+            if modo is Salida.jsonl:
+                # Una línea por diferencia, según se encuentran
+                emitir([asdict(c) for c in lote], modo)
+            elif len(cambios) < max_filas or modo is Salida.json:
+                cambios.extend(lote)
+            if not dry_run:
+                aplicar(t, lote)
+
+    if modo is Salida.json:
+        emitir(
+            {
+                "revisadas": revisadas,
+                "aplicado": not dry_run,
+                "cambios": [asdict(c) for c in cambios],
+            },
+            modo,
+        )
+        return
+    if modo is Salida.jsonl:
+        return
+
+    if cambios:
+        t = Table(title="Importes recalculados")
+        t.add_column("Tabla")
+        t.add_column("ID", justify="right")
+        t.add_column("Referencia")
+        t.add_column("Fecha")
+        t.add_column("Campo")
+        t.add_column("Guardado (€)", justify="right")
+        t.add_column("Correcto (€)", justify="right")
+        for c in cambios[:max_filas]:
+            t.add_row(
+                c.tabla,
+                str(c.id),
+                c.referencia,
+                c.fecha.strftime("%d-%m-%Y"),
+                c.campo,
+                f"{c.guardado:.2f}",
+                f"{c.correcto:.2f}",
+            )
+        print(t)
+        if n_cambios > max_filas:
+            print(f"… y {n_cambios - max_filas} diferencias más")
+
+    accion = "a corregir (--dry-run, sin cambios)" if dry_run else "corregidas"
+    color = "yellow" if n_cambios and dry_run else "green"
+    print(f"[{color}]{revisadas} filas revisadas, {n_cambios} diferencias {accion}[/{color}]")
@@ -0,0 +1,64 @@
+import typer
+from rich import print
+
+from .common import Salida, emitir, parse_fecha_cli, salida
+
+
+app = typer.Typer()
+
+
+@app.command("cobros")
+def cobros(
+    ctx: typer.Context,
+    fecha: str | None = typer.Option(None, "--fecha", help="Fecha de referencia DD-MM-YYYY o YYYY-MM-DD (por defecto hoy)"),
+    por_cliente: bool = typer.Option(False, "--por-cliente", help="Desglosar por cliente"),
+):
+    """Antigüedad de las facturas pendientes de cobro (0-30, 31-60, 61-90 y +90 días)."""
+    from datetime import date as _date
+    from decimal import Decimal as _Decimal
+    from rich.table import Table
+    from ..services.cobros import TRAMOS, antiguedad
+
+    try:
+        hoy = parse_fecha_cli(fecha) if fecha else _date.today()
+    except ValueError:
+        typer.secho("Fecha inválida. Usa DD-MM-YYYY o YYYY-MM-DD", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    filas = antiguedad(hoy, por_cliente=por_cliente)
+    etiquetas = [e for _, e in TRAMOS]
+    if por_cliente:
+        total = {"n": sum(f["n"] for f in filas)}
+        total.update({e: sum((f[e] for f in filas), _Decimal("0.00")) for e in [*etiquetas, "total"]})
+    else:
+        total = {"n": sum(f["n"] for f in filas), "importe": sum((f["importe"] for f in filas), _Decimal("0.00"))}
+
+    if (modo := salida(ctx)) is Salida.jsonl:
+        emitir(filas, modo)
+        return
+    if modo is Salida.json:
+        emitir({"fecha": hoy, "filas": filas, "total": total}, modo)
+        return
+
+    t = Table(title=f"Pendiente de cobro a {hoy:%d-%m-%Y}")
+    if por_cliente:
+        t.add_column("Cliente")
+        t.add_column("Facturas", justify="right")
+        for e in etiquetas:
+            t.add_column(e, justify="right")
+        t.add_column("Total (EUR)", justify="right")
+        for f in filas:
+            t.add_row(f["cliente"], str(f["n"]), *(f"{f[e]:.2f}" for e in [*etiquetas, "total"]))
+        t.add_section()
+        t.add_row("[bold]Total[/bold]", str(total["n"]), *(f"{total[e]:.2f}" for e in [*etiquetas, "total"]))
+    else:
+        t.add_column("Antigüedad")
+        t.add_column("Facturas", justify="right")
+        t.add_column("Importe (EUR)", justify="right")
+        t.add_column("%", justify="right")
+        for f in filas:
+            pct = f["importe"] * 100 / total["importe"] if total["importe"] else _Decimal("0")
+            t.add_row(f"{f['tramo']} días", str(f["n"]), f"{f['importe']:.2f}", f"{pct:.1f}")
+        t.add_section()
+        t.add_row("[bold]Total[/bold]", str(total["n"]), f"{total['importe']:.2f}", "100.0" if total["n"] else "")
+    print(t)
@@ -0,0 +1,130 @@
+import csv
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+
+import typer
+
+
+def parse_fecha_cli(v: str) -> date:
+    try:
+        return datetime.strptime(v, "%d-%m-%Y").date()
+    except ValueError:
+        return date.fromisoformat(v)
+
+
+class Formato(str, Enum):
+    table = "table"
+    plain = "plain"
+    csv = "csv"
+    json = "json"
+    jsonl = "jsonl"
+
+
+class Salida(str, Enum):
+    table = "table"
+    json = "json"
+    jsonl = "jsonl"
+
+
+def salida(ctx: typer.Context) -> Salida:
+    """Valor de la opción global --output (ver cli.main)."""
+    return (ctx.obj or {}).get("output", Salida.table)
+
+
+def formato_lista(ctx: typer.Context, formato: Formato) -> Formato:
+    # --output json/jsonl también vale para los listados si no se pidió --format
+    if formato is Formato.table and salida(ctx) is not Salida.table:
+        return Formato(salida(ctx).value)
+    return formato
+
+
+def como_dict(m) -> dict:
+    """Campos de un modelo en el orden en que se declaran."""
+    return {c: getattr(m, c) for c in type(m).model_fields}
+
+
+def emitir(data, modo: Salida) -> None:
+    """Escribe el resultado de un servicio (dict o lista de dicts) como JSON.
+
+    En jsonl cada elemento de una lista va en su propia línea."""
+    if modo is Salida.json:
+        typer.echo(json.dumps(data, default=_valor, ensure_ascii=False, indent=2))
+        return
+    for item in data if isinstance(data, list) else [data]:
+        typer.echo(json.dumps(item, default=_valor, ensure_ascii=False))
+
+
+def parse_after(v: str | None) -> tuple[date, int] | None:
+    """Cursor FECHA,ID de --after (el que muestra la página anterior)."""
+    if v is None:
+        return None
+    try:
+        fecha, id_ = v.split(",")
+        return parse_fecha_cli(fecha.strip()), int(id_)
+    except ValueError:
+        typer.secho(
+            "Cursor inválido. Usa FECHA,ID, ej: 2025-03-31,120",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+
+
+def siguiente_pagina(fecha: date, id_: int, err: bool = False) -> None:
+    typer.echo(f"Siguiente página: --after {fecha.isoformat()},{id_}", err=err)
+
+
+def iter_rows(stmt, batch: int = 1000):
+    """Filas de `stmt` leídas del cursor por lotes, sin cargarlas todas en memoria."""
+    from ..db import get_session
+
+    with get_session() as s:
+        yield from s.exec(stmt.execution_options(yield_per=batch))
+
+
+def _valor(v):
+    if isinstance(v, Decimal):
+        return format(v.quantize(Decimal("0.01")), "f")
+    if isinstance(v, date):
+        return v.isoformat()
+    if isinstance(v, Enum):
+        return v.value
+    return v
+
+
+def stream_rows(rows, campos: list[str], formato: Formato):
+    """Escribe cada fila en cuanto llega del cursor (plain, csv, json o jsonl).
+
+    Devuelve (número de filas, última fila) para poder anunciar el cursor de
+    la página siguiente."""
+    out = sys.stdout
+    n, last = 0, None
+    if formato is Formato.csv:
+        writer = csv.writer(out)
+        writer.writerow(campos)
+        for last in rows:
+            writer.writerow(["" if (v := _valor(getattr(last, c))) is None else v for c in campos])
+            n += 1
+    elif formato is Formato.json:
+        # Array JSON escrito elemento a elemento, sin construir la lista
+        out.write("[")
+        for last in rows:
+            out.write(",\n" if n else "\n")
+            out.write(json.dumps({c: _valor(getattr(last, c)) for c in campos}, ensure_ascii=False))
+            n += 1
+        out.write("\n]\n" if n else "]\n")
+    elif formato is Formato.jsonl:
+        for last in rows:
+            out.write(json.dumps({c: _valor(getattr(last, c)) for c in campos}, ensure_ascii=False))
+            out.write("\n")
+            n += 1
+    else:
+        out.write("\t".join(campos) + "\n")
+        for last in rows:
+            out.write("\t".join("" if (v := _valor(getattr(last, c))) is None else str(v) for c in campos))
+            out.write("\n")
+            n += 1
+    out.flush()
+    return n, last
@@ -0,0 +1,170 @@
+import typer
+from rich import print
+from decimal import Decimal
+from datetime import date
+
+from .common import (
+    Formato,
+    formato_lista,
+    iter_rows,
+    parse_after,
+    parse_fecha_cli,
+    siguiente_pagina,
+    stream_rows,
+)
+
+
+app = typer.Typer()
+
+
+@app.command("cuota")
+def add_cuota(
+    fecha: str,
+    importe: str,
+    concepto: str = typer.Option(None),
+):
+    """Añade una cuota de autónomos."""
+    from ..db import get_session
+    from ..models import PagoAutonomo
+    from ..schemas import CuotaAutonomoIn
+
+    try:
+        fecha_dt = parse_fecha_cli(fecha)
+    except Exception:
+        typer.secho(
+            "Fecha inválida. Usa DD-MM-YYYY (o YYYY-MM-DD)",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+
+    def _parse_importe(v: str) -> Decimal:
+        # Permite formato ES con coma decimal (p.ej. 529,32)
+        normalized = v.strip().replace(" ", "").replace(",", ".")
+        return Decimal(normalized)
+
+    try:
+        importe_dec = _parse_importe(importe)
+    except Exception:
+        typer.secho(
+            "Importe inválido. Usa formato 123.45 (o 123,45)",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+
+    c = CuotaAutonomoIn(
+        fecha=fecha_dt,
+        importe_eur=importe_dec,
+        concepto=concepto,
+    )
+
+    m = PagoAutonomo(
+        fecha=c.fecha,
+        importe_eur=c.importe_eur,
+        concepto=c.concepto,
+    )
+
+    with get_session() as s:
+        s.add(m)
+        s.commit()
+
+    print("[green]\u2713 Cuota guardada[/green]")
+
+
+@app.command("cuotas")
+def list_cuotas(
+    ctx: typer.Context,
+    periodo: str = typer.Argument(None, help="Periodo en formato YYYYQ#, ej: 2025Q3"),
+    year: int | None = typer.Option(None, "--year", help="Año completo, ej: 2025"),
+    desc: bool = typer.Option(False, help="Orden descendente"),
+    page_size: int | None = typer.Option(None, "--page-size", help="Filas por página; muestra el cursor de la siguiente"),
+    after: str | None = typer.Option(None, "--after", help="Cursor FECHA,ID de la página anterior"),
+    formato: Formato = typer.Option(Formato.table, "--format", help="table, o plain/csv/json/jsonl escritos fila a fila"),
+):
+    """Lista cuotas de autónomos."""
+    from ..db import get_session
+    from ..models import PagoAutonomo
+    from ..services.consultas import despues_de
+    from sqlmodel import select
+    from rich.table import Table
+    from decimal import Decimal as _Decimal
+
+    start_date: date | None = None
+    end_date: date | None = None
+
+    if periodo:
+        try:
+            year_p = int(periodo[:4])
+            q = int(periodo[-1])
+            if q not in (1, 2, 3, 4):
+                raise ValueError
+        except ValueError:
+            typer.secho(
+                "Periodo inválido. Usa formato YYYYQ#, ej: 2025Q3",
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(code=1)
+
+        start_month = 1 + (q - 1) * 3
+        start_date = date(year_p, start_month, 1)
+        if q == 4:
+            end_date = date(year_p + 1, 1, 1)
+        else:
+            end_date = date(year_p, start_month + 3, 1)
+
+    if year is not None:
+        if periodo:
+            typer.secho(
+                "No puedes combinar periodo y --year en la misma llamada",
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(code=1)
+        if year < 1900 or year > 2100:
+            typer.secho("Año inválido. Usa un año tipo 2025", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        start_date = date(year, 1, 1)
+        end_date = date(year + 1, 1, 1)
+
+    stmt = select(PagoAutonomo)
+    if start_date is not None and end_date is not None:
+        stmt = stmt.where(
+            (PagoAutonomo.fecha >= start_date) & (PagoAutonomo.fecha < end_date)
+        )
+    stmt = despues_de(stmt, PagoAutonomo.fecha, PagoAutonomo.id, parse_after(after), desc)
+    if page_size:
+        stmt = stmt.limit(page_size)
+
+    formato = formato_lista(ctx, formato)
+    if formato is not Formato.table:
+        n, last = stream_rows(iter_rows(stmt), list(PagoAutonomo.model_fields), formato)
+        if page_size and n == page_size:
+            siguiente_pagina(last.fecha, last.id, err=True)
+        return
+
+    with get_session() as s:
+        cuotas = s.exec(stmt).all()
+
+    t = Table(title="Cuotas de autónomos")
+    t.add_column("Fecha")
+    t.add_column("Importe (€)", justify="right")
+    t.add_column("Concepto")
+
+    def eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    def fmt_fecha(d: date) -> str:
+        return d.strftime("%d-%m-%Y")
+
+    for c in cuotas:
+        t.add_row(
+            fmt_fecha(c.fecha),
+            eur(c.importe_eur),
+            c.concepto or "",
+        )
+
+    total = sum((c.importe_eur for c in cuotas), _Decimal("0.00"))
+    t.add_row("", "", "")
+    t.add_row("[bold]TOTAL[/bold]", f"[bold]{eur(total)}[/bold]", "")
+
+    print(t)
+    if page_size and len(cuotas) == page_size:
+        siguiente_pagina(cuotas[-1].fecha, cuotas[-1].id)
@@ -0,0 +1,72 @@
+import typer
+from rich import print
+
+from .common import Salida, emitir, salida
+
+
+app = typer.Typer()
+
+
+def _top(limit: int) -> int | None:
+    return limit if limit > 0 else None
+
+
+def _validar_orden(orden: str, validos) -> None:
+    if orden not in validos:
+        typer.secho(f"Orden inválido. Usa {', '.join(validos)}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+
+@app.command("clientes")
+def list_clientes(
+    ctx: typer.Context,
+    top: int = typer.Option(10, "--top", help="Número de clientes (0 = todos)"),
+    orden: str = typer.Option("base", "--orden", help="base, n (nº de facturas), iva o irpf"),
+):
+    """Clientes con más facturación (totales acumulados)."""
+    from rich.table import Table
+    from ..services.entidades import ORDENES_CLIENTE, top_clientes
+
+    _validar_orden(orden, ORDENES_CLIENTE)
+    filas = top_clientes(_top(top), orden)
+    if (modo := salida(ctx)) is not Salida.table:
+        emitir(filas, modo)
+        return
+
+    t = Table(title="Clientes")
+    t.add_column("Cliente")
+    t.add_column("NIF")
+    t.add_column("Facturas", justify="right")
+    t.add_column("Base (EUR)", justify="right")
+    t.add_column("IVA (EUR)", justify="right")
+    t.add_column("IRPF (EUR)", justify="right")
+    for c in filas:
+        t.add_row(c["nombre"], c["nif"] or "", str(c["facturas"]), f"{c['base']:.2f}", f"{c['iva']:.2f}", f"{c['irpf']:.2f}")
+    print(t)
+
+
+@app.command("proveedores")
+def list_proveedores(
+    ctx: typer.Context,
+    top: int = typer.Option(10, "--top", help="Número de proveedores (0 = todos)"),
+    orden: str = typer.Option("base", "--orden", help="base, n (nº de gastos) o iva"),
+):
+    """Proveedores con más gasto (totales acumulados)."""
+    from rich.table import Table
+    from ..services.entidades import ORDENES_PROVEEDOR, top_proveedores
+
+    _validar_orden(orden, ORDENES_PROVEEDOR)
+    filas = top_proveedores(_top(top), orden)
+    if (modo := salida(ctx)) is not Salida.table:
+        emitir(filas, modo)
+        return
+
+    t = Table(title="Proveedores")
+    t.add_column("Proveedor")
+    t.add_column("NIF")
+    t.add_column("Gastos", justify="right")
+    t.add_column("Base (EUR)", justify="right")
+    t.add_column("IVA (EUR)", justify="right")
+    for p in filas:
+        t.add_row(p["nombre"], p["nif"] or "", str(p["gastos"]), f"{p['base']:.2f}", f"{p['iva']:.2f}")
+    print(t)
@@ -0,0 +1,78 @@
+from enum import Enum
+
+import typer
+from rich import print
+
+from .common import Salida, emitir, salida
+
+
+app = typer.Typer()
+
+
+class Agrupacion(str, Enum):
+    cliente = "cliente"
+    actividad = "actividad"
+    mes = "mes"
+
+
+@app.command("stats")
+def stats(
+    ctx: typer.Context,
+    by: Agrupacion = typer.Option(Agrupacion.cliente, "--by", help="Agrupar por cliente, actividad o mes"),
+    year: int | None = typer.Option(None, "--year", help="Año, ej: 2025 (por defecto todos)"),
+    quarter: int | None = typer.Option(None, "--quarter", min=1, max=4, help="Solo un trimestre (1-4)"),
+    por_trimestre: bool = typer.Option(False, "--por-trimestre", help="Desglosar cada grupo por trimestre"),
+):
+    """Facturación agrupada por cliente, actividad o mes."""
+    from decimal import Decimal as _Decimal
+    from rich.table import Table
+    from ..services.consultas import ingresos_agrupados
+
+    if year is not None and (year < 1900 or year > 2100):
+        typer.secho("Año inválido. Usa un año tipo 2025", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    grupos = ingresos_agrupados(by.value, year=year, quarter=quarter, por_trimestre=por_trimestre)
+    total = {
+        "n": sum(g["n"] for g in grupos),
+        "base": sum((g["base"] for g in grupos), _Decimal("0.00")),
+        "iva": sum((g["iva"] for g in grupos), _Decimal("0.00")),
+        "irpf": sum((g["irpf"] for g in grupos), _Decimal("0.00")),
+    }
+
+    if (modo := salida(ctx)) is Salida.jsonl:
+        # Una línea por grupo
+        emitir(grupos, modo)
+        return
+    if modo is Salida.json:
+        emitir({"by": by.value, "year": year, "quarter": quarter, "grupos": grupos, "total": total}, modo)
+        return
+
+    def _fmt_eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    periodo = f"{year or 'todos los años'}" + (f" T{quarter}" if quarter else "")
+    t = Table(title=f"Facturación por {by.value} ({periodo})")
+    t.add_column(by.value.capitalize())
+    if por_trimestre and by is not Agrupacion.mes:
+        t.add_column("Trimestre", justify="right")
+    t.add_column("Facturas", justify="right")
+    t.add_column("Base (EUR)", justify="right")
+    t.add_column("% base", justify="right")
+    t.add_column("IVA (EUR)", justify="right")
+    t.add_column("IRPF (EUR)", justify="right")
+
+    for g in grupos:
+        clave = g[by.value]
+        celdas = [str(clave.value if isinstance(clave, Enum) else clave)]
+        if "trimestre" in g:
+            celdas.append(f"T{g['trimestre']}")
+        pct = g["base"] * 100 / total["base"] if total["base"] else _Decimal("0")
+        celdas += [str(g["n"]), _fmt_eur(g["base"]), f"{pct:.1f}", _fmt_eur(g["iva"]), _fmt_eur(g["irpf"])]
+        t.add_row(*celdas)
+
+    t.add_section()
+    celdas = ["[bold]Total[/bold]"] + ([""] if por_trimestre and by is not Agrupacion.mes else [])
+    celdas += [str(total["n"]), _fmt_eur(total["base"]), "100.0" if grupos else "", _fmt_eur(total["iva"]), _fmt_eur(total["irpf"])]
+    t.add_row(*celdas)
+    print(t)
@@ -0,0 +1,574 @@
+import typer
+from rich import print
+from decimal import Decimal
+from datetime import date
+
+from ..enums import Actividad
+from .common import (
+    Formato,
+    formato_lista,
+    iter_rows,
+    parse_after,
+    parse_fecha_cli,
+    siguiente_pagina,
+    stream_rows,
+)
+
+
+app = typer.Typer()
+
+
+@app.command("emite")
+def add_factura(
+    numero: str,
+    fecha: str,
+    cliente_nombre: str,
+    base: str,
+    tipo_iva: str = typer.Option(None, help="Tipo IVA (%); por defecto el general de config/rules.yml"),
+    ret_irpf_pct: str = typer.Option(None, help="Retención IRPF (%); por defecto la de la actividad en config/rules.yml"),
+    actividad: Actividad = Actividad.musica,
+    cliente_nif: str = typer.Option(None),
+    pais: str = typer.Option(None),
+    notas: str = typer.Option(None),
+    pdf: str = typer.Option(None, help="Ruta del PDF"),
+):
+    """Añade una factura emitida."""
+    from ..db import get_session
+    from ..models import FacturaEmitida
+    from ..schemas import FacturaIn
+    from ..services.importes import porcentaje
+
+    try:
+        fecha_dt = parse_fecha_cli(fecha)
+    except Exception:
+        typer.secho(
+            "Fecha inválida. Usa DD-MM-YYYY (o YYYY-MM-DD)",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+
+    f = FacturaIn(
+        numero=numero,
+        fecha_emision=fecha_dt,
+        cliente_nombre=cliente_nombre,
+        cliente_nif=cliente_nif,
+        pais=pais,
+        base_eur=Decimal(base),
+        tipo_iva=None if tipo_iva is None else Decimal(tipo_iva),
+        ret_irpf_pct=None if ret_irpf_pct is None else Decimal(ret_irpf_pct),
+        actividad=actividad,
+        notas=notas,
+        archivo_pdf_path=pdf,
+    )
+    cuota_iva = porcentaje(f.base_eur, f.tipo_iva)
+    ret_importe = porcentaje(f.base_eur, f.ret_irpf_pct)
+    m = FacturaEmitida(**f.model_dump(), cuota_iva=cuota_iva, ret_irpf_importe=ret_importe)
+    from sqlmodel import select
+    with get_session() as s:
+        # Evita duplicados por numero
+        existing = s.exec(select(FacturaEmitida).where(FacturaEmitida.numero==m.numero)).first()
+        if existing:
+            typer.secho("Ya existe una factura con ese número", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        s.add(m); s.commit()
+    print("[green]\u2713 Factura guardada[/green]")
+
+
+@app.command("facturas")
+def list_facturas(
+    ctx: typer.Context,
+    periodo: str = typer.Argument(None, help="Periodo en formato YYYYQ#, ej: 2025Q4"),
+    year: int | None = typer.Option(None, "--year", help="Año completo, ej: 2025"),
+    cliente: str | None = typer.Option(None, "--cliente", help="Filtrar por nombre o NIF del cliente (prefijos de palabra, sin mayúsculas ni acentos)"),
+    buscar: str | None = typer.Option(None, "--buscar", help="Buscar en cliente, NIF, número y notas (prefijos de palabra)"),
+    actividad: Actividad | None = typer.Option(None, help="Filtrar por actividad"),
+    limit: int = typer.Option(200, help="Máximo de facturas a mostrar"),
+    desc: bool = typer.Option(False, help="Orden descendente"),
+    page_size: int | None = typer.Option(None, "--page-size", help="Filas por página; muestra el cursor de la siguiente"),
+    after: str | None = typer.Option(None, "--after", help="Cursor FECHA,ID de la página anterior"),
+    formato: Formato = typer.Option(Formato.table, "--format", help="table, o plain/csv/json/jsonl escritos fila a fila"),
+):
+    """Lista facturas emitidas."""
+    from ..db import get_session
+    from ..models import FacturaEmitida
+    from ..services.consultas import despues_de, filtrar_facturas
+    from rich.table import Table
+    from sqlmodel import select
+    from decimal import Decimal as _Decimal, ROUND_HALF_UP
+
+    start_date: date | None = None
+    end_date: date | None = None
+
+    if periodo:
+        try:
+            year_p = int(periodo[:4])
+            q = int(periodo[-1])
+            if q not in (1, 2, 3, 4):
+                raise ValueError
+        except ValueError:
+            typer.secho(
+                "Periodo inválido. Usa formato YYYYQ#, ej: 2025Q4",
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(code=1)
+
+        start_month = 1 + (q - 1) * 3
+        start_date = date(year_p, start_month, 1)
+        if q == 4:
+            end_date = date(year_p + 1, 1, 1)
+        else:
+            end_date = date(year_p, start_month + 3, 1)
+
+    if year is not None:
+        if periodo:
+            typer.secho(
+                "No puedes combinar periodo y --year en la misma llamada",
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(code=1)
+        if year < 1900 or year > 2100:
+            typer.secho("Año inválido. Usa un año tipo 2025", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        start_date = date(year, 1, 1)
+        end_date = date(year + 1, 1, 1)
+
+    stmt = select(FacturaEmitida)
+    if start_date is not None and end_date is not None:
+        stmt = stmt.where(
+            (FacturaEmitida.fecha_emision >= start_date)
+            & (FacturaEmitida.fecha_emision < end_date)
+        )
+    # Índice de texto (services.busqueda) en vez de un LIKE sobre toda la tabla
+    stmt = filtrar_facturas(stmt, cliente=cliente, texto=buscar)
+    if actividad is not None:
+        stmt = stmt.where(FacturaEmitida.actividad == actividad)
+    stmt = despues_de(stmt, FacturaEmitida.fecha_emision, FacturaEmitida.id, parse_after(after), desc)
+    limit = page_size or limit
+    if limit is not None and limit > 0:
+        stmt = stmt.limit(limit)
+
+    formato = formato_lista(ctx, formato)
+    if formato is not Formato.table:
+        n, last = stream_rows(iter_rows(stmt), list(FacturaEmitida.model_fields), formato)
+        if page_size and n == page_size:
+            siguiente_pagina(last.fecha_emision, last.id, err=True)
+        return
+
+    with get_session() as s:
+        facturas = list(s.exec(stmt).all())
+
+    t = Table(title="Facturas emitidas")
+    t.add_column("ID", justify="right")
+    t.add_column("Número")
+    t.add_column("Fecha")
+    t.add_column("Trimestre")
+    t.add_column("Cliente")
+    t.add_column("Base (EUR)", justify="right")
+    t.add_column("IVA (EUR)", justify="right")
+    t.add_column("Estado (IVA)")
+    t.add_column("IRPF (EUR)", justify="right")
+    t.add_column("Percibido (EUR)", justify="right")
+    t.add_column("TOTAL (EUR)", justify="right")
+    t.add_column("Estado factura")
+    t.add_column("Actividad")
+
+    def _fmt_eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01"), rounding=ROUND_HALF_UP), "f")
+
+    def _fmt_quarter(d: date) -> str:
+        q = ((d.month - 1) // 3) + 1
+        return f"{d.year}Q{q}"
+
+    def _fmt_fecha(d: date) -> str:
+        return d.strftime("%d-%m-%Y")
+
+    total_base = _Decimal("0.00")
+    total_iva = _Decimal("0.00")
+    total_irpf = _Decimal("0.00")
+    total_percibido = _Decimal("0.00")
+    total_total = _Decimal("0.00")
+
+    for f in facturas:
+        row_percibido = f.base_eur - f.ret_irpf_importe
+        row_total = f.base_eur + f.cuota_iva - f.ret_irpf_importe
+        total_base += f.base_eur
+        total_iva += f.cuota_iva
+        total_irpf += f.ret_irpf_importe
+        total_percibido += row_percibido
+        total_total += row_total
+
+        # Estado (IVA): free-text from f.estado
+        estado_iva = getattr(f, "estado", None) or ""
+        # Estado (cobro): free-text from f.estado_cobro (default "Pendiente")
+        estado_cobro = getattr(f, "estado_cobro", None) or ""
+
+        t.add_row(
+            str(f.id or ""),
+            f.numero,
+            _fmt_fecha(f.fecha_emision),
+            _fmt_quarter(f.fecha_emision),
+            f.cliente_nombre,
+            _fmt_eur(f.base_eur),
+            _fmt_eur(f.cuota_iva),
+            estado_iva,
+            _fmt_eur(f.ret_irpf_importe),
+            _fmt_eur(row_percibido),
+            _fmt_eur(row_total),
+            estado_cobro,
+            str(f.actividad.value if hasattr(f.actividad, "value") else f.actividad),
+        )
+
+    if facturas:
+        # Fila en blanco de separación
+        t.add_row(*([""] * 13))
+        # Fila de totales (Base, IVA y TOTAL)
+        t.add_row(
+            "",
+            "",
+            "",
+            "",
+            "[bold]TOTAL[/bold]",
+            f"[bold]{_fmt_eur(total_base)}[/bold]",
+            f"[bold]{_fmt_eur(total_iva)}[/bold]",
+            "",  # Estado (IVA) no aplica en totales
+            f"[bold]{_fmt_eur(total_irpf)}[/bold]",
+            f"[bold]{_fmt_eur(total_percibido)}[/bold]",
+            f"[bold]{_fmt_eur(total_total)}[/bold]",
+            "",  # Estado (cobro) no aplica en totales
+            "",
+        )
+
+    print(t)
+    if page_size and len(facturas) == page_size:
+        siguiente_pagina(facturas[-1].fecha_emision, facturas[-1].id)
+
+
+# Campos admitidos en --where de set-estado/set-estado-iva
+CAMPOS_WHERE = ("cliente", "actividad", "estado", "estado_cobro")
+
+
+def _parse_where(condiciones: list[str] | None) -> dict:
+    """--where campo=valor (repetible) -> filtros de filtrar_facturas.
+
+    `cliente` queda como texto: _actualizar_campo lo convierte en una
+    condición exacta (consultas.cliente_exacto), no en una búsqueda."""
+    from ..enums import Actividad
+
+    filtros: dict = {}
+    for cond in condiciones or []:
+        campo, sep, valor = cond.partition("=")
+        campo = campo.strip()
+        if not sep or campo not in CAMPOS_WHERE:
+            typer.secho(
+                f"Filtro inválido: {cond!r}. Usa campo=valor con campo en {', '.join(CAMPOS_WHERE)}",
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(code=1)
+        if campo == "actividad":
+            try:
+                filtros[campo] = Actividad(valor.strip())
+            except ValueError:
+                typer.secho(f"Actividad inválida: {valor}", fg=typer.colors.RED)
+                raise typer.Exit(code=1)
+        else:
+            filtros[campo] = valor.strip()
+    return filtros
+
+
+def _actualizar_campo(
+    campo: str,
+    valor: str,
+    id: int | None,
+    numero: str | None,
+    periodo: str | None,
+    year: int | None,
+    where: list[str] | None,
+    dry_run: bool,
+) -> tuple[int, str]:
+    """Pone `campo` = `valor` en las facturas seleccionadas con un solo UPDATE.
+
+    Antes de guardar muestra cuántas facturas coinciden; con `dry_run` no
+    actualiza nada. Devuelve (facturas seleccionadas, descripción de la
+    selección)."""
+    from ..models import FacturaEmitida
+    from ..services.consultas import actualizar_facturas, cliente_exacto
+
+    scope_flags = [id is not None, numero is not None, periodo is not None, year is not None]
+    if sum(1 for f in scope_flags if f) > 1 or not (any(scope_flags) or where):
+        typer.secho(
+            "You must provide exactly one of --id, --numero, --periodo or --year (or a --where filter)",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+
+    filtros = _parse_where(where)
+    condiciones = []
+    partes: list[str] = []
+    # Una actualización masiva no puede depender de una búsqueda por prefijo
+    if (cliente := filtros.pop("cliente", None)) is not None:
+        condiciones.append(cliente_exacto(cliente))
+
+    if id is not None:
+        condiciones.append(FacturaEmitida.id == id)
+        partes.append(f"id={id}")
+    elif numero is not None:
+        condiciones.append(FacturaEmitida.numero == numero)
+        partes.append(f"numero={numero}")
+    elif periodo is not None:
+        try:
+            filtros["year"] = int(periodo[:4])
+            filtros["quarter"] = int(periodo[-1])
+            if filtros["quarter"] not in (1, 2, 3, 4):
+                raise ValueError
+        except ValueError:
+            typer.secho(
+                "Periodo inválido. Usa formato YYYYQ#, ej: 2025Q4",
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(code=1)
+        partes.append(periodo)
+    elif year is not None:
+        if year < 1900 or year > 2100:
+            typer.secho("Año inválido. Usa un año tipo 2025", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        filtros["year"] = year
+        partes.append(str(year))
+    partes.extend(where or [])
+    ident_desc = ", ".join(partes)
+
+    def _avisar(n: int) -> None:
+        typer.secho(f"{n} invoice(s) match {ident_desc}", fg=typer.colors.YELLOW)
+
+    n = actualizar_facturas({campo: valor}, *condiciones, avisar=_avisar, dry_run=dry_run, **filtros)
+    if not n:
+        typer.secho(f"No invoices found for {ident_desc}", fg=typer.colors.YELLOW)
+        raise typer.Exit(code=0)
+    return n, ident_desc
+
+
+@app.command("set-estado-iva")
+def set_estado_iva(
+    estado: str = typer.Argument(..., help="New status text, e.g. 'Pagado'"),
+    id: int | None = typer.Option(None, "--id", help="Invoice ID to update"),
+    numero: str | None = typer.Option(None, "--numero", help="Invoice number to update"),
+    periodo: str | None = typer.Option(None, "--periodo", help="Quarter YYYYQ#, e.g. 2025Q1"),
+    year: int | None = typer.Option(None, "--year", help="Full year, e.g. 2025"),
+    where: list[str] | None = typer.Option(
+        None,
+        "--where",
+        help="Filter campo=valor (cliente: id, NIF or full name; actividad, estado, estado_cobro); repeatable",
+    ),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only show how many invoices match, do not update"),
+):
+    """Establece el texto de 'estado (IVA)' para una factura o para un periodo/año completo."""
+    n, ident_desc = _actualizar_campo("estado", estado, id, numero, periodo, year, where, dry_run)
+    if dry_run:
+        return
+    typer.secho(
+        f"Updated estado (IVA) to '{estado}' for {n} invoice(s) ({ident_desc})",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command("set-estado")
+def set_estado(
+    estado: str = typer.Argument(..., help="Nuevo estado de cobro, p.ej. 'Cobrado'"),
+    id: int | None = typer.Option(None, "--id", help="ID de la factura a actualizar"),
+    numero: str | None = typer.Option(None, "--numero", help="Número de factura a actualizar"),
+    periodo: str | None = typer.Option(None, "--periodo", help="Trimestre YYYYQ#, ej: 2025Q1"),
+    year: int | None = typer.Option(None, "--year", help="Año completo, ej: 2025"),
+    where: list[str] | None = typer.Option(
+        None,
+        "--where",
+        help="Filtro campo=valor (cliente: id, NIF o nombre completo; actividad, estado, estado_cobro); repetible",
+    ),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Solo muestra cuántas facturas coinciden, no actualiza"),
+):
+    """Establece el estado de cobro para una factura o para un periodo/año completo."""
+    n, ident_desc = _actualizar_campo("estado_cobro", estado, id, numero, periodo, year, where, dry_run)
+    if dry_run:
+        return
+    typer.secho(
+        f"Updated estado de cobro to '{estado}' for {n} invoice(s) ({ident_desc})",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command("facturas-all")
+def list_facturas_all(
+    ctx: typer.Context,
+    limit: int = typer.Option(200, help="Máximo de facturas a mostrar (0 = todas)"),
+    desc: bool = typer.Option(False, help="Orden descendente"),
+    page_size: int | None = typer.Option(None, "--page-size", help="Filas por página; muestra el cursor de la siguiente"),
+    after: str | None = typer.Option(None, "--after", help="Cursor FECHA,ID de la página anterior"),
+    formato: Formato = typer.Option(Formato.table, "--format", help="table, o plain/csv/json/jsonl escritos fila a fila"),
+):
+    """Lista todas las columnas de facturas emitidas."""
+    from ..db import get_session
+    from ..models import FacturaEmitida
+    from ..services.consultas import despues_de
+    from rich.table import Table
+    from sqlmodel import select
+    from decimal import Decimal as _Decimal
+
+    stmt = select(FacturaEmitida)
+    stmt = despues_de(stmt, FacturaEmitida.fecha_emision, FacturaEmitida.id, parse_after(after), desc)
+    limit = page_size or limit
+    if limit is not None and limit > 0:
+        stmt = stmt.limit(limit)
+
+    formato = formato_lista(ctx, formato)
+    if formato is not Formato.table:
+        n, last = stream_rows(iter_rows(stmt), list(FacturaEmitida.model_fields), formato)
+        if page_size and n == page_size:
+            siguiente_pagina(last.fecha_emision, last.id, err=True)
+        return
+
+    with get_session() as s:
+        facturas = list(s.exec(stmt).all())
+
+    t = Table(title="Facturas emitidas (todas las columnas)")
+    t.add_column("ID", justify="right")
+    t.add_column("Número")
+    t.add_column("Fecha")
+    t.add_column("Trimestre")
+    t.add_column("Cliente")
+    t.add_column("Cliente NIF")
+    t.add_column("País")
+    t.add_column("Base (EUR)", justify="right")
+    t.add_column("Tipo IVA (%)", justify="right")
+    t.add_column("IVA (EUR)", justify="right")
+    t.add_column("Ret IRPF (%)", justify="right")
+    t.add_column("IRPF (EUR)", justify="right")
+    t.add_column("Actividad")
+    t.add_column("Notas")
+    t.add_column("PDF")
+
+    def _fmt_eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    def _fmt_pct(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    def _fmt_quarter(d: date) -> str:
+        q = ((d.month - 1) // 3) + 1
+        return f"{d.year}Q{q}"
+
+    def _fmt_fecha(d: date) -> str:
+        return d.strftime("%d-%m-%Y")
+
+    for f in facturas:
+        t.add_row(
+            str(f.id or ""),
+            f.numero,
+            _fmt_fecha(f.fecha_emision),
+            _fmt_quarter(f.fecha_emision),
+            f.cliente_nombre,
+            str(f.cliente_nif or ""),
+            str(f.pais or ""),
+            _fmt_eur(f.base_eur),
+            _fmt_pct(f.tipo_iva),
+            _fmt_eur(f.cuota_iva),
+            _fmt_pct(f.ret_irpf_pct),
+            _fmt_eur(f.ret_irpf_importe),
+            str(f.actividad.value if hasattr(f.actividad, "value") else f.actividad),
+            str(f.notas or ""),
+            str(f.archivo_pdf_path or ""),
+        )
+
+    print(t)
+    if page_size and len(facturas) == page_size:
+        siguiente_pagina(facturas[-1].fecha_emision, facturas[-1].id)
+
+
+@app.command("import-facturas")
+def import_facturas(
+    carpeta: str = typer.Argument(..., help="Carpeta con facturas en PDF"),
+    dry_run: bool = typer.Option(
+        False,
+        "--dry-run",
+        help="Solo muestra lo que se importaría, no guarda nada",
+    ),
+):
+    """
+    Importa facturas emitidas desde PDFs.
+    Compatible con IVA / sin IVA / IRPF.
+    """
+    from ..db import get_session
+    from ..models import FacturaEmitida
+    from sqlmodel import select
+    from ..services.importacion_pdf.importador_factura import importar_factura_pdf
+    import os
+
+    if not os.path.isdir(carpeta):
+        typer.secho("La ruta indicada no es una carpeta", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    pdfs = [f for f in os.listdir(carpeta) if f.lower().endswith(".pdf")]
+
+    if not pdfs:
+        typer.secho("No se encontraron PDFs en la carpeta", fg=typer.colors.YELLOW)
+        return
+
+    print(f"📂 Procesando {len(pdfs)} archivos PDF\n")
+
+    for nombre in sorted(pdfs):
+        ruta = os.path.join(carpeta, nombre)
+
+        try:
+            factura_in, campos = importar_factura_pdf(ruta)
+
+            # Importes estrictamente del PDF
+            total = campos.get("total")
+            if total is None:
+                raise ValueError("No se encontró TOTAL en el PDF")
+
+            cuota_iva = campos.get("iva_importe")
+            if cuota_iva is None:
+                cuota_iva = Decimal("0.00")
+
+            ret_irpf = campos.get("irpf_importe")
+            if ret_irpf is None:
+                ret_irpf = Decimal("0.00")
+            ret_irpf = abs(ret_irpf)
+
+            factura_db = FacturaEmitida(
+                **factura_in.model_dump(),
+                cuota_iva=cuota_iva,
+                ret_irpf_importe=ret_irpf,
+            )
+
+            with get_session() as s:
+                existente = s.exec(
+                    select(FacturaEmitida).where(
+                        FacturaEmitida.numero == factura_db.numero
+                    )
+                ).first()
+
+                if existente:
+                    print(
+                        f"[yellow]↷ Factura {factura_db.numero} ya existe, se omite[/yellow]"
+                    )
+                    continue
+
+                if dry_run:
+                    print(
+                        f"[blue]→ {factura_db.numero} | "
+                        f"{factura_db.fecha_emision} | "
+                        f"{factura_db.base_eur} € | "
+                        f"IVA {factura_db.tipo_iva}% ({cuota_iva} €) | "
+                        f"IRPF {factura_db.ret_irpf_pct}% ({ret_irpf} €) | "
+                        f"TOTAL {total} €[/blue]"
+                    )
+                else:
+                    s.add(factura_db)
+                    s.commit()
+                    print(
+                        f"[green]✓ Importada factura {factura_db.numero}[/green]"
+                    )
+
+        except Exception as e:
+            print(f"[red]✗ Error en {nombre}: {e}[/red]")
+
+    if dry_run:
+        print("\n[yellow]Modo dry-run: no se ha guardado ninguna factura[/yellow]")
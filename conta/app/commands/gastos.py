@@ -0,0 +1,243 @@
+import typer
+from rich import print
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import date
+
+from .common import (
+    Formato,
+    formato_lista,
+    iter_rows,
+    parse_after,
+    parse_fecha_cli,
+    siguiente_pagina,
+    stream_rows,
+)
+
+
+app = typer.Typer()
+
+
+@app.command("gasto")
+def add_gasto(
+    proveedor: str,
+    fecha: str,
+    base: str,
+    tipo_iva: str = typer.Option(None, help="Tipo IVA (%); por defecto el general de config/rules.yml"),
+    afecto_pct: str = "100.00",
+    tipo: str = typer.Option(None),
+    pdf: str = typer.Option(None, help="Ruta del PDF"),
+    no_iva: bool = typer.Option(False, "--no-iva", help="IVA no deducible (OSS, extracomunitario, etc.)"),
+    cuota_iva_override: str = typer.Option(None, "--cuota-iva", help="Cuota IVA exacta de la factura (override del cálculo automático)"),
+):
+    """Añade un gasto deducible. Tipos IVA válidos: los de config/rules.yml y 0.00"""
+    from ..db import get_session
+    from ..models import GastoDeducible
+    from ..reglas import reglas_en
+    from ..schemas import GastoIn
+    from ..services.importes import porcentaje
+
+    try:
+        fecha_dt = parse_fecha_cli(fecha)
+    except Exception:
+        typer.secho(
+            "Fecha inválida. Usa DD-MM-YYYY (o YYYY-MM-DD)",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+
+    reglas_fecha = reglas_en(fecha_dt)
+    try:
+        base_dec = Decimal(base)
+        tipo_iva_dec = reglas_fecha.iva_general if tipo_iva is None else Decimal(tipo_iva)
+    except Exception:
+        typer.secho(
+            "Importes inválidos. Usa formato 123.45 para base",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+
+    # Validar tipo IVA estándar
+    validos = sorted(reglas_fecha.tipos_iva_validos)
+    if tipo_iva_dec not in validos:
+        typer.secho(
+            f"Tipo IVA debe ser {', '.join(map(str, validos[:-1]))} o {validos[-1]}",
+            fg=typer.colors.YELLOW,
+        )
+
+    g = GastoIn(
+        proveedor=proveedor,
+        fecha=fecha_dt,
+        base_eur=base_dec,
+        tipo_iva=tipo_iva_dec,
+        afecto_pct=Decimal(afecto_pct),
+        tipo=tipo,
+        archivo_pdf_path=pdf,
+        iva_deducible=not no_iva,
+    )
+
+    # Usa cuota IVA de la factura si se proporciona, sino calcula
+    if cuota_iva_override is not None:
+        cuota_iva = Decimal(cuota_iva_override).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    else:
+        cuota_iva = porcentaje(base_dec, tipo_iva_dec)
+    m = GastoDeducible(
+        proveedor=g.proveedor,
+        proveedor_nif=g.proveedor_nif,
+        fecha=g.fecha,
+        base_eur=g.base_eur,
+        tipo_iva=g.tipo_iva,
+        cuota_iva=cuota_iva,
+        tipo=g.tipo,
+        afecto_pct=g.afecto_pct,
+        iva_deducible=g.iva_deducible,
+        cuota_iva_manual=cuota_iva_override is not None,
+        archivo_pdf_path=g.archivo_pdf_path,
+    )
+    with get_session() as s:
+        s.add(m)
+        s.commit()
+    print("[green]\u2713 Gasto guardado[/green]")
+
+
+@app.command("gastos")
+def list_gastos(
+    ctx: typer.Context,
+    periodo: str = typer.Argument(None, help="Periodo en formato YYYYQ#, ej: 2025Q4"),
+    year: int | None = typer.Option(None, "--year", help="Año completo, ej: 2025"),
+    proveedor: str | None = typer.Option(None, "--proveedor", help="Filtrar por proveedor (prefijos de palabra, sin mayúsculas ni acentos)"),
+    limit: int = typer.Option(200, help="Máximo de gastos a mostrar"),
+    desc: bool = typer.Option(False, help="Orden descendente"),
+    page_size: int | None = typer.Option(None, "--page-size", help="Filas por página; muestra el cursor de la siguiente"),
+    after: str | None = typer.Option(None, "--after", help="Cursor FECHA,ID de la página anterior"),
+    formato: Formato = typer.Option(Formato.table, "--format", help="table, o plain/csv/json/jsonl escritos fila a fila"),
+):
+    """Lista gastos deducibles."""
+    from ..db import get_session
+    from ..models import GastoDeducible
+    from ..services.consultas import despues_de, filtrar_gastos
+    from rich.table import Table
+    from sqlmodel import select
+    from decimal import Decimal as _Decimal
+
+    start_date: date | None = None
+    end_date: date | None = None
+
+    if periodo:
+        try:
+            year_p = int(periodo[:4])
+            q = int(periodo[-1])
+            if q not in (1, 2, 3, 4):
+                raise ValueError
+        except ValueError:
+            typer.secho(
+                "Periodo inválido. Usa formato YYYYQ#, ej: 2025Q4",
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(code=1)
+
+        start_month = 1 + (q - 1) * 3
+        start_date = date(year_p, start_month, 1)
+        if q == 4:
+            end_date = date(year_p + 1, 1, 1)
+        else:
+            end_date = date(year_p, start_month + 3, 1)
+
+    if year is not None:
+        if periodo:
+            typer.secho(
+                "No puedes combinar periodo y --year en la misma llamada",
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(code=1)
+        if year < 1900 or year > 2100:
+            typer.secho("Año inválido. Usa un año tipo 2025", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        start_date = date(year, 1, 1)
+        end_date = date(year + 1, 1, 1)
+
+    stmt = select(GastoDeducible)
+    if start_date is not None and end_date is not None:
+        stmt = stmt.where((GastoDeducible.fecha >= start_date) & (GastoDeducible.fecha < end_date))
+    stmt = filtrar_gastos(stmt, proveedor=proveedor)
+    stmt = despues_de(stmt, GastoDeducible.fecha, GastoDeducible.id, parse_after(after), desc)
+    limit = page_size or limit
+    if limit is not None and limit > 0:
+        stmt = stmt.limit(limit)
+
+    formato = formato_lista(ctx, formato)
+    if formato is not Formato.table:
+        n, last = stream_rows(iter_rows(stmt), list(GastoDeducible.model_fields), formato)
+        if page_size and n == page_size:
+            siguiente_pagina(last.fecha, last.id, err=True)
+        return
+
+    with get_session() as s:
+        gastos = list(s.exec(stmt).all())
+
+    t = Table(title="Gastos deducibles")
+    t.add_column("ID", justify="right")
+    t.add_column("Proveedor")
+    t.add_column("Fecha")
+    t.add_column("Trimestre")
+    t.add_column("Tipo")
+    t.add_column("Afecto (%)", justify="right")
+    t.add_column("Base (EUR)", justify="right")
+    t.add_column("IVA (EUR)", justify="right")
+    t.add_column("IVA ded.", justify="center")
+    t.add_column("TOTAL (EUR)", justify="right")
+
+    def _fmt_eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    def _fmt_pct(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    def _fmt_quarter(d: date) -> str:
+        q = ((d.month - 1) // 3) + 1
+        return f"{d.year}Q{q}"
+
+    def _fmt_fecha(d: date) -> str:
+        return d.strftime("%d-%m-%Y")
+
+    total_base = _Decimal("0.00")
+    total_iva = _Decimal("0.00")
+    total_total = _Decimal("0.00")
+
+    for g in gastos:
+        row_total = g.base_eur + g.cuota_iva
+        total_base += g.base_eur
+        total_iva += g.cuota_iva
+        total_total += row_total
+        t.add_row(
+            str(g.id or ""),
+            g.proveedor,
+            _fmt_fecha(g.fecha),
+            _fmt_quarter(g.fecha),
+            str(g.tipo or ""),
+            _fmt_pct(g.afecto_pct),
+            _fmt_eur(g.base_eur),
+            _fmt_eur(g.cuota_iva),
+            "✓" if g.iva_deducible else "[red]✗[/red]",
+            _fmt_eur(row_total),
+        )
+
+    if gastos:
+        # Fila en blanco de separación
+        t.add_row(*([""] * 10))
+        # Fila de totales (Base, IVA y TOTAL)
+        t.add_row(
+            "",
+            "",
+            "",
+            "",
+            "[bold]TOTAL[/bold]",
+            "",
+            f"[bold]{_fmt_eur(total_base)}[/bold]",
+            f"[bold]{_fmt_eur(total_iva)}[/bold]",
+            "",
+            f"[bold]{_fmt_eur(total_total)}[/bold]",
+        )
+
+    print(t)
+    if page_size and len(gastos) == page_size:
+        siguiente_pagina(gastos[-1].fecha, gastos[-1].id)
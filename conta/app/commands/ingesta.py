@@ -0,0 +1,65 @@
+import typer
+from rich import print
+
+from .common import Salida, emitir, salida
+
+
+app = typer.Typer()
+
+
+@app.command("ingest")
+def ingest(
+    ctx: typer.Context,
+    archivo: str = typer.Argument(..., help="Fichero CSV, JSON o JSONL con una fila por registro"),
+    kind: str = typer.Option(..., "--kind", help="Tipo de registro: factura, gasto o cuota"),
+    chunk: int = typer.Option(1000, "--chunk", min=1, help="Filas por lote (una transacción por lote)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Solo valida, no guarda nada"),
+    decimal: str | None = typer.Option(
+        None,
+        "--decimal",
+        help="Separador decimal de los importes: ',' o '.' (por defecto ',' si el CSV se separa con ';', si no '.')",
+    ),
+    max_errores: int = typer.Option(20, "--max-errores", help="Errores a mostrar como máximo"),
+):
+    """
+    Alta masiva de facturas, gastos o cuotas desde un fichero.
+    Las columnas son los campos de `conta emite` / `conta gasto` / `conta cuota`.
+    """
+    from dataclasses import asdict
+    from pathlib import Path
+    from ..services.ingesta import SEPARADORES, TIPOS, ingestar, leer_filas, separador_decimal
+
+    if kind not in TIPOS:
+        typer.secho(f"Tipo inválido. Usa uno de: {', '.join(TIPOS)}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    if decimal is not None and decimal not in SEPARADORES:
+        typer.secho("Separador decimal inválido. Usa ',' o '.'", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    if not Path(archivo).is_file():
+        typer.secho(f"No existe el fichero {archivo}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    try:
+        # Un único formato de número para todo el fichero
+        decimal = decimal or separador_decimal(archivo)
+        res = ingestar(kind, leer_filas(archivo), chunk=chunk, dry_run=dry_run, decimal=decimal)
+    except ValueError as e:
+        # JSON mal formado o CSV ilegible: no se ha podido leer el fichero
+        typer.secho(f"No se pudo leer {archivo}: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    if (modo := salida(ctx)) is not Salida.table:
+        emitir(asdict(res) | {"dry_run": dry_run}, modo)
+    else:
+        for fila, msg in res.errores[:max_errores]:
+            print(f"[red]✗ fila {fila}: {msg}[/red]")
+        if len(res.errores) > max_errores:
+            print(f"[red]… y {len(res.errores) - max_errores} errores más[/red]")
+        verbo = "se insertarían" if dry_run else "insertadas"
+        print(
+            f"[green]✓ {res.leidas} filas leídas: {res.insertadas} {verbo}, "
+            f"{res.duplicadas} duplicadas omitidas, {len(res.errores)} con errores[/green]"
+        )
+
+    if res.errores:
+        raise typer.Exit(code=1)
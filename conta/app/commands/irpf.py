@@ -0,0 +1,250 @@
+import typer
+from rich import print
+
+from .common import Salida, como_dict, emitir, salida
+
+
+app = typer.Typer()
+
+
+@app.command("pagar-m130")
+def pagar_m130(
+    periodo: str = typer.Argument(..., help="Formato YYYYQ#, ej: 2025Q3"),
+    importe: str = typer.Argument(..., help="Importe ingresado (0 si resultado negativo)"),
+    resultado: str = typer.Option("0", "--resultado", help="Resultado real del cálculo, puede ser negativo. Ej: --resultado -115.64"),
+):
+    """
+    Registra el pago de un Modelo 130 presentado.
+    Imprescindible para el cálculo correcto de trimestres posteriores.
+    """
+    from ..db import get_session
+    from ..models import PagoFraccionado130
+    from datetime import date
+    from decimal import Decimal, ROUND_HALF_UP
+    from sqlmodel import select
+
+    def _parse_importe(v: str) -> Decimal:
+        normalized = v.strip().replace(" ", "").replace(",", ".")
+        return Decimal(normalized)
+
+    try:
+        year = int(periodo[:4])
+        q = int(periodo[-1])
+        if q not in (1, 2, 3, 4):
+            raise ValueError
+    except ValueError:
+        typer.secho("Periodo inválido. Usa YYYYQ#", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    try:
+        importe_dec = _parse_importe(importe)
+    except Exception:
+        typer.secho("Importe inválido. Usa formato 123.45 (o 123,45)", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    try:
+        resultado_dec = _parse_importe(resultado)
+    except Exception:
+        typer.secho("Resultado inválido. Usa formato -115.64 (o -115,64)", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    if importe_dec < 0:  # ← cambiado de <= a 
+        typer.secho("El importe ingresado no puede ser negativo", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    with get_session() as s:
+        existente = s.exec(
+            select(PagoFraccionado130).where(
+                PagoFraccionado130.year == year,
+                PagoFraccionado130.quarter == q,
+            )
+        ).first()
+
+        if existente:
+            typer.secho(f"Ya existe un pago registrado para {periodo}", fg=typer.colors.RED)
+            raise typer.Exit(1)
+
+        pago = PagoFraccionado130(
+            year=year,
+            quarter=q,
+            importe=importe_dec.quantize(Decimal("0.01")),
+            resultado=resultado_dec.quantize(Decimal("0.01")),  # ← NUEVO
+            fecha_pago=date.today(),
+        )
+
+        s.add(pago)
+        s.commit()
+
+    typer.secho(
+        f"✔ Pago fraccionado 130 registrado: {periodo} → ingresado: {importe_dec.quantize(Decimal('0.01'))} € | resultado: {resultado_dec.quantize(Decimal('0.01'))} €",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command("pagos-130")
+def list_pagos_130(
+    ctx: typer.Context,
+    year: int | None = typer.Option(None, "--year", help="Filtrar por año, ej: 2026"),
+):
+    """Lista los pagos fraccionados del Modelo 130 registrados."""
+    from ..db import get_session
+    from ..models import PagoFraccionado130
+    from sqlmodel import select
+    from rich.table import Table
+    from decimal import Decimal as _Decimal
+
+    stmt = select(PagoFraccionado130)
+    if year is not None:
+        stmt = stmt.where(PagoFraccionado130.year == year)
+    stmt = stmt.order_by(PagoFraccionado130.year, PagoFraccionado130.quarter)
+
+    with get_session() as s:
+        pagos = list(s.exec(stmt).all())
+
+    if (modo := salida(ctx)) is not Salida.table:
+        emitir([como_dict(p) for p in pagos], modo)
+        return
+
+    if not pagos:
+        typer.secho("No hay pagos registrados.", fg=typer.colors.YELLOW)
+        return
+
+    def eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    t = Table(title="Pagos fraccionados – Modelo 130")
+    t.add_column("ID", justify="right")
+    t.add_column("Periodo")
+    t.add_column("Fecha pago")
+    t.add_column("Resultado (€)", justify="right")
+    t.add_column("Ingresado (€)", justify="right")
+
+    total_ingresado = _Decimal("0.00")
+
+    for p in pagos:
+        periodo = f"{p.year}Q{p.quarter}"
+        resultado_str = eur(p.resultado) if hasattr(p, 'resultado') else "—"
+        t.add_row(
+            str(p.id or ""),
+            periodo,
+            p.fecha_pago.strftime("%d-%m-%Y"),
+            resultado_str,
+            eur(p.importe),
+        )
+        total_ingresado += p.importe
+
+    t.add_row("", "", "", "", "")
+    t.add_row(
+        "",
+        "",
+        "[bold]TOTAL ingresado[/bold]",
+        "",
+        f"[bold]{eur(total_ingresado)}[/bold]",
+    )
+
+    print(t)
+
+
+@app.command("m130")
+def calcular_m130(
+    ctx: typer.Context,
+    periodo: str = typer.Argument(..., help="Formato YYYYQ#, ej: 2025Q4"),
+    solo_programacion: bool = typer.Option(
+        False,
+        "--solo-programacion",
+        help="Modo análisis (NO oficial)",
+    ),
+):
+    """
+    Modelo 130 – IRPF (apartado I).
+    Reproducción fiel del modelo AEAT (acumulado).
+    """
+    from ..services.irpf import irpf_snapshot_acumulado
+    from decimal import Decimal
+    from rich.table import Table
+
+    year = int(periodo[:4])
+    q = int(periodo[-1])
+
+    r = irpf_snapshot_acumulado(year, q, solo_programacion)
+
+    if (modo := salida(ctx)) is not Salida.table:
+        emitir({"periodo": periodo, **r}, modo)
+        return
+
+    def eur(v: Decimal) -> str:
+        return format(v.quantize(Decimal("0.01")), "f")
+
+    def eur_neg(v: Decimal) -> str:
+        """Como eur(), pero antepone '-' solo si el valor no es cero
+        (evita mostrar '-0.00' cuando la casilla no aplica)."""
+        v = v.quantize(Decimal("0.01"))
+        if v == 0:
+            return eur(v)
+        return f"-{eur(v)}"
+
+    t = Table(title=f"Modelo 130 – IRPF ({periodo})")
+    t.add_column("Casilla", justify="right")
+    t.add_column("Concepto")
+    t.add_column("Importe (€)", justify="right")
+
+    t.add_row("01", "Ingresos computables (acumulado)", eur(r["ingresos"]))
+    t.add_row("02", "Gastos deducibles + Cuotas SS", eur_neg(r["gastos"]))
+    t.add_row("03", "Rendimiento neto", eur(r["rendimiento"]))
+    t.add_row("04", "20 % del rendimiento", eur(r["base_20"]))
+    t.add_row("05", "Pagos fraccionados anteriores", eur_neg(r["pagos_previos"]))
+    t.add_row("06", "Retenciones soportadas", eur_neg(r["retenciones"]))
+    t.add_row(
+        "07",
+        "[bold]Resultado pago fraccionado[/bold]",
+        f"[bold]{eur(r['resultado'])}[/bold]",
+    )
+
+    print(t)
+
+    d = r["detalle"]
+    td = Table(title="Detalle informativo (no oficial)")
+    td.add_column("Concepto")
+    td.add_column("Importe (€)", justify="right")
+    td.add_row("Gastos sin SS", eur(d["gastos_sin_cuotas"]))
+    td.add_row("Cuotas autónomos", eur(d["cuotas_ss"]))
+    print(td)
+
+    if q == 4 and not solo_programacion:
+        print("[cyan]ℹ️  El 4º trimestre regulariza todo el ejercicio.[/cyan]")    
+
+
+@app.command("irpf")
+def ver_irpf(
+    ctx: typer.Context,
+    periodo: str = typer.Argument(..., help="Formato YYYYQ#, ej: 2025Q3"),
+):
+    """Muestra retenciones soportadas (IRPF) de un trimestre."""
+    from rich.table import Table
+    from ..services.irpf import irpf_snapshot_acumulado
+    from decimal import Decimal as _Decimal
+
+    try:
+        year = int(periodo[:4])
+        q = int(periodo[-1])
+        if q not in (1, 2, 3, 4):
+            raise ValueError
+    except ValueError:
+        typer.secho("Periodo inválido. Usa formato YYYYQ#, ej: 2025Q3", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    r = irpf_snapshot_acumulado(year, q, solo_programacion=False)
+
+    if (modo := salida(ctx)) is not Salida.table:
+        # El acumulado completo, como `conta 130` y `conta iva`
+        emitir({"periodo": periodo, **r}, modo)
+        return
+
+    def eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    t = Table(title=f"IRPF – Retenciones soportadas ({periodo})")
+    t.add_column("Concepto")
+    t.add_column("Importe (EUR)", justify="right")
+    t.add_row("Retenciones soportadas", eur(r["retenciones"]))
+    print(t)
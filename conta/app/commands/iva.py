@@ -0,0 +1,359 @@
+import typer
+from rich import print
+
+from .common import Salida, como_dict, emitir, salida
+
+
+app = typer.Typer()
+
+
+@app.command("iva")
+def calcular_iva(
+    ctx: typer.Context,
+    periodo: str | None = typer.Argument(
+        None, help="Periodo en formato YYYYQ#, ej: 2025Q3"
+    ),
+    year: int | None = typer.Option(
+        None,
+        "--year",
+        help="Año completo, ej: 2025. Suma los 4 trimestres",
+    ),
+):
+    """Calcula y muestra el IVA a pagar de un trimestre o año (modelo 303)."""
+    from rich.table import Table
+    from ..services.iva import iva_trimestre
+    from decimal import Decimal as _Decimal
+
+    if (periodo is None) and (year is None):
+        typer.secho(
+            "Debes indicar un periodo YYYYQ# o un --year YYYY",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+
+    if (periodo is not None) and (year is not None):
+        typer.secho(
+            "No puedes combinar periodo y --year en la misma llamada",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+
+    # Cálculo trimestral
+    if periodo is not None:
+        try:
+            year_p = int(periodo[:4])
+            q = int(periodo[-1])
+            if q not in (1, 2, 3, 4):
+                raise ValueError
+        except ValueError:
+            typer.secho(
+                "Periodo inválido. Usa formato YYYYQ#, ej: 2025Q3",
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(code=1)
+
+        res = iva_trimestre(year_p, q)
+        titulo = f"IVA – Modelo 303 ({periodo})"
+    else:
+        # Cálculo anual sumando los 4 trimestres
+        if year is None or year < 1900 or year > 2100:
+            typer.secho(
+                "Año inválido. Usa un año tipo 2025",
+                fg=typer.colors.RED,
+            )
+            raise typer.Exit(code=1)
+
+        base_dev = _Decimal("0.00")
+        base_ded = _Decimal("0.00")
+        iva_dev = _Decimal("0.00")
+        iva_ded = _Decimal("0.00")
+
+        for q in (1, 2, 3, 4):
+            r_q = iva_trimestre(year, q)
+            base_dev += r_q["base_devengado"]
+            base_ded += r_q["base_deducible"]
+            iva_dev += r_q["iva_devengado"]
+            iva_ded += r_q["iva_deducible"]
+
+        resultado = iva_dev - iva_ded
+        res = {
+            "periodo": str(year),
+            "base_devengado": base_dev,
+            "base_deducible": base_ded,
+            "iva_devengado": iva_dev,
+            "iva_deducible": iva_ded,
+            "resultado": resultado,
+        }
+        titulo = f"IVA – Modelo 303 ({year} año completo)"
+
+    if (modo := salida(ctx)) is not Salida.table:
+        emitir(res, modo)
+        return
+
+    def _fmt_eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    t = Table(title=titulo)
+    t.add_column("Concepto")
+    t.add_column("Base (EUR)", justify="right")
+    t.add_column("Cuota (EUR)", justify="right")
+
+    # Bases: suma de bases de facturas emitidas / gastos deducibles (ponderados por afecto)
+    t.add_row(
+        "IVA devengado (ventas)",
+        _fmt_eur(res["base_devengado"]),
+        _fmt_eur(res["iva_devengado"]),
+    )
+    t.add_row(
+        "IVA deducible (compras)",
+        _fmt_eur(res["base_deducible"]),
+        _fmt_eur(res["iva_deducible"]),
+    )
+    t.add_row("", "", "")
+    t.add_row(
+        "[bold]Resultado[/bold]",
+        "",
+        f"[bold]{_fmt_eur(res['resultado'])}[/bold]",
+    )
+
+    print(t)
+
+    if res["resultado"] > 0:
+        print("[green]Resultado: IVA a ingresar[/green]")
+    elif res["resultado"] < 0:
+        print("[yellow]Resultado: IVA a compensar o devolver[/yellow]")
+    else:
+        print("[blue]Resultado: IVA neutro[/blue]")
+
+
+@app.command("presentar-303")
+def presentar_303(
+    periodo: str = typer.Argument(..., help="Formato YYYYQ#, ej: 2026Q1"),
+    resultado: str = typer.Argument(..., help="Resultado del 303 (positivo = a pagar, negativo = a devolver)"),
+    pagado: str = typer.Option("0", "--pagado", help="Importe realmente ingresado"),
+):
+    """Registra la presentación del Modelo 303 de un trimestre."""
+    from ..db import get_session
+    from ..models import Presentacion303
+    from sqlmodel import select
+    from decimal import Decimal
+    from datetime import date
+
+    def _parse(v: str) -> Decimal:
+        return Decimal(v.strip().replace(" ", "").replace(",", "."))
+
+    try:
+        year = int(periodo[:4])
+        q = int(periodo[-1])
+        if q not in (1, 2, 3, 4):
+            raise ValueError
+    except ValueError:
+        typer.secho("Periodo inválido. Usa YYYYQ#", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    try:
+        resultado_dec = _parse(resultado)
+        pagado_dec = _parse(pagado)
+    except Exception:
+        typer.secho("Importe inválido. Usa formato 123.45 (o 123,45)", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    with get_session() as s:
+        existente = s.exec(
+            select(Presentacion303).where(
+                Presentacion303.year == year,
+                Presentacion303.quarter == q,
+            )
+        ).first()
+
+        if existente:
+            typer.secho(f"Ya existe una presentación del 303 para {periodo}", fg=typer.colors.RED)
+            raise typer.Exit(1)
+
+        p = Presentacion303(
+            year=year,
+            quarter=q,
+            fecha_presentacion=date.today(),
+            resultado=resultado_dec.quantize(Decimal("0.01")),
+            importe_pagado=pagado_dec.quantize(Decimal("0.01")),
+        )
+        s.add(p)
+        s.commit()
+
+    typer.secho(
+        f"✔ 303 registrado: {periodo} → resultado: {resultado_dec.quantize(Decimal('0.01'))} € | pagado: {pagado_dec.quantize(Decimal('0.01'))} €",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command("presentaciones-303")
+def list_presentaciones_303(
+    ctx: typer.Context,
+    year: int | None = typer.Option(None, "--year", help="Filtrar por año, ej: 2026"),
+):
+    """Lista las presentaciones del Modelo 303 registradas."""
+    from ..db import get_session
+    from ..models import Presentacion303
+    from sqlmodel import select
+    from rich.table import Table
+    from decimal import Decimal as _Decimal
+
+    stmt = select(Presentacion303)
+    if year is not None:
+        stmt = stmt.where(Presentacion303.year == year)
+    stmt = stmt.order_by(Presentacion303.year, Presentacion303.quarter)
+
+    with get_session() as s:
+        presentaciones = list(s.exec(stmt).all())
+
+    if (modo := salida(ctx)) is not Salida.table:
+        emitir([como_dict(p) for p in presentaciones], modo)
+        return
+
+    if not presentaciones:
+        typer.secho("No hay presentaciones registradas.", fg=typer.colors.YELLOW)
+        return
+
+    def eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    t = Table(title="Presentaciones – Modelo 303")
+    t.add_column("ID", justify="right")
+    t.add_column("Periodo")
+    t.add_column("Fecha presentación")
+    t.add_column("Resultado (€)", justify="right")
+    t.add_column("Pagado (€)", justify="right")
+
+    total_pagado = _Decimal("0.00")
+
+    for p in presentaciones:
+        t.add_row(
+            str(p.id or ""),
+            f"{p.year}Q{p.quarter}",
+            p.fecha_presentacion.strftime("%d-%m-%Y"),
+            eur(p.resultado),
+            eur(p.importe_pagado),
+        )
+        total_pagado += p.importe_pagado
+
+    t.add_row("", "", "", "", "")
+    t.add_row(
+        "", "",
+        "[bold]TOTAL pagado[/bold]",
+        "",
+        f"[bold]{eur(total_pagado)}[/bold]",
+    )
+
+    print(t)
+
+
+@app.command("iva390")
+def calcular_iva390(
+    ctx: typer.Context,
+    anio: int = typer.Argument(..., help="Año completo, ej: 2025"),
+):
+    """Resumen anual de IVA – Modelo 390 para un año."""
+    from rich.table import Table
+    from ..services.iva import iva_trimestre
+    from decimal import Decimal as _Decimal
+
+    if anio < 1900 or anio > 2100:
+        typer.secho("Año inválido. Usa un año tipo 2025", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    total_base_dev = _Decimal("0.00")
+    total_base_ded = _Decimal("0.00")
+    total_dev = _Decimal("0.00")
+    total_ded = _Decimal("0.00")
+    detalles: list[tuple[str, _Decimal, _Decimal, _Decimal, _Decimal, _Decimal]] = []
+    trimestres: list[dict] = []
+
+    # Suma los cuatro trimestres del año y guarda detalle
+    for q in (1, 2, 3, 4):
+        res_q = iva_trimestre(anio, q)
+        trimestres.append(res_q)
+        base_dev_q = res_q["base_devengado"]
+        base_ded_q = res_q["base_deducible"]
+        iva_dev_q = res_q["iva_devengado"]
+        iva_ded_q = res_q["iva_deducible"]
+        resultado_q = res_q["resultado"]
+
+        total_base_dev += base_dev_q
+        total_base_ded += base_ded_q
+        total_dev += iva_dev_q
+        total_ded += iva_ded_q
+
+        detalles.append(
+            (
+                f"{anio}Q{q}",
+                base_dev_q,
+                base_ded_q,
+                iva_dev_q,
+                iva_ded_q,
+                resultado_q,
+            )
+        )
+
+    resultado_anual = total_dev - total_ded
+
+    if (modo := salida(ctx)) is not Salida.table:
+        resumen = {
+            "periodo": str(anio),
+            "base_devengado": total_base_dev,
+            "base_deducible": total_base_ded,
+            "iva_devengado": total_dev,
+            "iva_deducible": total_ded,
+            "resultado": resultado_anual,
+            "trimestres": trimestres,
+        }
+        emitir(resumen, modo)
+        return
+
+    def _fmt_eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    # Tabla resumen anual
+    t = Table(title=f"IVA – Modelo 390 ({anio})")
+    t.add_column("Concepto")
+    t.add_column("Importe (EUR)", justify="right")
+
+    t.add_row("IVA devengado (ventas)", _fmt_eur(total_dev))
+    t.add_row("IVA deducible (compras)", _fmt_eur(total_ded))
+    t.add_row("", "")
+    t.add_row("[bold]Resultado[/bold]", f"[bold]{_fmt_eur(resultado_anual)}[/bold]")
+
+    print(t)
+
+    # Tabla de detalle por trimestre
+    t_det = Table(title=f"Detalle trimestres IVA ({anio})")
+    t_det.add_column("Periodo")
+    t_det.add_column("Base devengada (EUR)", justify="right")
+    t_det.add_column("IVA devengado (EUR)", justify="right")
+    t_det.add_column("IVA deducible Base (EUR)", justify="right")
+    t_det.add_column("IVA deducible (EUR)", justify="right")
+    t_det.add_column("Resultado (EUR)", justify="right")
+
+    for periodo, base_dev_q, base_ded_q, iva_dev_q, iva_ded_q, res_q in detalles:
+        t_det.add_row(
+            periodo,
+            _fmt_eur(base_dev_q),
+            _fmt_eur(iva_dev_q),
+            _fmt_eur(base_ded_q),
+            _fmt_eur(iva_ded_q),
+            _fmt_eur(res_q),
+        )
+
+    if detalles:
+        # Fila en blanco de separación
+        t_det.add_row("", "", "", "", "", "")
+        # Fila de totales por columnas
+        t_det.add_row(
+            "[bold]TOTAL[/bold]",
+            f"[bold]{_fmt_eur(total_base_dev)}[/bold]",
+            f"[bold]{_fmt_eur(total_dev)}[/bold]",
+            f"[bold]{_fmt_eur(total_base_ded)}[/bold]",
+            f"[bold]{_fmt_eur(total_ded)}[/bold]",
+            f"[bold]{_fmt_eur(resultado_anual)}[/bold]",
+        )
+
+    print(t_det)
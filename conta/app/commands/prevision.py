@@ -0,0 +1,79 @@
+import typer
+from rich import print
+
+from .common import Salida, emitir, parse_fecha_cli, salida
+
+
+app = typer.Typer()
+
+
+@app.command("prevision")
+def ver_prevision(
+    ctx: typer.Context,
+    year: int | None = typer.Option(None, "--year", help="Ejercicio, ej: 2025 (por defecto el actual)"),
+    fecha: str | None = typer.Option(
+        None, "--fecha", help="Prever desde esta fecha DD-MM-YYYY o YYYY-MM-DD (por defecto hoy)"
+    ),
+):
+    """Previsión de los resultados del 303 y del 130 por trimestre y del ejercicio."""
+    from datetime import date as _date
+    from decimal import Decimal as _Decimal
+    from rich.table import Table
+    from ..services.prevision import prevision
+
+    try:
+        hoy = parse_fecha_cli(fecha) if fecha else _date.today()
+    except ValueError:
+        typer.secho("Fecha inválida. Usa DD-MM-YYYY o YYYY-MM-DD", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    year = year or hoy.year
+    if year < 1900 or year > 2100:
+        typer.secho("Año inválido. Usa un año tipo 2025", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    res = prevision(year, hoy)
+    if (modo := salida(ctx)) is Salida.jsonl:
+        # Una línea por trimestre
+        emitir(res["trimestres"], modo)
+        return
+    if modo is Salida.json:
+        emitir(res, modo)
+        return
+
+    def eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    t = Table(title=f"Previsión {year} (a {hoy:%d-%m-%Y})")
+    t.add_column("Trimestre")
+    t.add_column("Estado")
+    t.add_column("303 registrado (€)", justify="right")
+    t.add_column("303 previsto (€)", justify="right")
+    t.add_column("130 registrado (€)", justify="right")
+    t.add_column("130 previsto (€)", justify="right")
+    t.add_column("Rendimiento acum. (€)", justify="right")
+    for q in res["trimestres"]:
+        t.add_row(
+            f"{year}Q{q['trimestre']}",
+            q["estado"],
+            eur(q["iva_real"]),
+            eur(q["iva_resultado"]),
+            eur(q["m130_real"]),
+            eur(q["m130"]["resultado"]),
+            eur(q["m130"]["rendimiento"]),
+        )
+    anual = res["anual"]
+    t.add_section()
+    t.add_row(
+        "[bold]Ejercicio[/bold]",
+        "",
+        "",
+        f"[bold]{eur(anual['iva_resultado'])}[/bold]",
+        "",
+        f"[bold]{eur(anual['m130_a_ingresar'])}[/bold]",
+        eur(anual["rendimiento"]),
+    )
+    print(t)
+    print(
+        "[dim]Lo que falta de cada mes se estima con el ritmo de los últimos 12 meses "
+        "y la estacionalidad de ejercicios anteriores.[/dim]"
+    )
@@ -0,0 +1,151 @@
+import typer
+from rich import print
+
+from .common import Salida, emitir, parse_fecha_cli, salida
+
+
+app = typer.Typer()
+
+
+def _error(msg: str):
+    typer.secho(msg, fg=typer.colors.RED)
+    raise typer.Exit(code=1)
+
+
+def _partir(spec: str, fecha_def):
+    """'IMPORTE[:OPCION][@FECHA]' -> (importe, opcion o None, fecha)."""
+    from decimal import Decimal as _Decimal, InvalidOperation
+
+    resto, _, fecha = spec.partition("@")
+    importe, _, opcion = resto.partition(":")
+    try:
+        # Admite coma decimal (529,32)
+        importe = _Decimal(importe.strip().replace(",", "."))
+        fecha = parse_fecha_cli(fecha.strip()) if fecha else fecha_def
+    except (InvalidOperation, ValueError):
+        _error(f"Fila simulada inválida: {spec!r}")
+    return importe, opcion.strip() or None, fecha
+
+
+@app.command("simula")
+def simula(
+    ctx: typer.Context,
+    periodo: str = typer.Argument(..., help="Periodo en formato YYYYQ#, ej: 2025Q3"),
+    facturas: list[str] = typer.Option(
+        [], "--factura", help="Factura hipotética BASE[:ACTIVIDAD][@FECHA]; repetible"
+    ),
+    gastos: list[str] = typer.Option([], "--gasto", help="Gasto hipotético BASE[:TIPO_IVA][@FECHA]; repetible"),
+    cuotas: list[str] = typer.Option([], "--cuota", help="Cuota de autónomos hipotética IMPORTE[@FECHA]; repetible"),
+    escenarios: str | None = typer.Option(
+        None,
+        "--escenarios",
+        help="JSON/JSONL con un escenario por elemento: {nombre, facturas, gastos, cuotas}",
+    ),
+    solo_programacion: bool = typer.Option(False, "--solo-programacion", help="Modo análisis (NO oficial)"),
+):
+    """
+    Simula el 303 y el 130 de un trimestre con facturas, gastos o cuotas
+    hipotéticos, sin guardar nada. Sin fecha, cuentan el último día del trimestre.
+    """
+    from decimal import Decimal as _Decimal, InvalidOperation
+    from pathlib import Path
+    from pydantic import ValidationError
+    from rich.table import Table
+    from ..models import Actividad
+    from ..services.ingesta import leer_filas
+    from ..services.irpf import quarter_end
+    from ..services.simulacion import cuota, escenario, factura, gasto, simular
+
+    try:
+        year = int(periodo[:4])
+        q = int(periodo[-1])
+        if len(periodo) != 6 or periodo[4].upper() != "Q" or q not in (1, 2, 3, 4):
+            raise ValueError
+    except ValueError:
+        _error("Periodo inválido. Usa formato YYYYQ#, ej: 2025Q3")
+    fin = quarter_end(year, q)
+
+    # Escenarios a comparar: (nombre, filas hipotéticas)
+    lista: list[tuple[str, list]] = []
+    try:
+        if facturas or gastos or cuotas:
+            filas = []
+            for spec in facturas:
+                base, actividad, fecha = _partir(spec, fin)
+                filas.append(factura(base, fecha, Actividad(actividad or Actividad.programacion)))
+            for spec in gastos:
+                base, tipo, fecha = _partir(spec, fin)
+                try:
+                    tipo = None if tipo is None else _Decimal(tipo.replace(",", "."))
+                except InvalidOperation:
+                    _error(f"Tipo de IVA inválido: {spec!r}")
+                filas.append(gasto(base, fecha, tipo))
+            for spec in cuotas:
+                importe, _, fecha = _partir(spec, fin)
+                filas.append(cuota(importe, fecha))
+            lista.append(("simulado", filas))
+        if escenarios is not None:
+            if not Path(escenarios).is_file():
+                _error(f"No existe el fichero {escenarios}")
+            for i, d in enumerate(leer_filas(escenarios), start=1):
+                lista.append((str(d.get("nombre") or f"escenario {i}"), escenario(d, fin)))
+    except ValueError as e:
+        # ValidationError es un ValueError: se muestra su mensaje tal cual
+        msg = e.errors()[0]["msg"] if isinstance(e, ValidationError) else str(e)
+        _error(f"Escenario inválido: {msg}")
+    if not lista:
+        _error("Indica al menos una --factura, --gasto, --cuota o un fichero de --escenarios")
+
+    actual = simular(year, q, [], solo_programacion)
+    resultados = [{"nombre": nombre, **simular(year, q, filas, solo_programacion)} for nombre, filas in lista]
+
+    if (modo := salida(ctx)) is Salida.jsonl:
+        emitir(resultados, modo)
+        return
+    if modo is Salida.json:
+        emitir({"periodo": periodo, "actual": actual, "escenarios": resultados}, modo)
+        return
+
+    def eur(v: _Decimal) -> str:
+        return format(v.quantize(_Decimal("0.01")), "f")
+
+    def dif(a: _Decimal, b: _Decimal) -> str:
+        d = b - a
+        return f"{'+' if d > 0 else ''}{eur(d)}" if d else ""
+
+    if len(resultados) == 1:
+        sim = resultados[0]
+        t = Table(title=f"Simulación {periodo}")
+        t.add_column("Concepto")
+        t.add_column("Actual (€)", justify="right")
+        t.add_column("Simulado (€)", justify="right")
+        t.add_column("Diferencia (€)", justify="right")
+        for modelo, clave, concepto in (
+            ("iva", "iva_devengado", "IVA devengado"),
+            ("iva", "iva_deducible", "IVA deducible"),
+            ("iva", "resultado", "[bold]Resultado 303[/bold]"),
+            ("m130", "ingresos", "Ingresos (acumulado)"),
+            ("m130", "gastos", "Gastos + cuotas SS (acumulado)"),
+            ("m130", "rendimiento", "Rendimiento neto"),
+            ("m130", "retenciones", "Retenciones"),
+            ("m130", "resultado", "[bold]Resultado 130[/bold]"),
+        ):
+            a, b = actual[modelo][clave], sim[modelo][clave]
+            t.add_row(concepto, eur(a), eur(b), dif(a, b))
+        t.add_section()
+        t.add_row("[bold]A ingresar[/bold]", eur(actual["total"]), eur(sim["total"]), dif(actual["total"], sim["total"]))
+    else:
+        t = Table(title=f"Escenarios {periodo}")
+        t.add_column("Escenario")
+        t.add_column("Resultado 303 (€)", justify="right")
+        t.add_column("Resultado 130 (€)", justify="right")
+        t.add_column("A ingresar (€)", justify="right")
+        t.add_column("Diferencia (€)", justify="right")
+        t.add_row(
+            "[dim](actual)[/dim]", eur(actual["iva"]["resultado"]), eur(actual["m130"]["resultado"]), eur(actual["total"]), ""
+        )
+        for r in resultados:
+            t.add_row(
+                r["nombre"], eur(r["iva"]["resultado"]), eur(r["m130"]["resultado"]), eur(r["total"]), dif(actual["total"], r["total"])
+            )
+    print(t)
@@ -0,0 +1,67 @@
+import typer
+from rich import print
+
+from .common import Salida, emitir, salida
+
+
+app = typer.Typer()
+
+
+@app.command("verify")
+def verify(
+    ctx: typer.Context,
+    year: int | None = typer.Option(None, "--year", help="Ejercicio, ej: 2025 (por defecto todos)"),
+    tolerancia: str = typer.Option("0", "--tolerancia", help="Diferencia admitida en euros, ej: 0.01"),
+):
+    """
+    Recalcula el resultado de cada 303 y 130 presentado y lo compara con el
+    registrado. Sale con código 1 si hay discrepancias.
+    """
+    from decimal import Decimal as _Decimal, InvalidOperation
+    from rich.table import Table
+    from ..services.verificacion import verificar
+
+    try:
+        tol = _Decimal(tolerancia.strip().replace(",", "."))
+        if tol < 0:
+            raise InvalidOperation
+    except InvalidOperation:
+        typer.secho("Tolerancia inválida. Usa formato 0.01 (o 0,01)", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    filas = verificar(year, tol)
+    errores = [f for f in filas if not f["ok"]]
+
+    if (modo := salida(ctx)) is not Salida.table:
+        emitir(filas, modo)
+    elif not filas:
+        typer.secho("No hay presentaciones registradas.", fg=typer.colors.YELLOW)
+    else:
+
+        def eur(v: _Decimal) -> str:
+            return format(v.quantize(_Decimal("0.01")), "f")
+
+        t = Table(title=f"Verificación de presentaciones{f' {year}' if year else ''}")
+        t.add_column("Periodo")
+        t.add_column("Modelo")
+        t.add_column("Presentado (€)", justify="right")
+        t.add_column("Calculado (€)", justify="right")
+        t.add_column("Diferencia (€)", justify="right")
+        t.add_column("")
+        for f in filas:
+            t.add_row(
+                f["periodo"],
+                f["modelo"],
+                eur(f["presentado"]),
+                eur(f["calculado"]),
+                eur(f["diferencia"]) if f["diferencia"] else "",
+                "[green]✔[/green]" if f["ok"] else "[red]✘[/red]",
+            )
+        print(t)
+        if errores:
+            typer.secho(f"{len(errores)} de {len(filas)} presentaciones no cuadran", fg=typer.colors.RED)
+        else:
+            typer.secho(f"✔ Las {len(filas)} presentaciones cuadran", fg=typer.colors.GREEN)
+
+    if errores:
+        raise typer.Exit(code=1)
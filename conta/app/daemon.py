@@ -0,0 +1,273 @@
+"""
+Modo servidor (`conta serve --socket RUTA`) y cliente ligero.
+
+`conta serve` deja cargados el motor de SQLAlchemy, los mappers del ORM y todos
+los módulos de comandos, y ejecuta las invocaciones que le llegan por un socket
+Unix. `main()` es el punto de entrada del ejecutable `conta`: si CONTA_SOCKET
+apunta a un servidor activo le reenvía la invocación (argumentos, directorio,
+tamaño de terminal) y reproduce su salida y código de salida; si no hay
+servidor, ejecuta el CLI en el propio proceso como siempre.
+
+A nivel de módulo solo se importa la biblioteca estándar, para que el cliente
+arranque lo antes posible.
+"""
+
+import io
+import json
+import os
+import socket
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+
+SOCKET_ENV = "CONTA_SOCKET"
+
+# Nunca se reenvían: el propio servidor, la TUI (interactiva) y la instalación
+# del autocompletado, que actúa sobre la shell del usuario.
+LOCAL_COMMANDS = {"serve", "tui", "--install-completion", "--show-completion"}
+
+# Variables del cliente que cambian cómo se formatea la salida
+OUTPUT_ENV = ("TERM", "COLORTERM", "NO_COLOR", "FORCE_COLOR", "TTY_COMPATIBLE", "TTY_INTERACTIVE")
+
+
+# ---------------------------------------------------------------------------
+# Cliente
+# ---------------------------------------------------------------------------
+
+
+def _terminal_size() -> tuple[int, int]:
+    # Mismo criterio que rich: COLUMNS/LINES y, si no, el primer descriptor
+    # estándar que sea una terminal (aunque la salida vaya a una tubería).
+    width = height = None
+    if os.environ.get("TERM", "").lower() not in ("dumb", "unknown"):
+        for fd in (0, 1, 2):
+            try:
+                width, height = os.get_terminal_size(fd)
+                break
+            except OSError:
+                continue
+    columns, lines = os.environ.get("COLUMNS", ""), os.environ.get("LINES", "")
+    if columns.isdigit():
+        width = int(columns)
+    if lines.isdigit():
+        height = int(lines)
+    return width or 80, height or 25
+
+
+def _recv_all(sock: socket.socket) -> bytes:
+    chunks = []
+    while chunk := sock.recv(65536):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def forward(argv: list[str], socket_path: str) -> int | None:
+    """Ejecuta `conta <argv>` en el servidor y escribe su salida.
+
+    Devuelve el código de salida, o None si el comando debe ejecutarse en
+    local: no hay servidor escuchando o trabaja con otra base de datos."""
+    width, height = _terminal_size()
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "db_path": os.environ.get("CONTA_DB_PATH"),
+        "env": {k: os.environ[k] for k in OUTPUT_ENV if k in os.environ},
+        "size": [width, height],
+        "isatty": [sys.stdout.isatty(), sys.stderr.isatty()],
+    }
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+
+    # A partir de aquí el servidor puede haber ejecutado ya el comando: un
+    # fallo no debe hacer que se repita en local.
+    try:
+        with sock:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            response = json.loads(_recv_all(sock))
+    except (OSError, ValueError) as e:
+        print(f"Error comunicando con el servidor en {socket_path}: {e}", file=sys.stderr)
+        return 1
+
+    if response.get("local"):
+        return None
+    sys.stdout.write(response["stdout"])
+    sys.stdout.flush()
+    sys.stderr.write(response["stderr"])
+    return response["code"]
+
+
+def main() -> None:
+    """Punto de entrada del ejecutable `conta`."""
+    argv = sys.argv[1:]
+    socket_path = os.environ.get(SOCKET_ENV)
+    forwardable = (
+        socket_path
+        # Las opciones globales (--output) pueden ir antes del comando; en la
+        # duda se ejecuta en local, que solo es más lento
+        and LOCAL_COMMANDS.isdisjoint(argv)
+        and "_CONTA_COMPLETE" not in os.environ
+    )
+    if forwardable:
+        code = forward(argv, socket_path)
+        if code is not None:
+            sys.exit(code)
+
+    from .cli import app
+
+    app()
+
+
+# ---------------------------------------------------------------------------
+# Servidor
+# ---------------------------------------------------------------------------
+
+
+class _Capture(io.StringIO):
+    """Buffer que se presenta como terminal si la salida del cliente lo es,
+    para que rich y click decidan colores igual que en la ejecución directa."""
+
+    def __init__(self, tty: bool) -> None:
+        super().__init__()
+        self._tty = tty
+
+    def isatty(self) -> bool:
+        return self._tty
+
+
+def _exit_code(e: SystemExit) -> int:
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+def _run(app, request: dict) -> dict:
+    """Ejecuta una invocación con el entorno, directorio y terminal del cliente."""
+    import traceback
+
+    import rich
+
+    out = _Capture(request["isatty"][0])
+    err = _Capture(request["isatty"][1])
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    saved_stdin = sys.stdin
+    width, height = request["size"]
+    try:
+        for k in OUTPUT_ENV:
+            os.environ.pop(k, None)
+        os.environ.update(request["env"])
+        os.environ["COLUMNS"], os.environ["LINES"] = str(width), str(height)
+        os.chdir(request["cwd"])
+        sys.stdin = io.StringIO()
+        with redirect_stdout(out), redirect_stderr(err):
+            # La consola global de rich lee el entorno al crearse
+            rich.reconfigure()
+            try:
+                app(args=request["argv"], prog_name="conta")
+                code = 0
+            except SystemExit as e:
+                code = _exit_code(e)
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        sys.stdin = saved_stdin
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+    return {"code": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+
+def _recv_line(conn: socket.socket) -> bytes:
+    buf = b""
+    while not buf.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+    return buf
+
+
+def _claim(socket_path: str) -> None:
+    """Elimina un socket abandonado; falla si hay un servidor respondiendo."""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise RuntimeError(f"Ya hay un servidor escuchando en {socket_path}")
+    finally:
+        probe.close()
+
+
+def serve(socket_path: str, on_ready=None) -> None:
+    """Atiende invocaciones en `socket_path` hasta recibir SIGINT/SIGTERM.
+
+    Las peticiones se atienden de una en una: cada una cambia el directorio de
+    trabajo, el entorno y la salida estándar del proceso."""
+    import signal
+
+    from dotenv import dotenv_values, find_dotenv
+
+    # Misma resolución que db.py (variable de entorno, .env o ./conta.db),
+    # fijada como ruta absoluta porque el servidor cambia de directorio.
+    file_setting = dotenv_values(find_dotenv()).get("CONTA_DB_PATH")
+
+    def resolve(setting: str | None, cwd: str) -> str:
+        return os.path.normpath(os.path.join(cwd, setting or file_setting or "./conta.db"))
+
+    db_path = resolve(os.environ.get("CONTA_DB_PATH"), os.getcwd())
+    os.environ["CONTA_DB_PATH"] = db_path
+
+    from sqlalchemy.orm import configure_mappers
+
+    from . import db, models  # noqa: F401  (registra las tablas)
+    from .cli import COMMANDS, _module_group, app
+
+    configure_mappers()
+    for module_name in dict.fromkeys(COMMANDS.values()):
+        _module_group(module_name)
+    with db.engine.connect():
+        pass
+
+    # Las cachés en memoria se invalidan con db.data_version, que también ve
+    # los commits de otras conexiones (la TUI, un `conta` sin servidor...)
+    db.data_version()
+
+    _claim(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen()
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    if on_ready is not None:
+        on_ready(db_path)
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    request = json.loads(_recv_line(conn))
+                    if resolve(request["db_path"], request["cwd"]) != db_path:
+                        response = {"local": True}
+                    else:
+                        response = _run(app, request)
+                    conn.sendall(json.dumps(response).encode())
+                except (OSError, ValueError, KeyError):
+                    continue  # cliente desconectado o petición mal formada
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
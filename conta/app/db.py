@@ -1,8 +1,14 @@
 
-from contextlib import contextmanager
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from functools import wraps
+from itertools import chain
 import os
+import sqlite3
+import threading
 
 from dotenv import load_dotenv
+from sqlalchemy import event
 from sqlmodel import SQLModel, Session, create_engine
 
 
@@ -10,17 +16,194 @@ load_dotenv()
 
 
 DB_PATH = os.getenv("CONTA_DB_PATH", "./conta.db")
+# El pool por defecto (5 + 10) se queda corto para la API: FastAPI ejecuta los
+# endpoints síncronos en un pool de 40 hilos y cada petición tiene su sesión.
+# Las conexiones SQLite son baratas, así que se permiten más y se espera
+# poco por una libre antes de fallar.
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("CONTA_DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("CONTA_DB_MAX_OVERFLOW", "30")),
+    "pool_timeout": float(os.getenv("CONTA_DB_POOL_TIMEOUT", "10")),
+}
 engine = create_engine(
     f"sqlite:///{DB_PATH}",
     connect_args={"check_same_thread": False},
+    **POOL_OPTIONS,
 )
 
 
+def _casefold(v: str | None) -> str | None:
+    return v.casefold() if v is not None else None
+
+
+@event.listens_for(engine, "connect")
+def _register_functions(dbapi_conn, _record) -> None:
+    # lower() de SQLite solo pasa a minúsculas ASCII; casefold() sirve para
+    # búsquedas sin distinguir mayúsculas en nombres con acentos o Ñ.
+    dbapi_conn.create_function("casefold", 1, _casefold, deterministic=True)
+
+
+@event.listens_for(engine, "first_connect")
+def _migrar(dbapi_conn, record) -> None:
+    # Una vez por proceso: aplica las migraciones pendientes (ver migraciones.py).
+    # first_connect llega antes que connect: las migraciones usan casefold()
+    from .migraciones import migrar
+
+    _register_functions(dbapi_conn, record)
+    migrar(dbapi_conn)
+
+
+# Versión de datos por tabla: cada commit que escribe en una tabla la
+# incrementa. Las cachés (p.ej. las tarjetas del dashboard) guardan la versión
+# con la que calcularon y solo recalculan cuando alguna de sus tablas cambia.
+_versions: Counter[str] = Counter()
+_versions_lock = threading.Lock()
+
+# Las escrituras de otros procesos (la CLI con la TUI abierta, la API, el
+# daemon...) no pasan por los eventos de sesión de este. PRAGMA data_version
+# de una conexión propia cambia cuando cualquier otra conexión hace commit:
+# si ha cambiado desde la última lectura se invalidan todas las tablas.
+_watch: sqlite3.Connection | None = None
+_watch_version: int | None = None
+
+
+def bump_data_version(*tables: str) -> None:
+    with _versions_lock:
+        for t in tables:
+            _versions[t] += 1
+
+
+def _sync_external_writes() -> None:
+    # Con _versions_lock tomado
+    global _watch, _watch_version
+    try:
+        if _watch is None:
+            _watch = sqlite3.connect(DB_PATH, check_same_thread=False)
+        version = _watch.execute("PRAGMA data_version").fetchone()[0]
+    except sqlite3.Error:
+        return
+    if _watch_version is not None and version != _watch_version:
+        for t in SQLModel.metadata.tables:
+            _versions[t] += 1
+    _watch_version = version
+
+
+def data_version(*tables: str) -> tuple[int, ...]:
+    with _versions_lock:
+        _sync_external_writes()
+        return tuple(_versions[t] for t in tables)
+
+
+def cache_por_version(*tables: str):
+    """Decorador: guarda el resultado de la función por argumentos y lo
+    reutiliza mientras no cambie la versión de datos de `tables` (también
+    por escrituras de otros procesos, ver data_version)."""
+
+    def decorador(fn):
+        cache: dict[tuple, tuple[tuple[int, ...], object]] = {}
+        lock = threading.Lock()
+
+        @wraps(fn)
+        def envoltorio(*args):
+            # La versión se lee antes de calcular: una escritura que llegue
+            # mientras tanto la vuelve a subir y no se dará por bueno el valor
+            version = data_version(*tables)
+            with lock:
+                hit = cache.get(args)
+            if hit is not None and hit[0] == version:
+                return hit[1]
+            valor = fn(*args)
+            with lock:
+                cache[args] = (version, valor)
+            return valor
+
+        envoltorio.cache_clear = cache.clear
+        return envoltorio
+
+    return decorador
+
+
+def _pending_tables(session) -> set[str]:
+    return session.info.setdefault("conta_written_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, _flush_context) -> None:
+    # En after_flush new/dirty/deleted aún reflejan lo que se acaba de escribir
+    _pending_tables(session).update(
+        obj.__table__.name
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if hasattr(obj, "__table__")
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk(state) -> None:
+    # INSERT/UPDATE/DELETE en bloque (insert(Model), update(Model)...) no pasan por flush
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if table is not None:
+            _pending_tables(state.session).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session) -> None:
+    # Se incrementa tras el commit (no en el flush) para que nadie pueda cachear
+    # datos antiguos con la versión nueva.
+    tables = session.info.pop("conta_written_tables", None)
+    if tables:
+        bump_data_version(*tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session) -> None:
+    session.info.pop("conta_written_tables", None)
+
+
 @contextmanager
 def get_session():
     with Session(engine) as session:
         yield session
 
 
+# Motor asíncrono opcional (pip install conta-mvp[async]): lo usan la API y las
+# variantes *_async de los servicios. Se crea en el primer uso para que el
+# resto de la aplicación no necesite aiosqlite.
+_async_engine = None
+
+
+def async_available() -> bool:
+    from importlib.util import find_spec
+
+    return find_spec("aiosqlite") is not None and find_spec("greenlet") is not None
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        _async_engine = create_async_engine(f"sqlite+aiosqlite:///{DB_PATH}", **POOL_OPTIONS)
+        event.listen(_async_engine.sync_engine, "connect", _register_functions)
+        # Las migraciones van por el motor síncrono (su primera conexión)
+        engine.connect().close()
+    return _async_engine
+
+
+@asynccontextmanager
+async def get_async_session():
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
 def init_db():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    from .migraciones import migrar
+    from .services.busqueda import asegurar_indices
+
+    SQLModel.metadata.create_all(engine)
+    with engine.connect() as conn:
+        # Base nueva: create_all ya crea las columnas; faltan los triggers
+        migrar(conn.connection.dbapi_connection)
+    asegurar_indices()
\ No newline at end of file
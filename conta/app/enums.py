@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class Actividad(str, Enum):
+    programacion = "programacion"
+    musica = "musica"
@@ -0,0 +1,329 @@
+"""
+Cambios de esquema sobre bases de datos ya creadas.
+
+SQLModel.metadata.create_all() crea las tablas que faltan, pero no añade
+columnas, índices ni triggers a las que ya existen. Cada migración de
+MIGRACIONES sube `PRAGMA user_version` en uno; `migrar()` aplica las
+pendientes en una sola transacción la primera vez que el proceso abre la
+base de datos (ver db.py), así que comprobarlo cuesta una lectura de PRAGMA.
+"""
+
+from dataclasses import dataclass
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from .models import Cliente, FacturaEmitida, GastoDeducible, Proveedor, ResumenMensual
+
+_DIALECTO = sqlite.dialect()
+
+
+def _sql(ddl) -> str:
+    return str(ddl.compile(dialect=_DIALECTO))
+
+
+def _centimos(col: str) -> str:
+    return f"CAST(round({col} * 100) AS INTEGER)"
+
+
+# ---------------------------------------------------------------------------
+# v1: clientes y proveedores
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Dimension:
+    """Entidad (cliente o proveedor) deducida de las columnas de texto de
+    una tabla de hechos, con sus totales mantenidos por triggers."""
+
+    hechos: type
+    entidad: type
+    fk: str
+    nombre: str
+    nif: str
+    contador: str
+    # Columna de totales de la entidad -> importe de la tabla de hechos
+    importes: dict[str, str]
+
+    @property
+    def tabla(self) -> str:
+        return self.hechos.__tablename__
+
+    @property
+    def ent(self) -> str:
+        return self.entidad.__tablename__
+
+    def nif_sql(self, p: str) -> str:
+        # NIF sin espacios ni guiones y en mayúsculas; NULL si viene vacío
+        return f"nullif(upper(replace(replace(trim({p}{self.nif}), '-', ''), ' ', '')), '')"
+
+    def clave_sql(self, p: str) -> str:
+        # Se deduplica por NIF; sin NIF, por nombre sin mayúsculas. casefold()
+        # (registrada en db.py) en vez de lower(), que solo trata ASCII:
+        # "Álvarez" y "álvarez" son la misma entidad
+        return f"coalesce('nif:' || {self.nif_sql(p)}, 'nombre:' || casefold(trim({p}{self.nombre})))"
+
+    def _asignar(self, p: str) -> str:
+        return (
+            f"INSERT OR IGNORE INTO {self.ent}(clave, nombre, nif) "
+            f"VALUES ({self.clave_sql(p)}, trim({p}{self.nombre}), {self.nif_sql(p)}); "
+            f"UPDATE {self.tabla} SET {self.fk} = "
+            f"(SELECT id FROM {self.ent} WHERE clave = {self.clave_sql(p)}) WHERE id = {p}id;"
+        )
+
+    def _sumar(self, p: str, signo: str) -> str:
+        sets = [f"{self.contador} = {self.contador} {signo} 1"]
+        sets += [f"{t} = {t} {signo} {_centimos(p + c)}" for t, c in self.importes.items()]
+        return f"UPDATE {self.ent} SET {', '.join(sets)} WHERE id = {p}{self.fk};"
+
+    def triggers(self) -> list[str]:
+        t, fk = self.tabla, self.fk
+        importes = ", ".join(self.importes.values())
+        return [
+            # Cada fila nueva (o que cambia de nombre/NIF) se enlaza con su
+            # entidad, que se crea si no existe
+            f"CREATE TRIGGER IF NOT EXISTS {t}_{self.ent}_ai AFTER INSERT ON {t} "
+            f"WHEN new.{fk} IS NULL BEGIN {self._asignar('new.')} END",
+            f"CREATE TRIGGER IF NOT EXISTS {t}_{self.ent}_au "
+            f"AFTER UPDATE OF {self.nombre}, {self.nif} ON {t} BEGIN {self._asignar('new.')} END",
+            # Totales: se restan los valores anteriores y se suman los nuevos
+            f"CREATE TRIGGER IF NOT EXISTS {t}_totales_ai AFTER INSERT ON {t} "
+            f"WHEN new.{fk} IS NOT NULL BEGIN {self._sumar('new.', '+')} END",
+            f"CREATE TRIGGER IF NOT EXISTS {t}_totales_au AFTER UPDATE OF {fk}, {importes} ON {t} "
+            f"BEGIN {self._sumar('old.', '-')} {self._sumar('new.', '+')} END",
+            f"CREATE TRIGGER IF NOT EXISTS {t}_totales_ad AFTER DELETE ON {t} "
+            f"BEGIN {self._sumar('old.', '-')} END",
+        ]
+
+    def backfill(self) -> list[str]:
+        t, p = self.tabla, f"{self.tabla}."
+        return [
+            # Empezando por las filas más recientes: la entidad se queda con
+            # el nombre con que se facturó por última vez
+            f"INSERT OR IGNORE INTO {self.ent}(clave, nombre, nif) "
+            f"SELECT {self.clave_sql(p)}, trim({p}{self.nombre}), {self.nif_sql(p)} "
+            f"FROM {t} ORDER BY id DESC",
+            f"UPDATE {t} SET {self.fk} = (SELECT id FROM {self.ent} WHERE clave = {self.clave_sql(p)}) "
+            f"WHERE {self.fk} IS NULL",
+            self.recalcular_totales(),
+        ]
+
+    def recalcular_totales(self) -> str:
+        cols = ", ".join([self.contador, *self.importes])
+        totales = ", ".join(
+            f"coalesce(sum({_centimos(c)}), 0)" for c in self.importes.values()
+        )
+        return (
+            f"UPDATE {self.ent} SET ({cols}) = "
+            f"(SELECT count(*), {totales} FROM {self.tabla} WHERE {self.fk} = {self.ent}.id)"
+        )
+
+
+CLIENTES = Dimension(
+    FacturaEmitida,
+    Cliente,
+    "cliente_id",
+    "cliente_nombre",
+    "cliente_nif",
+    "n_facturas",
+    {"base_cent": "base_eur", "iva_cent": "cuota_iva", "irpf_cent": "ret_irpf_importe"},
+)
+PROVEEDORES = Dimension(
+    GastoDeducible,
+    Proveedor,
+    "proveedor_id",
+    "proveedor",
+    "proveedor_nif",
+    "n_gastos",
+    {"base_cent": "base_eur", "iva_cent": "cuota_iva"},
+)
+DIMENSIONES = (CLIENTES, PROVEEDORES)
+
+
+def _columnas(cur, tabla: str) -> set[str]:
+    return {fila[1] for fila in cur.execute(f"PRAGMA table_info({tabla})")}
+
+
+def _v1_clientes_proveedores(cur) -> None:
+    for d in DIMENSIONES:
+        cur.execute(_sql(CreateTable(d.entidad.__table__, if_not_exists=True)))
+        if d.fk not in _columnas(cur, d.tabla):
+            cur.execute(f"ALTER TABLE {d.tabla} ADD COLUMN {d.fk} INTEGER REFERENCES {d.ent}(id)")
+        for idx in d.hechos.__table__.indexes:
+            if d.fk in idx.columns:
+                cur.execute(_sql(CreateIndex(idx, if_not_exists=True)))
+        for sql in d.backfill():
+            cur.execute(sql)
+        for sql in d.triggers():
+            cur.execute(sql)
+
+
+# ---------------------------------------------------------------------------
+# v2: resumen mensual de facturación
+# ---------------------------------------------------------------------------
+
+
+_RESUMEN_IMPORTES = {"base_cent": "base_eur", "iva_cent": "cuota_iva", "irpf_cent": "ret_irpf_importe"}
+
+
+def _resumen_sumar(p: str) -> str:
+    r = ResumenMensual.__tablename__
+    cols = ", ".join(["n_facturas", *_RESUMEN_IMPORTES])
+    valores = ", ".join(["1", *(_centimos(p + c) for c in _RESUMEN_IMPORTES.values())])
+    sets = ", ".join(f"{c} = {c} + excluded.{c}" for c in ["n_facturas", *_RESUMEN_IMPORTES])
+    # El WHERE además evita la ambigüedad de INSERT ... SELECT ... ON CONFLICT
+    return (
+        f"INSERT INTO {r}(cliente_id, actividad, mes, {cols}) "
+        f"SELECT {p}cliente_id, {p}actividad, substr({p}fecha_emision, 1, 7), {valores} "
+        f"WHERE {p}cliente_id IS NOT NULL "
+        f"ON CONFLICT(cliente_id, actividad, mes) DO UPDATE SET {sets};"
+    )
+
+
+def _resumen_restar(p: str) -> str:
+    r = ResumenMensual.__tablename__
+    sets = ", ".join(
+        ["n_facturas = n_facturas - 1", *(f"{t} = {t} - {_centimos(p + c)}" for t, c in _RESUMEN_IMPORTES.items())]
+    )
+    return (
+        f"UPDATE {r} SET {sets} WHERE cliente_id = {p}cliente_id "
+        f"AND actividad = {p}actividad AND mes = substr({p}fecha_emision, 1, 7);"
+    )
+
+
+def _v2_resumen_mensual(cur) -> None:
+    t, r = FacturaEmitida.__tablename__, ResumenMensual.__tablename__
+    cur.execute(_sql(CreateTable(ResumenMensual.__table__, if_not_exists=True)))
+    cur.execute(f"DELETE FROM {r}")
+    totales = ", ".join(f"coalesce(sum({_centimos(c)}), 0)" for c in _RESUMEN_IMPORTES.values())
+    cur.execute(
+        f"INSERT INTO {r}(cliente_id, actividad, mes, n_facturas, {', '.join(_RESUMEN_IMPORTES)}) "
+        f"SELECT cliente_id, actividad, substr(fecha_emision, 1, 7), count(*), {totales} "
+        f"FROM {t} WHERE cliente_id IS NOT NULL GROUP BY 1, 2, 3"
+    )
+    claves = "cliente_id, actividad, fecha_emision"
+    for sql in (
+        f"CREATE TRIGGER IF NOT EXISTS {t}_resumen_ai AFTER INSERT ON {t} "
+        f"WHEN new.cliente_id IS NOT NULL BEGIN {_resumen_sumar('new.')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {t}_resumen_au "
+        f"AFTER UPDATE OF {claves}, {', '.join(_RESUMEN_IMPORTES.values())} ON {t} "
+        f"BEGIN {_resumen_restar('old.')} {_resumen_sumar('new.')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {t}_resumen_ad AFTER DELETE ON {t} "
+        f"BEGIN {_resumen_restar('old.')} END",
+    ):
+        cur.execute(sql)
+
+
+# ---------------------------------------------------------------------------
+# v3: índice parcial de facturas pendientes de cobro
+# ---------------------------------------------------------------------------
+
+
+def _indices_parciales(cur) -> None:
+    for modelo in (FacturaEmitida, GastoDeducible):
+        for idx in modelo.__table__.indexes:
+            if idx.dialect_options["sqlite"]["where"] is not None:
+                cur.execute(_sql(CreateIndex(idx, if_not_exists=True)))
+
+
+def _v3_pendientes(cur) -> None:
+    _indices_parciales(cur)
+
+
+# ---------------------------------------------------------------------------
+# v4: cuotas de IVA de gastos introducidas a mano
+# ---------------------------------------------------------------------------
+
+
+def _v4_cuota_iva_manual(cur) -> None:
+    # Las filas anteriores no se pueden distinguir: quedan como calculadas
+    t = GastoDeducible.__tablename__
+    if "cuota_iva_manual" not in _columnas(cur, t):
+        cur.execute(f"ALTER TABLE {t} ADD COLUMN cuota_iva_manual BOOLEAN NOT NULL DEFAULT 0")
+
+
+# ---------------------------------------------------------------------------
+# v5: claves por nombre con casefold()
+# ---------------------------------------------------------------------------
+
+
+def _v5_claves_casefold(cur) -> None:
+    for d in DIMENSIONES:
+        t, ent = d.tabla, d.ent
+        for sufijo in ("ai", "au"):
+            cur.execute(f"DROP TRIGGER IF EXISTS {t}_{ent}_{sufijo}")
+        for sql in d.triggers():
+            cur.execute(sql)
+        # Las entidades que solo se distinguían por mayúsculas no ASCII se
+        # fusionan en la más antigua. Al cambiar la FK de sus filas los
+        # triggers mueven los totales (y el resumen mensual).
+        destino: dict[str, int] = {}
+        for id_, clave in cur.execute(
+            f"SELECT id, clave FROM {ent} WHERE clave LIKE 'nombre:%' ORDER BY id"
+        ).fetchall():
+            nueva = clave.casefold()
+            if nueva not in destino:
+                destino[nueva] = id_
+                continue
+            cur.execute(f"UPDATE {t} SET {d.fk} = ? WHERE {d.fk} = ?", (destino[nueva], id_))
+            cur.execute(f"DELETE FROM {ent} WHERE id = ?", (id_,))
+        cur.executemany(f"UPDATE {ent} SET clave = ? WHERE id = ?", list(destino.items()))
+    # Filas del resumen (ya a cero) de los clientes fusionados
+    r = ResumenMensual.__tablename__
+    cur.execute(f"DELETE FROM {r} WHERE cliente_id NOT IN (SELECT id FROM {Cliente.__tablename__})")
+
+
+# ---------------------------------------------------------------------------
+# v6: índices parciales de facturas y gastos con fracciones de céntimo
+# ---------------------------------------------------------------------------
+
+
+def _v6_subcentimos(cur) -> None:
+    _indices_parciales(cur)
+
+
+MIGRACIONES = [
+    _v1_clientes_proveedores,
+    _v2_resumen_mensual,
+    _v3_pendientes,
+    _v4_cuota_iva_manual,
+    _v5_claves_casefold,
+    _v6_subcentimos,
+]
+
+
+# ---------------------------------------------------------------------------
+
+
+def _version(cur) -> int:
+    return cur.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar(dbapi_conn) -> None:
+    """Aplica las migraciones pendientes sobre una conexión DB-API de SQLite.
+
+    Una base sin tablas se deja como está: init_db() la crea entera y luego
+    llama a migrar() para los triggers."""
+    cur = dbapi_conn.cursor()
+    try:
+        if _version(cur) >= len(MIGRACIONES):
+            return
+        existe = cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (FacturaEmitida.__tablename__,),
+        ).fetchone()
+        if not existe:
+            return
+        # BEGIN IMMEDIATE: otro proceso que migre a la vez espera aquí y luego
+        # ve la versión ya actualizada
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            for v in range(_version(cur), len(MIGRACIONES)):
+                MIGRACIONES[v](cur)
+                cur.execute(f"PRAGMA user_version = {v + 1}")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+        cur.execute("COMMIT")
+    finally:
+        cur.close()
@@ -1,17 +1,88 @@
 
 from datetime import date
 from decimal import Decimal
-from enum import Enum
 
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel
 
+from .enums import Actividad
 
-class Actividad(str, Enum):
-    programacion = "programacion"
-    musica = "musica"
+
+# Totales de cada cliente/proveedor en céntimos (enteros: las sumas son
+# exactas). Los mantienen triggers de SQLite, ver migraciones.py.
+def _contador() -> int:
+    return Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+
+class Cliente(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    # "nif:<NIF normalizado>", o "nombre:<nombre>" si no hay NIF
+    clave: str = Field(unique=True)
+    nombre: str
+    nif: str | None = None
+    n_facturas: int = _contador()
+    base_cent: int = _contador()
+    iva_cent: int = _contador()
+    irpf_cent: int = _contador()
+
+
+class Proveedor(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    clave: str = Field(unique=True)
+    nombre: str
+    nif: str | None = None
+    n_gastos: int = _contador()
+    base_cent: int = _contador()
+    iva_cent: int = _contador()
+
+
+# Valor de estado_cobro de las facturas aún no cobradas
+PENDIENTE = "Pendiente"
+
+# Filas con algún importe que no es un número exacto de céntimos (p. ej.
+# importados con más decimales). Los totales en céntimos (ResumenMensual,
+# services/agregados.py) los redondean; los totales exactos leen estas filas
+# aparte.
+def _subcentimos(*cols: str) -> str:
+    # Entre paréntesis: text() no agrupa al combinarse con AND
+    return "({})".format(" OR ".join(f"abs({c} * 100 - round({c} * 100)) > 1e-6" for c in cols))
+
+
+FACTURAS_SUBCENTIMOS = _subcentimos("base_eur", "cuota_iva", "ret_irpf_importe")
+GASTOS_SUBCENTIMOS = _subcentimos("base_eur", "cuota_iva", "afecto_pct")
+# Sin índice: hay una cuota al mes
+CUOTAS_SUBCENTIMOS = _subcentimos("importe_eur")
 
 
 class FacturaEmitida(SQLModel, table=True):
+    __table_args__ = (
+        # Índice parcial (y de cobertura) de las facturas pendientes: el
+        # informe de antigüedad lee solo estas entradas, sin recorrer el
+        # histórico ya cobrado
+        Index(
+            "ix_facturaemitida_pendientes",
+            "fecha_emision",
+            "cliente_id",
+            "base_eur",
+            "cuota_iva",
+            "ret_irpf_importe",
+            # SQLite solo lo trata como índice de cobertura si también
+            # contiene la columna de la condición
+            "estado_cobro",
+            sqlite_where=text(f"estado_cobro = '{PENDIENTE}'"),
+        ),
+        # Casi vacío: normalmente todos los importes son céntimos exactos
+        Index(
+            "ix_facturaemitida_subcentimos",
+            "fecha_emision",
+            "cliente_id",
+            "base_eur",
+            "cuota_iva",
+            "ret_irpf_importe",
+            sqlite_where=text(FACTURAS_SUBCENTIMOS),
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     numero: str = Field(index=True, unique=True)
     fecha_emision: date = Field(index=True)
@@ -24,13 +95,40 @@ class FacturaEmitida(SQLModel, table=True):
     ret_irpf_pct: Decimal = Decimal("0.00")
     ret_irpf_importe: Decimal = Decimal("0.00")
     estado: str | None = None
-    estado_cobro: str = Field(default="Pendiente")
+    estado_cobro: str = Field(default=PENDIENTE)
     actividad: Actividad
     notas: str | None = None
     archivo_pdf_path: str | None = None
+    # Lo asigna un trigger a partir de cliente_nombre/cliente_nif
+    cliente_id: int | None = Field(default=None, foreign_key="cliente.id", index=True)
+
+
+# Facturación por cliente, actividad y mes (YYYY-MM), en céntimos. La
+# mantienen triggers de SQLite (migraciones.py); `conta stats` la agrega.
+class ResumenMensual(SQLModel, table=True):
+    cliente_id: int = Field(foreign_key="cliente.id", primary_key=True)
+    actividad: Actividad = Field(primary_key=True)
+    mes: str = Field(primary_key=True)
+    n_facturas: int = _contador()
+    base_cent: int = _contador()
+    iva_cent: int = _contador()
+    irpf_cent: int = _contador()
 
 
 class GastoDeducible(SQLModel, table=True):
+    __table_args__ = (
+        # Como ix_facturaemitida_subcentimos
+        Index(
+            "ix_gastodeducible_subcentimos",
+            "fecha",
+            "base_eur",
+            "cuota_iva",
+            "afecto_pct",
+            "iva_deducible",
+            sqlite_where=text(GASTOS_SUBCENTIMOS),
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     proveedor: str
     proveedor_nif: str | None = None
@@ -41,7 +139,11 @@ class GastoDeducible(SQLModel, table=True):
     tipo: str | None = None
     afecto_pct: Decimal = Decimal("100.00")
     iva_deducible: bool = Field(default=True)
+    # Cuota tomada de la factura (no base × tipo): `conta recalc` no la toca
+    cuota_iva_manual: bool = Field(default=False)
     archivo_pdf_path: str | None = None
+    # Lo asigna un trigger a partir de proveedor/proveedor_nif
+    proveedor_id: int | None = Field(default=None, foreign_key="proveedor.id", index=True)
 
 
 class PagoAutonomo(SQLModel, table=True):
@@ -0,0 +1,184 @@
+"""
+Reglas fiscales (tipos de IVA, retenciones por actividad, porcentaje del
+Modelo 130) leídas de config/rules.yml o de CONTA_RULES_PATH.
+
+Los importes se redondean siempre al céntimo: los triggers, los resúmenes
+y el cálculo vectorial trabajan en céntimos enteros, así que el número de
+decimales no es configurable.
+
+Las reglas cambian con el tiempo: la sección `vigencias:` es una lista de
+cambios con su fecha de entrada en vigor (`desde:`) y solo las claves que
+cambian. Al leer el fichero (una sola vez por proceso) se compila un índice
+de tramos ordenado por fecha, con las reglas ya combinadas e inmutables de
+cada tramo; `reglas_en(fecha)` las busca con bisect y cachea el resultado
+por (año, trimestre), así que las altas y cálculos masivos pueden llamarla
+en cada fila sin coste apreciable.
+"""
+
+import calendar
+import os
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+
+import yaml
+from dotenv import load_dotenv
+
+from .enums import Actividad
+
+load_dotenv()
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parents[2] / "config" / "rules.yml"
+RULES_PATH = Path(os.getenv("CONTA_RULES_PATH") or DEFAULT_RULES_PATH)
+
+CENT = Decimal("0.01")
+
+
+@dataclass(frozen=True)
+class Reglas:
+    # Nombre (general, reducido...) -> porcentaje
+    iva_tipos: Mapping[str, Decimal]
+    retenciones: Mapping[Actividad, Decimal]
+    pago_fraccionado_pct: Decimal
+
+    @property
+    def iva_general(self) -> Decimal:
+        return self.iva_tipos["general"]
+
+    @property
+    def tipos_iva_validos(self) -> frozenset[Decimal]:
+        # 0 % (exento, intracomunitario...) siempre es válido
+        return frozenset(self.iva_tipos.values()) | {Decimal("0.00")}
+
+    def retencion(self, actividad: Actividad | str) -> Decimal:
+        """Porcentaje de retención de IRPF por defecto para `actividad`."""
+        return self.retenciones.get(Actividad(actividad), Decimal("0.00"))
+
+
+def _pct(nombre: str, v) -> Decimal:
+    try:
+        return Decimal(str(v)).quantize(CENT)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"{RULES_PATH}: {nombre} no es un porcentaje válido ({v!r})")
+
+
+def _seccion(doc: dict, nombre: str) -> dict:
+    v = doc.get(nombre)
+    if not isinstance(v, dict):
+        raise ValueError(f"{RULES_PATH}: falta la sección '{nombre}'")
+    return v
+
+
+def _combinar(base: dict, cambios: dict) -> dict:
+    out = dict(base)
+    for k, v in cambios.items():
+        out[k] = _combinar(out[k], v) if isinstance(v, dict) and isinstance(out.get(k), dict) else v
+    return out
+
+
+@lru_cache(maxsize=1)
+def _documento() -> dict:
+    try:
+        with RULES_PATH.open(encoding="utf-8") as fh:
+            doc = yaml.safe_load(fh) or {}
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No se encuentra el fichero de reglas: {RULES_PATH} (CONTA_RULES_PATH)")
+    if not isinstance(doc, dict):
+        raise ValueError(f"{RULES_PATH}: formato inválido")
+    return doc
+
+
+def _compilar(doc: dict) -> Reglas:
+    iva = _seccion(doc, "iva_tipos")
+    if "general" not in iva:
+        raise ValueError(f"{RULES_PATH}: falta iva_tipos.general")
+    retenciones = {}
+    for actividad, v in _seccion(doc, "irpf_retenciones_por_actividad").items():
+        if actividad not in {a.value for a in Actividad}:
+            raise ValueError(f"{RULES_PATH}: actividad desconocida '{actividad}'")
+        retenciones[Actividad(actividad)] = _pct(f"irpf_retenciones_por_actividad.{actividad}", v)
+    return Reglas(
+        iva_tipos=MappingProxyType({k: _pct(f"iva_tipos.{k}", v) for k, v in iva.items()}),
+        retenciones=MappingProxyType(retenciones),
+        pago_fraccionado_pct=_pct(
+            "modelo130.porcentaje_pago_fraccionado",
+            _seccion(doc, "modelo130").get("porcentaje_pago_fraccionado"),
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class _Indice:
+    # Inicio de cada tramo (ordenado; el primero es date.min) y sus reglas
+    desde: tuple[date, ...]
+    reglas: tuple[Reglas, ...]
+
+    def en(self, fecha: date) -> Reglas:
+        return self.reglas[bisect_right(self.desde, fecha) - 1]
+
+
+def _fecha(v) -> date:
+    if isinstance(v, date):
+        return v
+    try:
+        return date.fromisoformat(str(v))
+    except ValueError:
+        raise ValueError(f"{RULES_PATH}: fecha inválida en vigencias ({v!r}); usa YYYY-MM-DD")
+
+
+@lru_cache(maxsize=1)
+def _indice() -> _Indice:
+    doc = _documento()
+    base = {k: v for k, v in doc.items() if k != "vigencias"}
+    cambios = []
+    for v in doc.get("vigencias") or []:
+        if not isinstance(v, dict) or "desde" not in v:
+            raise ValueError(f"{RULES_PATH}: cada vigencia necesita 'desde'")
+        cambios.append((_fecha(v["desde"]), {k: x for k, x in v.items() if k != "desde"}))
+    cambios.sort(key=lambda c: c[0])
+
+    desde, tramos = [date.min], [_compilar(base)]
+    for fecha, c in cambios:
+        # Cada cambio sigue vigente hasta el siguiente
+        base = _combinar(base, c)
+        if fecha == desde[-1]:
+            raise ValueError(f"{RULES_PATH}: dos vigencias con la misma fecha ({fecha})")
+        desde.append(fecha)
+        tramos.append(_compilar(base))
+    return _Indice(tuple(desde), tuple(tramos))
+
+
+def _limites(year: int, quarter: int | None) -> tuple[date, date]:
+    if quarter is None:
+        return date(year, 1, 1), date(year, 12, 31)
+    if quarter not in (1, 2, 3, 4):
+        raise ValueError("Trimestre inválido")
+    ultimo_mes = 3 * quarter
+    return date(year, ultimo_mes - 2, 1), date(year, ultimo_mes, calendar.monthrange(year, ultimo_mes)[1])
+
+
+@lru_cache
+def _trimestre(year: int, quarter: int) -> Reglas | None:
+    # Las reglas del trimestre si no cambian dentro de él; si no, None
+    indice = _indice()
+    inicio, fin = _limites(year, quarter)
+    r = indice.en(inicio)
+    return r if indice.en(fin) is r else None
+
+
+def reglas_en(fecha: date) -> Reglas:
+    """Reglas vigentes en `fecha`."""
+    r = _trimestre(fecha.year, (fecha.month - 1) // 3 + 1)
+    return r if r is not None else _indice().en(fecha)
+
+
+@lru_cache
+def reglas(year: int, quarter: int | None = None) -> Reglas:
+    """Reglas vigentes al cierre del trimestre `quarter` de `year` (o del
+    ejercicio entero si no se indica trimestre)."""
+    return _indice().en(_limites(year, quarter)[1])
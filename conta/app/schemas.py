@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field, field_validator   
+from pydantic import BaseModel, Field, field_validator, model_validator
 from datetime import date
 from decimal import Decimal
 from .models import Actividad
+from .reglas import reglas_en
 
 
 class FacturaIn(BaseModel):
@@ -11,25 +12,42 @@ class FacturaIn(BaseModel):
     cliente_nif: str | None = None
     pais: str | None = None
     base_eur: Decimal
-    tipo_iva: Decimal = Field(default=Decimal("21.00"))
-    ret_irpf_pct: Decimal = Field(default=Decimal("0.00"))
+    # Sin valor: tipo general y retención de la actividad (config/rules.yml)
+    tipo_iva: Decimal | None = None
+    ret_irpf_pct: Decimal | None = None
     actividad: Actividad
     notas: str | None = None
     archivo_pdf_path: str | None = None
     estado_cobro: str = Field(default="Pendiente")
 
+    @model_validator(mode="after")
+    def defaults_reglas(self):
+        r = reglas_en(self.fecha_emision)
+        if self.tipo_iva is None:
+            self.tipo_iva = r.iva_general
+        if self.ret_irpf_pct is None:
+            self.ret_irpf_pct = r.retencion(self.actividad)
+        return self
+
 
 class GastoIn(BaseModel):
     proveedor: str
     proveedor_nif: str | None = None
     fecha: date
     base_eur: Decimal
-    tipo_iva: Decimal = Field(default=Decimal("21.00"))
+    # Sin valor: tipo general de config/rules.yml
+    tipo_iva: Decimal | None = None
     afecto_pct: Decimal = Field(default=Decimal("100.00"))
     tipo: str | None = None
     archivo_pdf_path: str | None = None
     iva_deducible: bool = True
 
+    @model_validator(mode="after")
+    def defaults_reglas(self):
+        if self.tipo_iva is None:
+            self.tipo_iva = reglas_en(self.fecha).iva_general
+        return self
+
 class CuotaAutonomoIn(BaseModel):
     fecha: date
     importe_eur: Decimal
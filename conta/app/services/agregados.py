@@ -0,0 +1,138 @@
+"""
+Totales mensuales de todo el histórico para los cálculos del 303 y del 130:
+facturación (de ResumenMensual), gastos y cuotas de autónomos agrupados por
+mes, con una consulta agrupada por tabla.
+
+Se calculan una vez y se guardan en memoria hasta que cambian sus tablas
+(db.cache_por_version). Los usan la previsión (prevision.py) y la
+verificación de las presentaciones (verificacion.py), que así recalculan
+muchos periodos sin consultar la base de datos para cada uno.
+
+Los totales son exactos (Decimal, sin redondear), como las sumas de
+iva_trimestre e irpf_snapshot_acumulado, y solo se redondea al final:
+resultado_303() y m130() dan los mismos resultados que esos servicios. Las
+consultas agrupadas suman enteros: céntimos, o céntimos por centésimas de
+porcentaje de afectación (millonésimas de euro). Las pocas filas con
+fracciones de céntimo (índices parciales, ver models.py) se leen aparte y
+suman lo que se redondeó.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import Integer, case, cast, func, text
+from sqlmodel import select
+
+from ..db import cache_por_version, get_session
+from ..models import (
+    CUOTAS_SUBCENTIMOS,
+    FACTURAS_SUBCENTIMOS,
+    GASTOS_SUBCENTIMOS,
+    FacturaEmitida,
+    GastoDeducible,
+    PagoAutonomo,
+    ResumenMensual,
+)
+from .irpf import resultado_irpf
+
+TWOPLACES = Decimal("0.01")
+CERO = Decimal("0")
+
+METRICAS = ("ingresos", "retenciones", "iva_devengado", "iva_deducible", "gastos", "cuotas_ss")
+
+# Tablas de las que salen los totales (ResumenMensual la mantienen
+# triggers de facturaemitida, así que su versión es la de esta)
+TABLAS = (FacturaEmitida.__tablename__, GastoDeducible.__tablename__, PagoAutonomo.__tablename__)
+
+# (año, mes)
+Mes = tuple[int, int]
+
+
+def _centimos(col):
+    # Igual que los triggers de ResumenMensual (migraciones._centimos)
+    return cast(func.round(col * 100), Integer)
+
+
+def _eur(v: int, decimales: int) -> Decimal:
+    return Decimal(int(v)).scaleb(-decimales)
+
+
+@cache_por_version(*TABLAS)
+def mensuales() -> dict[Mes, dict[str, Decimal]]:
+    """Totales de cada mes con movimientos, por magnitud (METRICAS)."""
+    meses: dict[Mes, dict[str, Decimal]] = {}
+
+    def _sumar(mes: str, **importes: Decimal) -> None:
+        fila = meses.setdefault((int(mes[:4]), int(mes[5:7])), dict.fromkeys(METRICAS, CERO))
+        for metrica, v in importes.items():
+            fila[metrica] += v
+
+    r, f, g, c = ResumenMensual, FacturaEmitida, GastoDeducible, PagoAutonomo
+    importes_f = (f.base_eur, f.cuota_iva, f.ret_irpf_importe)
+    mes_gasto, mes_cuota = func.substr(g.fecha, 1, 7), func.substr(c.fecha, 1, 7)
+    # Céntimos por centésimas de porcentaje: millonésimas de euro
+    cuota_g, afecto_g = _centimos(g.cuota_iva), _centimos(g.afecto_pct)
+    iva_g = case((g.iva_deducible, cuota_g * afecto_g), else_=0)
+    # El IVA no deducible es más gasto para el IRPF
+    gasto_g = (_centimos(g.base_eur) + case((g.iva_deducible, 0), else_=cuota_g)) * afecto_g
+    with get_session() as s:
+        for mes, base, iva, irpf in s.exec(
+            select(r.mes, func.sum(r.base_cent), func.sum(r.iva_cent), func.sum(r.irpf_cent)).group_by(r.mes)
+        ):
+            _sumar(mes, ingresos=_eur(base, 2), iva_devengado=_eur(iva, 2), retenciones=_eur(irpf, 2))
+        for mes, iva, gastos in s.exec(select(mes_gasto, func.sum(iva_g), func.sum(gasto_g)).group_by(mes_gasto)):
+            _sumar(mes, iva_deducible=_eur(iva, 6), gastos=_eur(gastos, 6))
+        for mes, cuotas in s.exec(select(mes_cuota, func.sum(_centimos(c.importe_eur))).group_by(mes_cuota)):
+            _sumar(mes, cuotas_ss=_eur(cuotas, 2))
+
+        # Filas con fracciones de céntimo: lo exacto menos lo ya sumado
+        for mes, base, iva, irpf, *cents in s.exec(
+            select(func.substr(f.fecha_emision, 1, 7), *importes_f, *(_centimos(i) for i in importes_f)).where(
+                f.cliente_id.is_not(None), text(FACTURAS_SUBCENTIMOS)
+            )
+        ):
+            base_c, iva_c, irpf_c = (_eur(v, 2) for v in cents)
+            _sumar(mes, ingresos=base - base_c, iva_devengado=iva - iva_c, retenciones=irpf - irpf_c)
+        # Mismas fórmulas que iva._sumas_iva e irpf._sumas_irpf
+        for mes, base, cuota, afecto, deducible, iva_m, gasto_m in s.exec(
+            select(mes_gasto, g.base_eur, g.cuota_iva, g.afecto_pct, g.iva_deducible, iva_g, gasto_g).where(
+                text(GASTOS_SUBCENTIMOS)
+            )
+        ):
+            iva = cuota * afecto / Decimal("100") if deducible else CERO
+            gasto = (base + (CERO if deducible else cuota)) * afecto / Decimal("100")
+            _sumar(mes, iva_deducible=iva - _eur(iva_m, 6), gastos=gasto - _eur(gasto_m, 6))
+        for mes, importe, cents in s.exec(
+            select(mes_cuota, c.importe_eur, _centimos(c.importe_eur)).where(text(CUOTAS_SUBCENTIMOS))
+        ):
+            _sumar(mes, cuotas_ss=importe - _eur(cents, 2))
+    return meses
+
+
+def sumar(filas) -> dict[str, Decimal]:
+    """Suma por magnitud de varias filas mensuales."""
+    total = dict.fromkeys(METRICAS, CERO)
+    for fila in filas:
+        for m in METRICAS:
+            total[m] += fila[m]
+    return total
+
+
+def periodo(meses: dict[Mes, dict[str, Decimal]], year: int, desde: int, hasta: int) -> dict[str, Decimal]:
+    """Totales de los meses `desde`..`hasta` (incluidos) de `year`."""
+    return sumar(meses[(year, m)] for m in range(desde, hasta + 1) if (year, m) in meses)
+
+
+def resultado_303(t: dict[str, Decimal]) -> Decimal:
+    return (t["iva_devengado"] - t["iva_deducible"]).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+
+
+def m130(year: int, q: int, acumulado: dict[str, Decimal], pagos_previos: Decimal) -> dict:
+    """Modelo 130 de `year`Q`q` a partir de los totales acumulados desde
+    enero y de los pagos fraccionados previos (casilla 05)."""
+    sumas = {
+        "ingresos": acumulado["ingresos"],
+        "gastos_sin_ss": acumulado["gastos"],
+        "cuotas_ss": acumulado["cuotas_ss"],
+        "retenciones": acumulado["retenciones"],
+    }
+    return resultado_irpf(sumas, pagos_previos, year, q, False)
@@ -0,0 +1,98 @@
+"""
+Búsqueda de texto sobre facturas (cliente, NIF, número, notas) y gastos
+(proveedor) con un índice FTS5 de SQLite.
+
+Cada tabla tiene su tabla FTS5 de contenido externo (solo guarda el índice,
+no copia las filas), mantenida al día por triggers: cualquier alta, baja o
+cambio de esos campos, venga de la CLI, la API, la TUI o `conta ingest`,
+actualiza el índice en la misma transacción. El tokenizador unicode61 con
+remove_diacritics ignora mayúsculas y acentos ("cafe" encuentra "Café Olé")
+y cada palabra buscada se trata como prefijo ("apo" encuentra "Sala Apolo").
+
+El índice se crea (y se rellena con las filas existentes) la primera vez
+que se usa en una base de datos que aún no lo tiene.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import cache
+
+from sqlalchemy import column, false, literal_column, select, table
+
+from ..db import engine
+from ..models import FacturaEmitida, GastoDeducible
+
+
+@dataclass(frozen=True)
+class Indice:
+    tabla: str
+    columnas: tuple[str, ...]
+
+    @property
+    def nombre(self) -> str:
+        return f"{self.tabla}_fts"
+
+    def ddl(self) -> list[str]:
+        n, t = self.nombre, self.tabla
+        cols = ", ".join(self.columnas)
+        nuevas = ", ".join(f"new.{c}" for c in self.columnas)
+        viejas = ", ".join(f"old.{c}" for c in self.columnas)
+        borrar = f"INSERT INTO {n}({n}, rowid, {cols}) VALUES ('delete', old.id, {viejas});"
+        insertar = f"INSERT INTO {n}(rowid, {cols}) VALUES (new.id, {nuevas});"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {n} USING fts5({cols}, content='{t}', "
+            "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f"CREATE TRIGGER IF NOT EXISTS {n}_ai AFTER INSERT ON {t} BEGIN {insertar} END",
+            f"CREATE TRIGGER IF NOT EXISTS {n}_ad AFTER DELETE ON {t} BEGIN {borrar} END",
+            # Solo cuando cambia un campo indexado: los UPDATE de estado o de
+            # importes no tocan el índice
+            f"CREATE TRIGGER IF NOT EXISTS {n}_au AFTER UPDATE OF {cols} ON {t} "
+            f"BEGIN {borrar} {insertar} END",
+        ]
+
+
+FACTURAS = Indice(FacturaEmitida.__tablename__, ("cliente_nombre", "cliente_nif", "numero", "notas"))
+GASTOS = Indice(GastoDeducible.__tablename__, ("proveedor",))
+INDICES = (FACTURAS, GASTOS)
+
+
+@cache
+def asegurar_indices() -> None:
+    """Crea los índices y sus triggers si faltan (una vez por proceso)."""
+    with engine.connect() as conn:
+        # Todo en una transacción: sin BEGIN explícito pysqlite confirma cada
+        # CREATE por separado y otra conexión podría ver el índice creado pero
+        # aún vacío (antes del 'rebuild')
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        for idx in INDICES:
+            existia = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (idx.nombre,)
+            ).first()
+            for sql in idx.ddl():
+                conn.exec_driver_sql(sql)
+            if not existia:
+                conn.exec_driver_sql(f"INSERT INTO {idx.nombre}({idx.nombre}) VALUES ('rebuild')")
+        conn.commit()
+
+
+def consulta(texto: str, columnas: tuple[str, ...] | None = None) -> str | None:
+    """Expresión MATCH de FTS5 para `texto`: todas sus palabras, como prefijo.
+
+    None si `texto` no tiene ninguna palabra."""
+    # Cada palabra va entre comillas: el texto del usuario nunca se
+    # interpreta como sintaxis de FTS5 (AND, NEAR, -, :...)
+    palabras = re.findall(r"\w+", texto)
+    if not palabras:
+        return None
+    q = " ".join(f'"{p}"*' for p in palabras)
+    return f"{{{' '.join(columnas)}}} : ({q})" if columnas else q
+
+
+def coincide(idx: Indice, id_col, texto: str, columnas: tuple[str, ...] | None = None):
+    """Condición `id_col IN (filas de idx que casan con texto)`."""
+    q = consulta(texto, columnas)
+    if q is None:
+        return false()
+    asegurar_indices()
+    fts = table(idx.nombre, column("rowid"))
+    return id_col.in_(select(fts.c.rowid).where(literal_column(idx.nombre).op("MATCH")(q)))
@@ -0,0 +1,92 @@
+"""
+Antigüedad de las facturas pendientes de cobro (estado_cobro "Pendiente"),
+por tramos de días desde la emisión: 0-30, 31-60, 61-90 y más de 90.
+
+La consulta solo lee el índice parcial ix_facturaemitida_pendientes (ver
+models.py), que contiene las facturas pendientes con las columnas que hacen
+falta, así que su coste depende de lo que queda por cobrar y no del
+histórico. SQLite solo usa un índice parcial si la condición de la consulta
+es literalmente la del índice: por eso el estado va como literal en el SQL
+y no como parámetro.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import Integer, case, cast, func, literal_column
+from sqlmodel import select
+
+from ..db import get_session
+from ..models import PENDIENTE, Cliente, FacturaEmitida
+
+# (límite superior en días, etiqueta); el último tramo no tiene límite
+TRAMOS: tuple[tuple[int | None, str], ...] = ((30, "0-30"), (60, "31-60"), (90, "61-90"), (None, "90+"))
+
+
+def _eur(centimos: int) -> Decimal:
+    return Decimal(int(centimos)).scaleb(-2)
+
+
+def _centimos(col):
+    return cast(func.round(col * 100), Integer)
+
+
+def _pendientes():
+    return FacturaEmitida.estado_cobro == literal_column(f"'{PENDIENTE}'")
+
+
+def antiguedad(hoy: date | None = None, por_cliente: bool = False) -> list[dict]:
+    """Importe pendiente de cobro (base + IVA - retención) por tramo de
+    antigüedad a fecha `hoy` (por defecto, hoy).
+
+    Sin `por_cliente`, una fila por tramo (también los vacíos). Con
+    `por_cliente`, una fila por cliente con deuda, con el importe de cada
+    tramo y el total, de mayor a menor deuda."""
+    hoy = hoy or date.today()
+    # Se compara la fecha con el inicio de cada tramo en vez de calcular los
+    # días de cada factura; las de fecha futura caen en el primer tramo
+    tramo = case(
+        *(
+            (FacturaEmitida.fecha_emision >= hoy - timedelta(days=limite), i)
+            for i, (limite, _) in enumerate(TRAMOS)
+            if limite is not None
+        ),
+        else_=len(TRAMOS) - 1,
+    ).label("tramo")
+    importe = (
+        _centimos(FacturaEmitida.base_eur)
+        + _centimos(FacturaEmitida.cuota_iva)
+        - _centimos(FacturaEmitida.ret_irpf_importe)
+    )
+    cols = [tramo, func.count(), func.sum(importe)]
+    if por_cliente:
+        cols.insert(0, FacturaEmitida.cliente_id)
+    stmt = select(*cols).where(_pendientes()).group_by(*cols[: 2 if por_cliente else 1])
+
+    with get_session() as s:
+        filas = s.exec(stmt).all()
+        if not por_cliente:
+            por_tramo = {t: (n, cent) for t, n, cent in filas}
+            out = []
+            for i, (_, etiqueta) in enumerate(TRAMOS):
+                n, cent = por_tramo.get(i, (0, 0))
+                out.append({"tramo": etiqueta, "n": n, "importe": _eur(cent)})
+            return out
+
+        clientes: dict[int | None, dict] = {}
+        for cliente_id, t, n, cent in filas:
+            c = clientes.setdefault(
+                cliente_id, {"cliente_id": cliente_id, "n": 0, "cent": [0] * len(TRAMOS)}
+            )
+            c["n"] += n
+            c["cent"][t] += cent
+        ids = [i for i in clientes if i is not None]
+        nombres = dict(s.exec(select(Cliente.id, Cliente.nombre).where(Cliente.id.in_(ids))).all()) if ids else {}
+
+    out = []
+    for c in sorted(clientes.values(), key=lambda c: (-sum(c["cent"]), c["cliente_id"] or 0)):
+        fila = {"cliente_id": c["cliente_id"], "cliente": nombres.get(c["cliente_id"], ""), "n": c["n"]}
+        fila.update({etiqueta: _eur(cent) for (_, etiqueta), cent in zip(TRAMOS, c["cent"])})
+        fila["total"] = _eur(sum(c["cent"]))
+        out.append(fila)
+    return out
@@ -0,0 +1,269 @@
+from collections.abc import Callable
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Integer, cast, extract, func, or_, tuple_, update
+from sqlmodel import select
+
+from ..db import get_async_session, get_session
+from ..models import Actividad, Cliente, FacturaEmitida, GastoDeducible, ResumenMensual
+from . import busqueda
+
+
+def rango_fechas(year: int, q: int | None = None) -> tuple[date, date]:
+    """Rango [inicio, fin) de un año o de un trimestre del año."""
+    if q is None:
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    start_month = 1 + (q - 1) * 3
+    start = date(year, start_month, 1)
+    if q == 4:
+        return start, date(year + 1, 1, 1)
+    return start, date(year, start_month + 3, 1)
+
+
+def _filtro_fecha(stmt, col, year: int | None, quarter: int | None):
+    if year:
+        # Rango sobre la columna indexada en vez de extraer el año por fila
+        start, end = rango_fechas(year, quarter)
+        return stmt.where((col >= start) & (col < end))
+    if quarter:
+        first = 1 + (quarter - 1) * 3
+        return stmt.where(extract("month", col).between(first, first + 2))
+    return stmt
+
+
+def filtrar_facturas(
+    stmt,
+    year: int | None = None,
+    quarter: int | None = None,
+    cliente: str | None = None,
+    actividad: Actividad | None = None,
+    estado: str | None = None,
+    estado_cobro: str | None = None,
+    texto: str | None = None,
+):
+    """Aplica a `stmt` los filtros habituales sobre FacturaEmitida.
+
+    `cliente` busca en nombre y NIF del cliente y `texto` además en número y
+    notas, por palabras (prefijo, sin mayúsculas ni acentos) con el índice
+    de services.busqueda. Sirve tanto para select() como para update()."""
+    stmt = _filtro_fecha(stmt, FacturaEmitida.fecha_emision, year, quarter)
+    if cliente:
+        stmt = stmt.where(
+            busqueda.coincide(
+                busqueda.FACTURAS, FacturaEmitida.id, cliente, ("cliente_nombre", "cliente_nif")
+            )
+        )
+    if texto:
+        stmt = stmt.where(busqueda.coincide(busqueda.FACTURAS, FacturaEmitida.id, texto))
+    if actividad is not None:
+        stmt = stmt.where(FacturaEmitida.actividad == actividad)
+    if estado is not None:
+        stmt = stmt.where(FacturaEmitida.estado == estado)
+    if estado_cobro is not None:
+        stmt = stmt.where(FacturaEmitida.estado_cobro == estado_cobro)
+    return stmt
+
+
+def cliente_exacto(valor: str):
+    """Condición sobre FacturaEmitida: las facturas de un cliente concreto,
+    por su id (si `valor` es un número), su NIF o su nombre completo sin
+    mayúsculas ni espacios alrededor (como las claves de Cliente). A
+    diferencia del filtro `cliente` de filtrar_facturas, no busca por
+    palabras: "alv" no es "Álvarez"."""
+    valor = valor.strip()
+    if valor.isdigit():
+        return FacturaEmitida.cliente_id == int(valor)
+    # NIF normalizado como en migraciones.Dimension.nif_sql
+    nif = valor.replace("-", "").replace(" ", "").upper()
+    return or_(
+        FacturaEmitida.cliente_id.in_(select(Cliente.id).where(Cliente.nif == nif)),
+        func.casefold(func.trim(FacturaEmitida.cliente_nombre)) == func.casefold(valor),
+    )
+
+
+def filtrar_gastos(
+    stmt,
+    year: int | None = None,
+    quarter: int | None = None,
+    proveedor: str | None = None,
+):
+    """Aplica a `stmt` los filtros habituales sobre GastoDeducible."""
+    stmt = _filtro_fecha(stmt, GastoDeducible.fecha, year, quarter)
+    if proveedor:
+        stmt = stmt.where(busqueda.coincide(busqueda.GASTOS, GastoDeducible.id, proveedor))
+    return stmt
+
+
+def despues_de(stmt, fecha_col, id_col, after: tuple[date, int] | None, desc: bool = False):
+    """Paginación por clave (keyset) sobre (fecha, id).
+
+    En lugar de OFFSET, cada página empieza justo después de la última fila
+    de la anterior, así que pedir la página N no cuesta recorrer las N-1
+    anteriores."""
+    if after is not None:
+        clave = tuple_(fecha_col, id_col)
+        stmt = stmt.where(clave < tuple_(*after) if desc else clave > tuple_(*after))
+    if desc:
+        return stmt.order_by(fecha_col.desc(), id_col.desc())
+    return stmt.order_by(fecha_col, id_col)
+
+
+def _centimos(col):
+    # Suma exacta: los importes se guardan con 2 decimales, así que se suman
+    # como enteros (céntimos) en lugar de como REAL.
+    return func.coalesce(func.sum(cast(func.round(col * 100), Integer)), 0)
+
+
+def _eur(centimos: int) -> Decimal:
+    return Decimal(int(centimos)).scaleb(-2)
+
+
+def pagina_facturas(after: tuple[date, int] | None, limit: int, **filtros) -> list[FacturaEmitida]:
+    stmt = filtrar_facturas(select(FacturaEmitida), **filtros)
+    stmt = despues_de(stmt, FacturaEmitida.fecha_emision, FacturaEmitida.id, after)
+    with get_session() as s:
+        return list(s.exec(stmt.limit(limit)).all())
+
+
+def actualizar_facturas(
+    valores: dict,
+    *condiciones,
+    avisar: Callable[[int], None] | None = None,
+    dry_run: bool = False,
+    **filtros,
+) -> int:
+    """Un único UPDATE sobre las facturas que cumplen condiciones y filtros.
+
+    `avisar` recibe el número de facturas que coinciden antes del UPDATE, en
+    la misma transacción; con `dry_run` solo se cuentan. Devuelve el número
+    de facturas afectadas (o que lo serían)."""
+    stmt = filtrar_facturas(update(FacturaEmitida).where(*condiciones), **filtros)
+    stmt = stmt.values(**valores).execution_options(synchronize_session=False)
+    with get_session() as s:
+        if avisar is not None or dry_run:
+            contar = filtrar_facturas(select(func.count(FacturaEmitida.id)).where(*condiciones), **filtros)
+            n = s.exec(contar).one()
+            if n and avisar is not None:
+                avisar(n)
+            if dry_run or not n:
+                return n
+        n = s.exec(stmt).rowcount
+        s.commit()
+    return n
+
+
+def _totales_facturas_stmt(**filtros):
+    return filtrar_facturas(
+        select(
+            func.count(FacturaEmitida.id),
+            _centimos(FacturaEmitida.base_eur),
+            _centimos(FacturaEmitida.cuota_iva),
+            _centimos(FacturaEmitida.ret_irpf_importe),
+        ),
+        **filtros,
+    )
+
+
+def _fila_totales_facturas(fila) -> dict:
+    n, base, iva, irpf = fila
+    return {"n": n, "base": _eur(base), "iva": _eur(iva), "irpf": _eur(irpf)}
+
+
+def totales_facturas(**filtros) -> dict:
+    with get_session() as s:
+        return _fila_totales_facturas(s.exec(_totales_facturas_stmt(**filtros)).one())
+
+
+async def totales_facturas_async(**filtros) -> dict:
+    async with get_async_session() as s:
+        return _fila_totales_facturas((await s.exec(_totales_facturas_stmt(**filtros))).one())
+
+
+AGRUPACIONES = ("cliente", "actividad", "mes")
+
+
+def ingresos_agrupados(
+    by: str,
+    year: int | None = None,
+    quarter: int | None = None,
+    por_trimestre: bool = False,
+) -> list[dict]:
+    """Facturación (nº de facturas, base, IVA, IRPF) agrupada por cliente,
+    actividad o mes, y opcionalmente además por trimestre.
+
+    Se agrega ResumenMensual (una fila por cliente, actividad y mes, al día
+    gracias a triggers), no las facturas: unos cientos de filas por muchos
+    años de datos que tenga la base."""
+    r = ResumenMensual
+    trimestre = ((cast(func.substr(r.mes, 6, 2), Integer) + 2) // 3).label("trimestre")
+    if by == "cliente":
+        claves, grupo = [Cliente.nombre], [Cliente.id, Cliente.nombre]
+    elif by == "actividad":
+        claves, grupo = [r.actividad], [r.actividad]
+    elif by == "mes":
+        claves, grupo = [r.mes], [r.mes]
+        por_trimestre = False
+    else:
+        raise ValueError(f"Agrupación inválida: {by}")
+    if por_trimestre:
+        claves, grupo = [*claves, trimestre], [*grupo, trimestre]
+
+    base = func.sum(r.base_cent)
+    stmt = select(*claves, func.sum(r.n_facturas), base, func.sum(r.iva_cent), func.sum(r.irpf_cent))
+    if by == "cliente":
+        stmt = stmt.join(Cliente, Cliente.id == r.cliente_id)
+    if year:
+        # mes es texto YYYY-MM: el rango se compara como cadenas
+        primero, ultimo = (1, 12) if quarter is None else (3 * quarter - 2, 3 * quarter)
+        stmt = stmt.where(r.mes.between(f"{year}-{primero:02d}", f"{year}-{ultimo:02d}"))
+    elif quarter:
+        stmt = stmt.where(trimestre == quarter)
+    stmt = stmt.where(r.n_facturas > 0).group_by(*grupo)
+    # Los clientes, de más a menos facturación; el resto, por clave
+    orden = [base.desc()] if by == "cliente" and not por_trimestre else [grupo[0]]
+    stmt = stmt.order_by(*orden, *grupo[1:])
+
+    with get_session() as s:
+        filas = s.exec(stmt).all()
+    out = []
+    for f in filas:
+        d = {by: f[0]}
+        if por_trimestre:
+            d["trimestre"] = f[1]
+        n, b, iva, irpf = f[-4:]
+        out.append({**d, "n": n, "base": _eur(b), "iva": _eur(iva), "irpf": _eur(irpf)})
+    return out
+
+
+def pagina_gastos(after: tuple[date, int] | None, limit: int, **filtros) -> list[GastoDeducible]:
+    stmt = filtrar_gastos(select(GastoDeducible), **filtros)
+    stmt = despues_de(stmt, GastoDeducible.fecha, GastoDeducible.id, after)
+    with get_session() as s:
+        return list(s.exec(stmt.limit(limit)).all())
+
+
+def _totales_gastos_stmt(**filtros):
+    return filtrar_gastos(
+        select(
+            func.count(GastoDeducible.id),
+            _centimos(GastoDeducible.base_eur),
+            _centimos(GastoDeducible.cuota_iva),
+        ),
+        **filtros,
+    )
+
+
+def _fila_totales_gastos(fila) -> dict:
+    n, base, iva = fila
+    return {"n": n, "base": _eur(base), "iva": _eur(iva)}
+
+
+def totales_gastos(**filtros) -> dict:
+    with get_session() as s:
+        return _fila_totales_gastos(s.exec(_totales_gastos_stmt(**filtros)).one())
+
+
+async def totales_gastos_async(**filtros) -> dict:
+    async with get_async_session() as s:
+        return _fila_totales_gastos((await s.exec(_totales_gastos_stmt(**filtros))).one())
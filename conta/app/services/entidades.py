@@ -0,0 +1,60 @@
+"""
+Clientes y proveedores con sus totales acumulados.
+
+Los totales (número de facturas/gastos e importes en céntimos) los mantienen
+triggers de SQLite en cada alta, cambio o baja (ver migraciones.py), así que
+los rankings son una lectura ordenada de unas pocas filas, sin agregar
+facturas ni gastos.
+"""
+
+from decimal import Decimal
+
+from sqlmodel import select
+
+from ..db import get_session
+from ..models import Cliente, Proveedor
+
+# Criterio de orden -> columna
+ORDENES_CLIENTE = {"base": Cliente.base_cent, "n": Cliente.n_facturas, "iva": Cliente.iva_cent, "irpf": Cliente.irpf_cent}
+ORDENES_PROVEEDOR = {"base": Proveedor.base_cent, "n": Proveedor.n_gastos, "iva": Proveedor.iva_cent}
+
+
+def _eur(centimos: int) -> Decimal:
+    return Decimal(int(centimos)).scaleb(-2)
+
+
+def top_clientes(limit: int | None = 10, orden: str = "base") -> list[dict]:
+    """Clientes ordenados (de mayor a menor) por `orden`: base, n, iva o irpf."""
+    stmt = select(Cliente).where(Cliente.n_facturas > 0)
+    stmt = stmt.order_by(ORDENES_CLIENTE[orden].desc(), Cliente.id).limit(limit)
+    with get_session() as s:
+        return [
+            {
+                "id": c.id,
+                "nombre": c.nombre,
+                "nif": c.nif,
+                "facturas": c.n_facturas,
+                "base": _eur(c.base_cent),
+                "iva": _eur(c.iva_cent),
+                "irpf": _eur(c.irpf_cent),
+            }
+            for c in s.exec(stmt)
+        ]
+
+
+def top_proveedores(limit: int | None = 10, orden: str = "base") -> list[dict]:
+    """Proveedores ordenados (de mayor a menor) por `orden`: base, n o iva."""
+    stmt = select(Proveedor).where(Proveedor.n_gastos > 0)
+    stmt = stmt.order_by(ORDENES_PROVEEDOR[orden].desc(), Proveedor.id).limit(limit)
+    with get_session() as s:
+        return [
+            {
+                "id": p.id,
+                "nombre": p.nombre,
+                "nif": p.nif,
+                "gastos": p.n_gastos,
+                "base": _eur(p.base_cent),
+                "iva": _eur(p.iva_cent),
+            }
+            for p in s.exec(stmt)
+        ]
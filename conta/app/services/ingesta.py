@@ -0,0 +1,323 @@
+"""
+Alta masiva de facturas, gastos y cuotas desde CSV, JSON o JSONL.
+
+Las filas se procesan por lotes: se validan con los mismos esquemas que la
+CLI (FacturaIn, GastoIn, CuotaAutonomoIn), los importes derivados se
+calculan de una pasada para todo el lote (services.importes), los duplicados se descartan
+contra un conjunto de claves leído una sola vez de la base de datos y cada
+lote se inserta en su propia transacción con un único INSERT.
+"""
+
+import csv
+import json
+import re
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlmodel import select
+
+from ..db import get_session
+from ..models import FacturaEmitida, GastoDeducible, PagoAutonomo
+from ..schemas import CuotaAutonomoIn, FacturaIn, GastoIn
+from .importes import CENT, porcentajes
+
+CHUNK = 1000
+
+# Separador decimal de los importes -> separador de miles
+SEPARADORES = {",": ".", ".": ","}
+
+
+@dataclass
+class Resultado:
+    leidas: int = 0
+    insertadas: int = 0
+    duplicadas: int = 0
+    errores: list[tuple[int, str]] = field(default_factory=list)
+
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+
+
+def _objeto(fila, n: int) -> dict:
+    if not isinstance(fila, dict):
+        raise ValueError(f"fila {n}: se esperaba un objeto JSON, no {type(fila).__name__}")
+    return fila
+
+
+def leer_filas(path: str | Path):
+    """Filas (dict) de un CSV, un JSON (lista de objetos) o un JSONL.
+
+    ValueError si el fichero no se puede leer o alguna fila no es un objeto."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with path.open(encoding="utf-8-sig", newline="") as fh:
+        if suffix == ".json":
+            datos = json.load(fh)
+            if not isinstance(datos, list):
+                raise ValueError(f"se esperaba una lista de objetos, no {type(datos).__name__}")
+            for n, fila in enumerate(datos, start=1):
+                yield _objeto(fila, n)
+        elif suffix == ".jsonl":
+            n = 0
+            for line in fh:
+                if line.strip():
+                    n += 1
+                    yield _objeto(json.loads(line), n)
+        else:
+            yield from csv.DictReader(fh, dialect=_dialecto(fh))
+
+
+def _dialecto(fh):
+    # Las hojas de cálculo en español suelen exportar con ';'
+    muestra = fh.read(4096)
+    fh.seek(0)
+    return csv.Sniffer().sniff(muestra, delimiters=",;\t") if muestra else csv.excel
+
+
+def separador_decimal(path: str | Path) -> str:
+    """Separador decimal de los importes de un fichero cuando no se indica:
+    ',' en los CSV separados por ';' (las hojas de cálculo en español
+    exportan así, con '.' de miles) y '.' en el resto."""
+    path = Path(path)
+    if path.suffix.lower() in (".json", ".jsonl"):
+        return "."
+    with path.open(encoding="utf-8-sig", newline="") as fh:
+        return "," if _dialecto(fh).delimiter == ";" else "."
+
+
+def _fecha(v):
+    if isinstance(v, str):
+        v = v.strip()
+        if len(v) == 10 and v[2] == "-" and v[5] == "-":
+            # DD-MM-YYYY sin pasar por strptime (bastante más lento)
+            return date(int(v[6:]), int(v[3:5]), int(v[:2]))
+        return date.fromisoformat(v)
+    return v
+
+
+def _importe(decimal: str) -> Callable:
+    """Normalizador de importes con un único formato para todo el fichero:
+    "1.500" son 1500 con coma decimal y 1,5 con punto decimal; lo que no
+    encaja en el formato (p. ej. "1,234.50" con coma decimal) es un error."""
+    miles = SEPARADORES[decimal]
+    d, m = re.escape(decimal), re.escape(miles)
+    patron = re.compile(rf"[-+]?(?:\d{{1,3}}(?:{m}\d{{3}})+|\d+)(?:{d}\d+)?")
+    ejemplo = f"1{miles}234{decimal}50"
+
+    def _normalizar_importe(v):
+        # Los números de JSON se dejan tal cual
+        if isinstance(v, str):
+            v = v.strip().replace(" ", "")
+            if not patron.fullmatch(v):
+                raise ValueError(f"importe '{v}' con formato distinto de {ejemplo}")
+            v = v.replace(miles, "").replace(decimal, ".")
+        return v
+
+    return _normalizar_importe
+
+
+@lru_cache
+def _conversores(esquema: type, extra: tuple[str, ...], decimal: str) -> dict:
+    """Campo -> función de normalización, calculado una vez por esquema y
+    separador decimal."""
+    importe = _importe(decimal)
+    conv = {}
+    for nombre, info in esquema.model_fields.items():
+        if info.annotation in (date, date | None):
+            conv[nombre] = _fecha
+        elif info.annotation in (Decimal, Decimal | None):
+            conv[nombre] = importe
+    return conv | dict.fromkeys(extra, importe)
+
+
+def _normalizar(fila: dict, conv: dict) -> dict:
+    out = {}
+    for k, v in fila.items():
+        if k is None or v is None or (isinstance(v, str) and not v.strip()):
+            # Celdas vacías: se aplica el valor por defecto del esquema
+            continue
+        k = k.strip()
+        f = conv.get(k)
+        try:
+            out[k] = f(v) if f is not None else v
+        except ValueError as e:
+            raise ValueError(f"{k}: {e}") from None
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Importes derivados por lote
+# ---------------------------------------------------------------------------
+
+
+def _derivados_facturas(filas: list[dict]) -> None:
+    bases = [f["base_eur"] for f in filas]
+    cuotas = porcentajes(bases, [f["tipo_iva"] for f in filas])
+    retenciones = porcentajes(bases, [f["ret_irpf_pct"] for f in filas])
+    for f, cuota, ret in zip(filas, cuotas, retenciones):
+        f["cuota_iva"] = cuota
+        f["ret_irpf_importe"] = ret
+
+
+def _derivados_gastos(filas: list[dict]) -> None:
+    # Como en `conta gasto --cuota-iva`, la cuota de la factura tiene prioridad
+    for g in filas:
+        g["cuota_iva_manual"] = g.get("cuota_iva") is not None
+    calcular = [g for g in filas if g.get("cuota_iva") is None]
+    cuotas = porcentajes([g["base_eur"] for g in calcular], [g["tipo_iva"] for g in calcular])
+    for g, cuota in zip(calcular, cuotas):
+        g["cuota_iva"] = cuota
+    for g in filas:
+        g["cuota_iva"] = g["cuota_iva"].quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+# ---------------------------------------------------------------------------
+# Tipos de alta
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Tipo:
+    esquema: type
+    modelo: type
+    # Columnas que identifican una fila repetida
+    clave: tuple[str, ...]
+    derivados: Callable[[list[dict]], None] | None = None
+    # Columnas aceptadas además de las del esquema
+    extra: tuple[str, ...] = ()
+
+
+TIPOS: dict[str, Tipo] = {
+    "factura": Tipo(FacturaIn, FacturaEmitida, ("numero",), _derivados_facturas),
+    "gasto": Tipo(
+        GastoIn,
+        GastoDeducible,
+        ("proveedor", "fecha", "base_eur"),
+        _derivados_gastos,
+        extra=("cuota_iva",),
+    ),
+    "cuota": Tipo(CuotaAutonomoIn, PagoAutonomo, ("fecha", "importe_eur")),
+}
+
+
+def _clave(tipo: Tipo, fila: dict) -> tuple:
+    return tuple(fila[c] for c in tipo.clave)
+
+
+def claves_existentes(tipo: Tipo) -> set[tuple]:
+    cols = [getattr(tipo.modelo, c) for c in tipo.clave]
+    with get_session() as s:
+        filas = s.exec(select(*cols)).all()
+    # Con una sola columna exec() devuelve escalares, no filas
+    return {(r,) for r in filas} if len(cols) == 1 else {tuple(r) for r in filas}
+
+
+def _preparar(tipo: Tipo, fila: dict, campos: frozenset[str], decimal: str) -> tuple[dict, dict]:
+    datos = _normalizar(fila, _conversores(tipo.esquema, tipo.extra, decimal))
+    # Las columnas extra son importes opcionales (p.ej. la cuota de un gasto)
+    extra = {}
+    for k in tipo.extra:
+        if k in datos:
+            try:
+                extra[k] = Decimal(datos.pop(k))
+            except ArithmeticError:
+                raise ValueError(f"{k}: importe inválido")
+    desconocidas = datos.keys() - campos
+    if desconocidas:
+        raise ValueError(f"columnas desconocidas: {', '.join(sorted(desconocidas))}")
+    return datos, extra
+
+
+@lru_cache
+def _adaptador(esquema: type) -> TypeAdapter:
+    # Valida un lote entero en una sola llamada a pydantic-core
+    return TypeAdapter(list[esquema])
+
+
+def _validar_lote(tipo: Tipo, datos: list[dict]) -> tuple[list[dict], dict[int, str]]:
+    """Valida `datos` de una vez. Devuelve las filas válidas ya volcadas a dict
+    y los errores por posición dentro del lote."""
+    adaptador = _adaptador(tipo.esquema)
+    try:
+        return adaptador.dump_python(adaptador.validate_python(datos)), {}
+    except ValidationError as e:
+        errores: dict[int, list[str]] = {}
+        for err in e.errors():
+            i, *loc = err["loc"]
+            errores.setdefault(i, []).append(f"{'.'.join(str(p) for p in loc)}: {err['msg']}")
+    buenas = [d for i, d in enumerate(datos) if i not in errores]
+    validas = iter(adaptador.dump_python(adaptador.validate_python(buenas)))
+    return (
+        [None if i in errores else next(validas) for i in range(len(datos))],
+        {i: "; ".join(msgs) for i, msgs in errores.items()},
+    )
+
+
+def ingestar(
+    kind: str,
+    filas,
+    chunk: int = CHUNK,
+    dry_run: bool = False,
+    decimal: str = ".",
+) -> Resultado:
+    """Valida e inserta `filas` del tipo `kind` ("factura", "gasto" o "cuota").
+
+    Los importes en texto usan `decimal` como separador decimal (y el otro,
+    ver SEPARADORES, como separador de miles). Las filas inválidas se anotan
+    en `errores` (con su número de fila) y se saltan; las que repiten una
+    clave ya existente (o anterior en el mismo fichero) se cuentan como
+    duplicadas."""
+    tipo = TIPOS[kind]
+    res = Resultado()
+    vistas = claves_existentes(tipo)
+    campos = frozenset(tipo.esquema.model_fields)
+    tabla = tipo.modelo.__table__
+    filas = iter(filas)
+
+    while lote := list(islice(filas, chunk)):
+        preparadas: list[tuple[int, dict, dict]] = []
+        for fila in lote:
+            res.leidas += 1
+            try:
+                datos, extra = _preparar(tipo, fila, campos, decimal)
+            except (ValueError, TypeError, ArithmeticError) as e:
+                res.errores.append((res.leidas, str(e) or type(e).__name__))
+                continue
+            preparadas.append((res.leidas, datos, extra))
+
+        volcadas, errores = _validar_lote(tipo, [d for _, d, _ in preparadas])
+        validas: list[dict] = []
+        for i, ((linea, _, extra), datos) in enumerate(zip(preparadas, volcadas)):
+            if i in errores:
+                res.errores.append((linea, errores[i]))
+                continue
+            clave = _clave(tipo, datos)
+            if clave in vistas:
+                res.duplicadas += 1
+                continue
+            vistas.add(clave)
+            validas.append(datos | extra)
+        res.errores.sort()
+
+        if not validas:
+            continue
+        if tipo.derivados is not None:
+            tipo.derivados(validas)
+        if not dry_run:
+            with get_session() as s:
+                # INSERT de Core sobre la tabla: el ORM no aporta nada aquí y
+                # cuesta más que el propio executemany
+                s.exec(insert(tabla), params=validas)
+                s.commit()
+        res.insertadas += len(validas)
+
+    return res
@@ -1,5 +1,6 @@
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
+from typing import Sequence
 from sqlmodel import select
 
 from ..models import (
@@ -9,7 +10,8 @@ from ..models import (
     PagoFraccionado130,
     Actividad,
 )
-from ..db import get_session
+from ..db import cache_por_version, get_async_session, get_session
+from ..reglas import reglas
 
 TWOPLACES = Decimal("0.01")
 
@@ -30,65 +32,144 @@ def irpf_snapshot_acumulado(
     year: int,
     q: int,
     solo_programacion: bool = False,
+    hipoteticas: Sequence | None = None,
 ):
     """
     Snapshot fiscal acumulado IRPF (1 enero → fin trimestre).
     BASE del Modelo 130 oficial (apartado I).
+
+    `hipoteticas`: facturas, gastos y cuotas (FacturaEmitida, GastoDeducible,
+    PagoAutonomo sin guardar) que se suman como si existieran, sin tocar la
+    base de datos, partiendo de las sumas en memoria (sumas_acumulado). Los
+    de fuera del periodo se ignoran.
     """
+    if hipoteticas is not None:
+        sumas, pagos_previos = sumas_acumulado(year, q, solo_programacion)
+        extra = _sumas_irpf(*_filtrar_hipoteticas(hipoteticas, year, q, solo_programacion))
+        sumas = {k: v + extra[k] for k, v in sumas.items()}
+        return resultado_irpf(sumas, pagos_previos, year, q, solo_programacion)
+    stmts = _consultas_acumulado(year, q, solo_programacion)
+    with get_session() as s:
+        filas = [s.exec(stmt).all() for stmt in stmts]
+    return _calcular_irpf(*filas, year, q, solo_programacion)
+
+
+@cache_por_version(
+    FacturaEmitida.__tablename__,
+    GastoDeducible.__tablename__,
+    PagoAutonomo.__tablename__,
+    PagoFraccionado130.__tablename__,
+)
+def sumas_acumulado(year: int, q: int, solo_programacion: bool = False) -> tuple[dict[str, Decimal], Decimal]:
+    """Sumas exactas del acumulado y pagos previos; se guardan en memoria
+    hasta que cambia alguna de sus tablas."""
+    stmts = _consultas_acumulado(year, q, solo_programacion)
+    with get_session() as s:
+        facturas, gastos, cuotas, pagos = (s.exec(stmt).all() for stmt in stmts)
+        return _sumas_irpf(facturas, gastos, cuotas), _pagos_previos(pagos)
+
+
+def _filtrar_hipoteticas(hipoteticas: Sequence, year: int, q: int, solo_programacion: bool):
+    start, end = date(year, 1, 1), quarter_end(year, q)
+    facturas = [
+        h
+        for h in hipoteticas
+        if isinstance(h, FacturaEmitida)
+        and start <= h.fecha_emision <= end
+        and (not solo_programacion or h.actividad == Actividad.programacion)
+    ]
+    gastos = [h for h in hipoteticas if isinstance(h, GastoDeducible) and start <= h.fecha <= end]
+    cuotas = [h for h in hipoteticas if isinstance(h, PagoAutonomo) and start <= h.fecha <= end]
+    return facturas, gastos, cuotas
+
+
+async def irpf_snapshot_acumulado_async(
+    year: int,
+    q: int,
+    solo_programacion: bool = False,
+):
+    """irpf_snapshot_acumulado sobre el motor asíncrono (requiere aiosqlite)."""
+    stmts = _consultas_acumulado(year, q, solo_programacion)
+    async with get_async_session() as s:
+        filas = [(await s.exec(stmt)).all() for stmt in stmts]
+    return _calcular_irpf(*filas, year, q, solo_programacion)
+
+
+def _consultas_acumulado(year: int, q: int, solo_programacion: bool):
     start = date(year, 1, 1)
     end = quarter_end(year, q)
 
-    with get_session() as s:
-        # FACTURAS
-        stmt_f = select(FacturaEmitida).where(
-            FacturaEmitida.fecha_emision.between(start, end)
+    # FACTURAS
+    stmt_f = select(FacturaEmitida).where(
+        FacturaEmitida.fecha_emision.between(start, end)
+    )
+    if solo_programacion:
+        stmt_f = stmt_f.where(
+            FacturaEmitida.actividad == Actividad.programacion
         )
-        if solo_programacion:
-            stmt_f = stmt_f.where(
-                FacturaEmitida.actividad == Actividad.programacion
-            )
-        facturas = s.exec(stmt_f).all()
-
-        # GASTOS
-        gastos = s.exec(
-            select(GastoDeducible).where(
-                GastoDeducible.fecha.between(start, end)
-            )
-        ).all()
-
-        # CUOTAS AUTÓNOMOS (por devengo)
-        cuotas = s.exec(
-            select(PagoAutonomo).where(
-                PagoAutonomo.fecha.between(start, end)
-            )
-        ).all()
-
-        # PAGOS FRACCIONADOS PREVIOS
-        pagos_previos = s.exec(
-            select(PagoFraccionado130).where(
-                PagoFraccionado130.year == year,
-                PagoFraccionado130.quarter < q,
-            )
-        ).all()
-
-    ingresos = sum((f.base_eur for f in facturas), Decimal("0"))
-
-    gastos_sin_ss = sum(
-    (
-        (g.base_eur + (Decimal("0") if g.iva_deducible else g.cuota_iva))
-        * g.afecto_pct / Decimal("100")
-        for g in gastos
-    ),
-    Decimal("0"),
-)
 
-    cuotas_ss = sum((c.importe_eur for c in cuotas), Decimal("0"))
+    # GASTOS
+    stmt_g = select(GastoDeducible).where(
+        GastoDeducible.fecha.between(start, end)
+    )
+
+    # CUOTAS AUTÓNOMOS (por devengo)
+    stmt_c = select(PagoAutonomo).where(
+        PagoAutonomo.fecha.between(start, end)
+    )
+
+    # PAGOS FRACCIONADOS PREVIOS
+    stmt_p = select(PagoFraccionado130).where(
+        PagoFraccionado130.year == year,
+        PagoFraccionado130.quarter < q,
+    )
+    return stmt_f, stmt_g, stmt_c, stmt_p
+
+
+def _calcular_irpf(facturas, gastos, cuotas, pagos_previos, year: int, q: int, solo_programacion: bool):
+    return resultado_irpf(
+        _sumas_irpf(facturas, gastos, cuotas), _pagos_previos(pagos_previos), year, q, solo_programacion
+    )
+
+
+def _sumas_irpf(facturas, gastos, cuotas) -> dict[str, Decimal]:
+    return {
+        "ingresos": sum((f.base_eur for f in facturas), Decimal("0")),
+        "gastos_sin_ss": sum(
+            (
+                (g.base_eur + (Decimal("0") if g.iva_deducible else g.cuota_iva))
+                * g.afecto_pct / Decimal("100")
+                for g in gastos
+            ),
+            Decimal("0"),
+        ),
+        "cuotas_ss": sum((c.importe_eur for c in cuotas), Decimal("0")),
+        "retenciones": sum((f.ret_irpf_importe for f in facturas), Decimal("0")),
+    }
+
+
+def _pagos_previos(pagos_previos) -> Decimal:
+    # Casilla 05: solo se suman los resultados POSITIVOS de trimestres
+    # anteriores del mismo ejercicio. Un resultado negativo (a devolver/sin
+    # ingreso) no se arrastra como crédito -> cuenta como cero.
+    # Ref.: instrucciones modelo 130, casilla 05.
+    return sum(
+        (max(p.resultado, Decimal("0")) for p in pagos_previos), Decimal("0")
+    ).quantize(TWOPLACES)
+
+
+def resultado_irpf(sumas: dict[str, Decimal], pagos_previos_total: Decimal, year: int, q: int, solo_programacion: bool):
+    ingresos = sumas["ingresos"]
+    gastos_sin_ss = sumas["gastos_sin_ss"]
+    cuotas_ss = sumas["cuotas_ss"]
     total_gastos = gastos_sin_ss + cuotas_ss
 
     rendimiento = ingresos - total_gastos
 
+    # Porcentaje del pago fraccionado (20 %) según config/rules.yml
+    pct = reglas(year, q).pago_fraccionado_pct
     base_20 = (
-        (rendimiento * Decimal("0.20"))
+        (rendimiento * pct / Decimal("100"))
         .quantize(TWOPLACES, rounding=ROUND_HALF_UP)
         if rendimiento > 0
         else Decimal("0.00")
@@ -97,18 +178,7 @@ def irpf_snapshot_acumulado(
     if solo_programacion:
         retenciones = Decimal("0.00")
     else:
-        retenciones = sum(
-            (f.ret_irpf_importe for f in facturas),
-            Decimal("0"),
-        ).quantize(TWOPLACES)
-
-    # Casilla 05: solo se suman los resultados POSITIVOS de trimestres
-    # anteriores del mismo ejercicio. Un resultado negativo (a devolver/sin
-    # ingreso) no se arrastra como crédito -> cuenta como cero.
-    # Ref.: instrucciones modelo 130, casilla 05.
-    pagos_previos_total = sum(
-        (max(p.resultado, Decimal("0")) for p in pagos_previos), Decimal("0")
-    ).quantize(TWOPLACES)
+        retenciones = sumas["retenciones"].quantize(TWOPLACES)
 
     resultado = (
         base_20
@@ -129,4 +199,3 @@ def irpf_snapshot_acumulado(
             "cuotas_ss": cuotas_ss.quantize(TWOPLACES),
         },
     }
-
@@ -1,8 +1,9 @@
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import date
+from typing import Sequence
 from sqlmodel import select
 from ..models import FacturaEmitida, GastoDeducible
-from ..db import get_session
+from ..db import cache_por_version, get_async_session, get_session
 
 
 TWOPLACES = Decimal("0.01")
@@ -23,29 +24,78 @@ def quarter_range(year: int, q: int):
     return start, end
 
 
-def iva_trimestre(year: int, q: int):
+def _consultas_trimestre(year: int, q: int):
     start, end = quarter_range(year, q)
+    em_sel = select(FacturaEmitida).where(FacturaEmitida.fecha_emision.between(start, end))
+    re_sel = select(GastoDeducible).where(GastoDeducible.fecha.between(start, end))
+    return em_sel, re_sel
+
+
+def iva_trimestre(year: int, q: int, hipoteticas: Sequence | None = None):
+    """IVA (modelo 303) de un trimestre.
+
+    `hipoteticas`: facturas y gastos (FacturaEmitida / GastoDeducible sin
+    guardar) que se suman a los del trimestre como si existieran, sin tocar
+    la base de datos, partiendo de las sumas del trimestre en memoria
+    (sumas_trimestre). Los del resto de fechas se ignoran."""
+    if hipoteticas is not None:
+        start, end = quarter_range(year, q)
+        em = [h for h in hipoteticas if isinstance(h, FacturaEmitida) and start <= h.fecha_emision <= end]
+        re = [h for h in hipoteticas if isinstance(h, GastoDeducible) and start <= h.fecha <= end]
+        sumas = _sumar(sumas_trimestre(year, q), _sumas_iva(em, re))
+        return _resultado_iva(year, q, sumas)
+    em_sel, re_sel = _consultas_trimestre(year, q)
     with get_session() as s:
-        em_sel = select(FacturaEmitida).where(FacturaEmitida.fecha_emision.between(start, end))
         em = s.exec(em_sel).all()
-        re_sel = select(GastoDeducible).where(GastoDeducible.fecha.between(start, end))
         re = s.exec(re_sel).all()
+    return _calcular_iva(year, q, em, re)
+
+
+@cache_por_version(FacturaEmitida.__tablename__, GastoDeducible.__tablename__)
+def sumas_trimestre(year: int, q: int) -> dict[str, Decimal]:
+    """Sumas exactas (sin redondear) del trimestre; se guardan en memoria
+    hasta que cambian las facturas o los gastos."""
+    em_sel, re_sel = _consultas_trimestre(year, q)
+    with get_session() as s:
+        return _sumas_iva(s.exec(em_sel).all(), s.exec(re_sel).all())
+
 
+async def iva_trimestre_async(year: int, q: int):
+    """iva_trimestre sobre el motor asíncrono (requiere aiosqlite)."""
+    em_sel, re_sel = _consultas_trimestre(year, q)
+    async with get_async_session() as s:
+        em = (await s.exec(em_sel)).all()
+        re = (await s.exec(re_sel)).all()
+    return _calcular_iva(year, q, em, re)
 
+
+def _calcular_iva(year: int, q: int, em, re):
+    return _resultado_iva(year, q, _sumas_iva(em, re))
+
+
+def _sumar(a: dict[str, Decimal], b: dict[str, Decimal]) -> dict[str, Decimal]:
+    return {k: a[k] + b[k] for k in a}
+
+
+def _sumas_iva(em, re) -> dict[str, Decimal]:
     # Solo consideramos como devengado las facturas con IVA distinto de 0
     em_devengado = [f for f in em if f.cuota_iva != Decimal("0")] 
     re_deducible = [g for g in re if g.iva_deducible]
 
-    devengado = sum((f.cuota_iva for f in em_devengado), Decimal("0"))
-    deducible = sum((g.cuota_iva * g.afecto_pct / Decimal("100") for g in re_deducible), Decimal("0"))
-    base_devengado = sum((f.base_eur for f in em_devengado), Decimal("0"))
-    base_deducible = sum((g.base_eur * g.afecto_pct / Decimal("100") for g in re_deducible), Decimal("0"))
+    return {
+        "devengado": sum((f.cuota_iva for f in em_devengado), Decimal("0")),
+        "deducible": sum((g.cuota_iva * g.afecto_pct / Decimal("100") for g in re_deducible), Decimal("0")),
+        "base_devengado": sum((f.base_eur for f in em_devengado), Decimal("0")),
+        "base_deducible": sum((g.base_eur * g.afecto_pct / Decimal("100") for g in re_deducible), Decimal("0")),
+    }
 
 
+def _resultado_iva(year: int, q: int, sumas: dict[str, Decimal]):
+    devengado, deducible = sumas["devengado"], sumas["deducible"]
     return {
         "periodo": f"{year}Q{q}",
-        "base_devengado": base_devengado.quantize(TWOPLACES, rounding=ROUND_HALF_UP),
-        "base_deducible": base_deducible.quantize(TWOPLACES, rounding=ROUND_HALF_UP),
+        "base_devengado": sumas["base_devengado"].quantize(TWOPLACES, rounding=ROUND_HALF_UP),
+        "base_deducible": sumas["base_deducible"].quantize(TWOPLACES, rounding=ROUND_HALF_UP),
         "iva_devengado": devengado.quantize(TWOPLACES, rounding=ROUND_HALF_UP),
         "iva_deducible": deducible.quantize(TWOPLACES, rounding=ROUND_HALF_UP),
         "resultado": (devengado - deducible).quantize(TWOPLACES, rounding=ROUND_HALF_UP),
@@ -0,0 +1,142 @@
+"""
+Previsión de los resultados del Modelo 303 y del Modelo 130 al cierre de
+cada trimestre y del ejercicio.
+
+Se parte de los totales mensuales de todo el histórico (agregados.py), que
+se calculan una vez y se guardan en memoria hasta que cambian sus tablas:
+solo se vuelven a leer cuando se registra, cambia o borra algo.
+
+Cada mes que aún no ha terminado se estima, para cada magnitud, como el
+ritmo mensual de los últimos 12 meses cerrados por el índice de
+estacionalidad de ese mes del año (su media en los ejercicios completos
+anteriores respecto a la media mensual de cada ejercicio; 1 si no hay
+histórico). Lo ya registrado nunca se rebaja: la previsión de un mes es el
+máximo entre lo registrado y lo estimado. Los meses cerrados usan los
+importes reales, así que la previsión de un trimestre ya terminado coincide
+con iva_trimestre e irpf_snapshot_acumulado.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlmodel import select
+
+from ..db import cache_por_version, get_session
+from ..models import PagoFraccionado130
+from . import agregados
+from .agregados import METRICAS, Mes
+
+
+@dataclass(frozen=True)
+class Modelo:
+    # Media mensual de los últimos 12 meses cerrados, por magnitud
+    ritmo: dict[str, float]
+    # Índice de estacionalidad de cada mes del año (posición 0 = enero)
+    estacionalidad: dict[str, tuple[float, ...]]
+
+    def estimar(self, metrica: str, mes: int) -> Decimal:
+        # Euros, al céntimo
+        return Decimal(round(self.ritmo[metrica] * self.estacionalidad[metrica][mes - 1] * 100)).scaleb(-2)
+
+
+def _ajustar(meses: dict[Mes, dict[str, Decimal]], actual: Mes) -> Modelo:
+    cerrados = sorted(m for m in meses if m < actual)
+    primero = cerrados[0] if cerrados else actual
+    # Los últimos 12 meses cerrados, contando como cero los que no tienen
+    # movimientos (pero no los anteriores al primer dato)
+    y, m = actual
+    ventana = [((y * 12 + m - 1 - k) // 12, (y * 12 + m - 1 - k) % 12 + 1) for k in range(1, 13)]
+    ventana = [v for v in ventana if v >= primero]
+    # Ejercicios completos anteriores, con datos desde enero
+    ejercicios = [e for e in range(primero[0], y) if (e, 1) >= primero]
+
+    ritmo, estacionalidad = {}, {}
+    for metrica in METRICAS:
+        valor = {mes: float(fila[metrica]) for mes, fila in meses.items()}
+        ritmo[metrica] = sum(valor.get(v, 0) for v in ventana) / len(ventana) if ventana else 0.0
+        indices = [[] for _ in range(12)]
+        for e in ejercicios:
+            media = sum(valor.get((e, mes), 0) for mes in range(1, 13)) / 12
+            if media > 0:
+                for mes in range(1, 13):
+                    indices[mes - 1].append(valor.get((e, mes), 0) / media)
+        estacionalidad[metrica] = tuple(sum(i) / len(i) if i else 1.0 for i in indices)
+    return Modelo(ritmo, estacionalidad)
+
+
+@cache_por_version(*agregados.TABLAS)
+def _modelo(actual: Mes) -> Modelo:
+    return _ajustar(agregados.mensuales(), actual)
+
+
+def _q(v: Decimal) -> Decimal:
+    return v.quantize(agregados.TWOPLACES, rounding=ROUND_HALF_UP)
+
+
+def prevision(year: int, hoy: date | None = None) -> dict:
+    """Resultados previstos del 303 y del 130 de cada trimestre de `year` y
+    del ejercicio, estimando desde `hoy` (por defecto, hoy) lo que falta.
+
+    Cada trimestre lleva también los resultados con lo registrado hasta
+    ahora (`iva_real`, `m130_real`), los mismos que iva_trimestre e
+    irpf_snapshot_acumulado."""
+    hoy = hoy or date.today()
+    actual = (hoy.year, hoy.month)
+    meses, modelo = agregados.mensuales(), _modelo(actual)
+    vacio = dict.fromkeys(METRICAS, agregados.CERO)
+
+    real, previsto = [], []
+    for mes in range(1, 13):
+        fila = meses.get((year, mes), vacio)
+        real.append(fila)
+        if (year, mes) < actual:
+            previsto.append(fila)
+        else:
+            previsto.append({m: max(fila[m], modelo.estimar(m, mes)) for m in METRICAS})
+
+    with get_session() as s:
+        presentados: dict[int, Decimal] = {}
+        for p in s.exec(select(PagoFraccionado130).where(PagoFraccionado130.year == year)):
+            # Casilla 05: solo cuentan los resultados positivos
+            presentados[p.quarter] = presentados.get(p.quarter, Decimal("0")) + max(p.resultado, Decimal("0"))
+
+    trimestres = []
+    previos_prev = Decimal("0.00")
+    for q in range(1, 5):
+        trimestre = range(3 * q - 3, 3 * q)
+        acum_real, acum_prev = agregados.sumar(real[: 3 * q]), agregados.sumar(previsto[: 3 * q])
+        previos_real = sum((presentados.get(p, Decimal("0")) for p in range(1, q)), Decimal("0")).quantize(
+            agregados.TWOPLACES
+        )
+        m130 = agregados.m130(year, q, acum_prev, previos_prev)
+        # Para los trimestres siguientes cuenta lo presentado o, si aún no
+        # se ha presentado, lo previsto
+        previos_prev += presentados.get(q, max(m130["resultado"], Decimal("0")))
+
+        del_trimestre = agregados.sumar(previsto[i] for i in trimestre)
+        iva_dev, iva_ded = del_trimestre["iva_devengado"], del_trimestre["iva_deducible"]
+        inicio, fin = date(year, 3 * q - 2, 1), (year, 3 * q)
+        trimestres.append(
+            {
+                "trimestre": q,
+                "estado": "cerrado" if fin < actual else "previsto" if inicio > hoy else "en curso",
+                "iva_devengado": _q(iva_dev),
+                "iva_deducible": _q(iva_ded),
+                "iva_resultado": _q(iva_dev - iva_ded),
+                "iva_real": agregados.resultado_303(agregados.sumar(real[i] for i in trimestre)),
+                "m130": m130,
+                "m130_real": agregados.m130(year, q, acum_real, previos_real)["resultado"],
+            }
+        )
+
+    return {
+        "year": year,
+        "fecha": hoy,
+        "trimestres": trimestres,
+        "anual": {
+            "iva_resultado": sum((t["iva_resultado"] for t in trimestres), Decimal("0.00")),
+            "m130_a_ingresar": sum((max(t["m130"]["resultado"], Decimal("0")) for t in trimestres), Decimal("0.00")),
+            "rendimiento": trimestres[-1]["m130"]["rendimiento"],
+        },
+    }
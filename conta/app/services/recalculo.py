@@ -0,0 +1,152 @@
+"""
+Recalcula los importes derivados guardados (cuota de IVA, retención de IRPF)
+a partir de la base y el porcentaje de cada fila, y corrige los que no
+cuadran. Las cuotas de gastos tomadas de la factura (cuota_iva_manual) no se
+recalculan.
+
+Las filas se leen por lotes (por id), con los importes ya en céntimos
+enteros desde SQLite; los importes correctos se calculan para todo el lote
+con services.importes.porcentajes_centimos y solo las filas que no cuadran
+se cargan como modelos. Las correcciones se escriben con un UPDATE por lote.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Integer, and_, cast, func, update
+from sqlmodel import select
+
+from ..db import get_session
+from ..models import FacturaEmitida, GastoDeducible
+from .consultas import rango_fechas
+from .importes import porcentaje, porcentajes_centimos
+
+CHUNK = 5000
+
+
+@dataclass(frozen=True)
+class Recalculo:
+    modelo: type
+    referencia: str
+    fecha: str
+    # Campo guardado -> campo con el porcentaje que lo genera (sobre base_eur)
+    derivados: dict[str, str]
+    # Columna booleana de las filas con importes introducidos a mano, que
+    # no se recalculan
+    manual: str | None = None
+
+
+RECALCULOS: dict[str, Recalculo] = {
+    "facturas": Recalculo(
+        FacturaEmitida,
+        "numero",
+        "fecha_emision",
+        {"cuota_iva": "tipo_iva", "ret_irpf_importe": "ret_irpf_pct"},
+    ),
+    "gastos": Recalculo(GastoDeducible, "proveedor", "fecha", {"cuota_iva": "tipo_iva"}, "cuota_iva_manual"),
+}
+
+
+@dataclass(frozen=True)
+class Cambio:
+    tabla: str
+    id: int
+    referencia: str
+    fecha: date
+    campo: str
+    guardado: Decimal
+    correcto: Decimal
+
+
+def _centimos(col):
+    return cast(func.round(col * 100), Integer)
+
+
+def _exacto(col):
+    # El valor cabe en céntimos (se guarda como REAL: se admite error de coma flotante)
+    return func.abs(col * 100 - func.round(col * 100)) < 1e-6
+
+
+def diferencias(tabla: str, year: int | None = None, chunk: int = CHUNK):
+    """Genera, lote a lote, (filas revisadas, lista de Cambio) de `tabla`
+    ("facturas" o "gastos")."""
+    import numpy as np
+
+    r = RECALCULOS[tabla]
+    m = r.modelo
+    fecha_col = getattr(m, r.fecha)
+    campos = list(r.derivados)
+    pct_cols = [getattr(m, p) for p in r.derivados.values()]
+    # Todo en céntimos desde SQLite: sin pasar cada importe por Decimal
+    cols = [
+        m.id,
+        _centimos(m.base_eur),
+        and_(_exacto(m.base_eur), *(_exacto(p) for p in pct_cols)),
+        *(_centimos(getattr(m, c)) for c in campos),
+        *(_centimos(p) for p in pct_cols),
+    ]
+    stmt = select(*cols).order_by(m.id).limit(chunk)
+    if r.manual is not None:
+        stmt = stmt.where(getattr(m, r.manual).is_(False))
+    if year is not None:
+        start, end = rango_fechas(year)
+        stmt = stmt.where((fecha_col >= start) & (fecha_col < end))
+
+    ultimo = 0
+    while True:
+        with get_session() as s:
+            filas = s.exec(stmt.where(m.id > ultimo)).all()
+        if not filas:
+            return
+        ultimo = filas[-1][0]
+
+        # tuple(): numpy trata las Row de SQLAlchemy como mapeos y es muy lento
+        datos = np.array([tuple(f) for f in filas], dtype=np.int64)
+        ids, bases, exactas = datos[:, 0], datos[:, 1], datos[:, 2].astype(bool)
+        correctos: dict[str, np.ndarray] = {}
+        distintas = ~exactas
+        for k, campo in enumerate(campos):
+            correctos[campo] = porcentajes_centimos(bases, datos[:, 3 + len(campos) + k])
+            distintas |= correctos[campo] != datos[:, 3 + k]
+
+        cambios = _cambios(tabla, ids[distintas].tolist(), correctos, ids) if distintas.any() else []
+        yield len(filas), cambios
+
+
+def _cambios(tabla: str, ids: list[int], correctos: dict, todos) -> list[Cambio]:
+    # Solo las filas candidatas se leen con el ORM (importes en Decimal)
+    r = RECALCULOS[tabla]
+    m = r.modelo
+    pos = {int(i): k for k, i in enumerate(todos.tolist())}
+    with get_session() as s:
+        filas = s.exec(select(m).where(m.id.in_(ids)).order_by(m.id)).all()
+    cambios = []
+    for f in filas:
+        for campo, pct in r.derivados.items():
+            base, pct_v, guardado = f.base_eur, getattr(f, pct), getattr(f, campo)
+            if _exacto_dec(base) and _exacto_dec(pct_v):
+                correcto = Decimal(int(correctos[campo][pos[f.id]])).scaleb(-2)
+            else:
+                correcto = porcentaje(base, pct_v)
+            if guardado != correcto:
+                cambios.append(
+                    Cambio(tabla, f.id, getattr(f, r.referencia), getattr(f, r.fecha), campo, guardado, correcto)
+                )
+    return cambios
+
+
+def _exacto_dec(v: Decimal) -> bool:
+    return v == v.quantize(Decimal("0.01"))
+
+
+def aplicar(tabla: str, cambios: list[Cambio]) -> None:
+    """Escribe los importes correctos de `cambios` en un único UPDATE por clave primaria."""
+    if not cambios:
+        return
+    valores: dict[int, dict] = {}
+    for c in cambios:
+        valores.setdefault(c.id, {"id": c.id})[c.campo] = c.correcto
+    with get_session() as s:
+        s.exec(update(RECALCULOS[tabla].modelo), params=list(valores.values()))
+        s.commit()
@@ -0,0 +1,107 @@
+"""
+Simulación de escenarios sobre el 303 y el 130 sin tocar la base de datos.
+
+Un escenario es una lista de filas hipotéticas (FacturaEmitida,
+GastoDeducible y PagoAutonomo sin guardar). iva_trimestre e
+irpf_snapshot_acumulado las suman a las sumas del periodo, que se leen una
+vez y quedan en memoria hasta que cambian los datos, así que evaluar cada
+escenario no hace ninguna consulta: se pueden comparar muchos en un bucle.
+
+Las filas se construyen como en `conta emite` / `conta gasto`: tipo de IVA y
+retención por defecto según las reglas vigentes en su fecha y cuotas
+redondeadas con `porcentaje`.
+"""
+
+import inspect
+from datetime import date
+from decimal import Decimal
+from typing import Sequence
+
+from ..models import Actividad, FacturaEmitida, GastoDeducible, PagoAutonomo
+from ..schemas import CuotaAutonomoIn, FacturaIn, GastoIn
+from .importes import porcentaje
+from .irpf import irpf_snapshot_acumulado
+from .iva import iva_trimestre
+
+
+def factura(
+    base_eur: Decimal,
+    fecha_emision: date,
+    actividad: Actividad = Actividad.programacion,
+    tipo_iva: Decimal | None = None,
+    ret_irpf_pct: Decimal | None = None,
+) -> FacturaEmitida:
+    f = FacturaIn(
+        numero="(simulada)",
+        cliente_nombre="(simulada)",
+        fecha_emision=fecha_emision,
+        base_eur=base_eur,
+        actividad=actividad,
+        tipo_iva=tipo_iva,
+        ret_irpf_pct=ret_irpf_pct,
+    )
+    return FacturaEmitida(
+        **f.model_dump(),
+        cuota_iva=porcentaje(f.base_eur, f.tipo_iva),
+        ret_irpf_importe=porcentaje(f.base_eur, f.ret_irpf_pct),
+    )
+
+
+def gasto(
+    base_eur: Decimal,
+    fecha: date,
+    tipo_iva: Decimal | None = None,
+    afecto_pct: Decimal = Decimal("100.00"),
+    iva_deducible: bool = True,
+) -> GastoDeducible:
+    g = GastoIn(
+        proveedor="(simulado)",
+        fecha=fecha,
+        base_eur=base_eur,
+        tipo_iva=tipo_iva,
+        afecto_pct=afecto_pct,
+        iva_deducible=iva_deducible,
+    )
+    return GastoDeducible(**g.model_dump(), cuota_iva=porcentaje(g.base_eur, g.tipo_iva))
+
+
+def cuota(importe_eur: Decimal, fecha: date) -> PagoAutonomo:
+    return PagoAutonomo(**CuotaAutonomoIn(fecha=fecha, importe_eur=importe_eur).model_dump())
+
+
+def escenario(d: dict, fecha: date) -> list:
+    """Filas hipotéticas de un escenario en forma de dict (p.ej. una línea
+    de un JSONL): claves `facturas`, `gastos` y `cuotas`, cada una una lista
+    con los campos de factura(), gasto() y cuota(). Sin fecha, `fecha`.
+
+    ValueError (o pydantic.ValidationError) si algún campo no es válido."""
+    filas = []
+    for clave, fn, campo_fecha in (
+        ("facturas", factura, "fecha_emision"),
+        ("gastos", gasto, "fecha"),
+        ("cuotas", cuota, "fecha"),
+    ):
+        for datos in d.get(clave) or []:
+            campos = inspect.signature(fn).parameters
+            # El importe es el único campo obligatorio
+            obligatorio = next(iter(campos))
+            if not isinstance(datos, dict) or obligatorio not in datos or not set(datos) <= set(campos):
+                raise ValueError(
+                    f"cada elemento de '{clave}' necesita {obligatorio} y admite {', '.join(campos)}"
+                )
+            filas.append(fn(**{campo_fecha: fecha, **datos}))
+    return filas
+
+
+def simular(year: int, q: int, hipoteticas: Sequence, solo_programacion: bool = False) -> dict:
+    """Resultados del 303 y del 130 del trimestre con las filas
+    `hipoteticas` añadidas."""
+    iva = iva_trimestre(year, q, hipoteticas)
+    m130 = irpf_snapshot_acumulado(year, q, solo_programacion, hipoteticas)
+    return {
+        "periodo": f"{year}Q{q}",
+        "iva": iva,
+        "m130": m130,
+        # A ingresar: un 303 o un 130 negativo no se cobra en el trimestre
+        "total": max(iva["resultado"], Decimal("0")) + max(m130["resultado"], Decimal("0")),
+    }
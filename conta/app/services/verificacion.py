@@ -0,0 +1,73 @@
+"""
+Verificación de los resultados presentados del 303 y del 130.
+
+Presentacion303.resultado y PagoFraccionado130.resultado se introducen a
+mano. Aquí se recalcula cada periodo presentado con lo registrado y se
+comparan. Todos los periodos salen de los mismos totales mensuales
+(agregados.mensuales, una consulta agrupada por tabla y en memoria hasta que
+cambian los datos) más una consulta por modelo para las presentaciones, así
+que el coste no crece con el número de periodos.
+
+Los resultados calculados son los mismos que iva_trimestre e
+irpf_snapshot_acumulado (modo oficial, con todas las actividades).
+"""
+
+from decimal import Decimal
+
+from sqlmodel import select
+
+from ..db import get_session
+from ..models import PagoFraccionado130, Presentacion303
+from . import agregados
+
+
+def verificar(year: int | None = None, tolerancia: Decimal = Decimal("0.00")) -> list[dict]:
+    """Una fila por presentación registrada (de `year`, o de todos los
+    ejercicios) con el resultado presentado, el calculado y la diferencia
+    (presentado - calculado). `ok` es False si la diferencia supera
+    `tolerancia` en valor absoluto."""
+    s303, s130 = select(Presentacion303), select(PagoFraccionado130)
+    if year is not None:
+        s303 = s303.where(Presentacion303.year == year)
+        s130 = s130.where(PagoFraccionado130.year == year)
+    with get_session() as s:
+        m303 = s.exec(s303).all()
+        m130 = s.exec(s130).all()
+    meses = agregados.mensuales()
+
+    # Casilla 05: resultados positivos de los 130 presentados, por ejercicio y
+    # trimestre (como en irpf_snapshot_acumulado)
+    positivos: dict[int, dict[int, Decimal]] = {}
+    for p in m130:
+        del_year = positivos.setdefault(p.year, {})
+        del_year[p.quarter] = del_year.get(p.quarter, Decimal("0")) + max(p.resultado, Decimal("0"))
+
+    filas = []
+
+    def _fila(modelo: str, p, calculado: Decimal):
+        # SQLite guarda los Decimal como REAL: se leen con ruido en los
+        # decimales que no se escribieron
+        presentado = p.resultado.quantize(agregados.TWOPLACES)
+        diferencia = presentado - calculado
+        filas.append(
+            {
+                "modelo": modelo,
+                "periodo": f"{p.year}Q{p.quarter}",
+                "presentado": presentado,
+                "calculado": calculado,
+                "diferencia": diferencia,
+                "ok": abs(diferencia) <= tolerancia,
+            }
+        )
+
+    for p in m303:
+        _fila("303", p, agregados.resultado_303(agregados.periodo(meses, p.year, 3 * p.quarter - 2, 3 * p.quarter)))
+    for p in m130:
+        previos = sum(
+            (v for q, v in positivos[p.year].items() if q < p.quarter), Decimal("0")
+        ).quantize(agregados.TWOPLACES)
+        acumulado = agregados.periodo(meses, p.year, 1, 3 * p.quarter)
+        _fila("130", p, agregados.m130(p.year, p.quarter, acumulado, previos)["resultado"])
+
+    filas.sort(key=lambda f: (f["periodo"], f["modelo"]))
+    return filas
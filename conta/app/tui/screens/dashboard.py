@@ -1,16 +1,21 @@
 from datetime import date
 from decimal import Decimal
+from textual import work
 from textual.app import ComposeResult
 from textual.reactive import reactive
 from textual.containers import VerticalScroll
 from textual.widget import Widget
 from textual.widgets import Button, Label, Select, Static
+from textual.worker import get_current_worker
 
 from sqlmodel import select as sql_select
 
-from ...db import get_session
-from ...models import PagoAutonomo
+from ...db import data_version, get_session
+from ...models import FacturaEmitida, GastoDeducible, PagoAutonomo, PagoFraccionado130
+from ...services.cobros import antiguedad
 from ...services.iva import iva_trimestre
+from ...services.agregados import TABLAS as PREVISION_TABLAS
+from ...services.prevision import prevision
 from ...services.irpf import irpf_snapshot_acumulado
 
 
@@ -57,32 +62,146 @@ class KVRow(Widget):
         yield Label(self._label, classes="kv-label")
         yield Label(self._value, classes=f"kv-value {self._value_class}".strip())
 
+    def set(self, label: str, value: str, value_class: str = "") -> None:
+        """Update the row in place, touching only the labels that changed."""
+        label_w, value_w = self.query(Label)
+        if label != self._label:
+            self._label = label
+            label_w.update(label)
+        if (value, value_class) != (self._value, self._value_class):
+            self._value = value
+            self._value_class = value_class
+            value_w.update(value)
+            value_w.set_classes(f"kv-value {value_class}".strip())
 
-class IVACard(Static):
-    """Card showing IVA summary for one quarter."""
 
-    def __init__(self, year: int, q: int) -> None:
-        super().__init__(classes="card")
-        self._year = year
-        self._q = q
+# (label, value, value_class)
+Row = tuple[str, str, str]
 
-    def compose(self) -> ComposeResult:
+
+class DataCard(Static):
+    """Base card that fetches its data in a thread worker.
+
+    Results are kept in a cache shared by the dashboard, keyed by card and
+    period and stamped with the data version of the tables the card reads
+    (TABLES). A refresh only queries again when one of those tables has been
+    written since, and new values are written into the existing rows instead
+    of remounting the card."""
+
+    TABLES: tuple[str, ...] = ()
+
+    def __init__(self, cache: dict, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._cache = cache
+        self._shown = None
+
+    def cache_key(self) -> tuple:
+        raise NotImplementedError
+
+    def load_data(self):
+        """Runs in a worker thread; returns the card data."""
+        raise NotImplementedError
+
+    def title(self) -> str:
+        raise NotImplementedError
+
+    def rows(self, data) -> list[Row]:
+        raise NotImplementedError
+
+    def error_text(self) -> str:
+        return "Error cargando datos"
+
+    def on_mount(self) -> None:
+        self.refresh_data()
+
+    def refresh_data(self) -> None:
+        version = data_version(*self.TABLES)
+        cached = self._cache.get(self.cache_key())
+        if cached is not None and cached[0] == version:
+            self._show(cached[1])
+            return
+        if self._shown is None:
+            self.loading = True
+        self._fetch(self.cache_key(), version)
+
+    @work(thread=True, exclusive=True, group="dash-load")
+    def _fetch(self, key: tuple, version: tuple[int, ...]) -> None:
+        # The version is read before querying: a write that lands meanwhile
+        # bumps it again, so the next refresh will not trust this result.
         try:
-            d = iva_trimestre(self._year, self._q)
+            data = self.load_data()
         except Exception:
-            yield Label(f"Error cargando {self._year}Q{self._q}")
+            data = None
+        if get_current_worker().is_cancelled:
             return
+        self.app.call_from_thread(self._loaded, key, version, data)
+
+    def _loaded(self, key: tuple, version: tuple[int, ...], data) -> None:
+        self.loading = False
+        if data is not None:
+            self._cache[key] = (version, data)
+        if key == self.cache_key():
+            self._show(data)
+
+    def _show(self, data) -> None:
+        if data is not None and data is self._shown:
+            return
+        self._shown = data
+        if data is None:
+            self.remove_children()
+            self.mount(Label(self.error_text()))
+            return
+        new_rows = self.rows(data)
+        kv_rows = list(self.query(KVRow))
+        titles = list(self.query(".card-title").results(Label))
+        if titles and len(kv_rows) == len(new_rows):
+            titles[0].update(self.title())
+            for widget, row in zip(kv_rows, new_rows):
+                widget.set(*row)
+            return
+        self.remove_children()
+        self.mount_all(list(self.build(new_rows)))
+
+    def build(self, rows: list[Row]) -> ComposeResult:
+        yield Label(self.title(), classes="card-title")
+        for row in rows:
+            yield KVRow(*row)
 
-        yield Label(f"IVA  {self._year}Q{self._q}", classes="card-title")
-        yield KVRow("Base devengado", _fmt(d["base_devengado"]))
-        yield KVRow("IVA devengado", _fmt(d["iva_devengado"]))
-        yield KVRow("Base deducible", _fmt(d["base_deducible"]))
-        yield KVRow("IVA deducible", _fmt(d["iva_deducible"]))
-        yield KVRow(
-            "Resultado",
-            _fmt(d["resultado"]),
-            _color(d["resultado"]),
-        )
+
+class IVACard(DataCard):
+    """Card showing IVA summary for one quarter."""
+
+    TABLES = (FacturaEmitida.__tablename__, GastoDeducible.__tablename__)
+
+    def __init__(self, cache: dict, year: int, q: int) -> None:
+        super().__init__(cache, classes="card")
+        self._year = year
+        self._q = q
+
+    def cache_key(self) -> tuple:
+        return ("iva", self._year, self._q)
+
+    def load_data(self):
+        return iva_trimestre(self._year, self._q)
+
+    def error_text(self) -> str:
+        return f"Error cargando {self._year}Q{self._q}"
+
+    def title(self) -> str:
+        return f"IVA  {self._year}Q{self._q}"
+
+    def rows(self, d) -> list[Row]:
+        return [
+            ("Base devengado", _fmt(d["base_devengado"]), ""),
+            ("IVA devengado", _fmt(d["iva_devengado"]), ""),
+            ("Base deducible", _fmt(d["base_deducible"]), ""),
+            ("IVA deducible", _fmt(d["iva_deducible"]), ""),
+            ("Resultado", _fmt(d["resultado"]), _color(d["resultado"])),
+        ]
+
+    def set_period(self, year: int) -> None:
+        self._year = year
+        self.refresh_data()
 
 
 class IVARow(Widget):
@@ -107,61 +226,170 @@ class IVARow(Widget):
     }
     """
 
-    def __init__(self, year: int) -> None:
+    def __init__(self, cache: dict, year: int) -> None:
         super().__init__(id="iva-row")
+        self._cache = cache
         self._year = year
 
     def compose(self) -> ComposeResult:
         for q in range(1, _quarters_for_year(self._year) + 1):
-            yield IVACard(self._year, q)
+            yield IVACard(self._cache, self._year, q)
+
+    def set_year(self, year: int) -> None:
+        """Reuse the existing quarter cards, only adding or removing the
+        ones whose quarter count differs between years."""
+        self._year = year
+        cards = list(self.query(IVACard))
+        wanted = _quarters_for_year(year)
+        for card in cards[wanted:]:
+            card.remove()
+        for card in cards[:wanted]:
+            card.set_period(year)
+        if wanted > len(cards):
+            self.mount_all(
+                [IVACard(self._cache, year, q) for q in range(len(cards) + 1, wanted + 1)]
+            )
 
 
-class IRPFCard(Static):
+class IRPFCard(DataCard):
     """Card showing IRPF snapshot for a quarter."""
 
-    def __init__(self, year: int, q: int) -> None:
-        super().__init__(id="irpf-card", classes="card")
+    TABLES = (
+        FacturaEmitida.__tablename__,
+        GastoDeducible.__tablename__,
+        PagoAutonomo.__tablename__,
+        PagoFraccionado130.__tablename__,
+    )
+
+    def __init__(self, cache: dict, year: int, q: int) -> None:
+        super().__init__(cache, id="irpf-card", classes="card")
         self._year = year
         self._q = q
 
-    def compose(self) -> ComposeResult:
-        try:
-            d = irpf_snapshot_acumulado(self._year, self._q)
-        except Exception:
-            yield Label("Error cargando IRPF")
-            return
+    def cache_key(self) -> tuple:
+        return ("irpf", self._year, self._q)
+
+    def load_data(self):
+        return irpf_snapshot_acumulado(self._year, self._q)
 
-        yield Label(
-            f"IRPF Modelo 130 — acumulado {self._year}Q{self._q}",
-            classes="card-title",
-        )
-        yield KVRow("Ingresos", _fmt(d["ingresos"]))
-        yield KVRow("Gastos totales", _fmt(d["gastos"]))
-        yield KVRow("  · Gastos s/SS", _fmt(d["detalle"]["gastos_sin_cuotas"]))
-        yield KVRow("  · Cuotas SS", _fmt(d["detalle"]["cuotas_ss"]))
-        yield KVRow("Rendimiento neto", _fmt(d["rendimiento"]))
-        yield KVRow("20% a ingresar", _fmt(d["base_20"]))
-        yield KVRow("Retenciones", _fmt(d["retenciones"]))
-        yield KVRow("Pagos previos", _fmt(d["pagos_previos"]))
-        yield KVRow(
-            "A pagar / devolver",
-            _fmt(d["resultado"]),
-            _color(d["resultado"]),
-        )
-
-
-class CuotasCard(Static):
+    def error_text(self) -> str:
+        return "Error cargando IRPF"
+
+    def title(self) -> str:
+        return f"IRPF Modelo 130 — acumulado {self._year}Q{self._q}"
+
+    def rows(self, d) -> list[Row]:
+        return [
+            ("Ingresos", _fmt(d["ingresos"]), ""),
+            ("Gastos totales", _fmt(d["gastos"]), ""),
+            ("  · Gastos s/SS", _fmt(d["detalle"]["gastos_sin_cuotas"]), ""),
+            ("  · Cuotas SS", _fmt(d["detalle"]["cuotas_ss"]), ""),
+            ("Rendimiento neto", _fmt(d["rendimiento"]), ""),
+            ("20% a ingresar", _fmt(d["base_20"]), ""),
+            ("Retenciones", _fmt(d["retenciones"]), ""),
+            ("Pagos previos", _fmt(d["pagos_previos"]), ""),
+            ("A pagar / devolver", _fmt(d["resultado"]), _color(d["resultado"])),
+        ]
+
+    def set_period(self, year: int) -> None:
+        self._year = year
+        self.refresh_data()
+
+
+class CobrosCard(DataCard):
+    """Card showing pending collections by age (0-30/31-60/61-90/90+ days).
+
+    It does not depend on the selected year: it is keyed by today's date, so
+    it is only recomputed when invoices change or the day changes."""
+
+    TABLES = (FacturaEmitida.__tablename__,)
+
+    def __init__(self, cache: dict) -> None:
+        super().__init__(cache, id="cobros-card", classes="card")
+
+    def cache_key(self) -> tuple:
+        return ("cobros", date.today())
+
+    def load_data(self):
+        return antiguedad(date.today())
+
+    def error_text(self) -> str:
+        return "Error cargando cobros pendientes"
+
+    def title(self) -> str:
+        return "Pendiente de cobro"
+
+    def rows(self, tramos) -> list[Row]:
+        total = sum((t["importe"] for t in tramos), Decimal("0"))
+        rows = []
+        for i, t in enumerate(tramos):
+            # The oldest bucket is highlighted when it is not empty
+            vencida = i == len(tramos) - 1 and t["n"] > 0
+            rows.append((f"{t['tramo']} días ({t['n']})", _fmt(t["importe"]), "negative" if vencida else ""))
+        rows.append(("Total", _fmt(total), ""))
+        return rows
+
+    def set_period(self, year: int) -> None:
+        self.refresh_data()
+
+
+class PrevisionCard(DataCard):
+    """Card showing the forecast Modelo 303/130 results for the quarter in
+    progress (the last one for past years) and for the whole year."""
+
+    TABLES = (*PREVISION_TABLAS, PagoFraccionado130.__tablename__)
+
+    def __init__(self, cache: dict, year: int) -> None:
+        super().__init__(cache, id="prevision-card", classes="card")
+        self._year = year
+
+    def cache_key(self) -> tuple:
+        return ("prevision", self._year, date.today())
+
+    def load_data(self):
+        return prevision(self._year)
+
+    def error_text(self) -> str:
+        return "Error cargando previsión"
+
+    def title(self) -> str:
+        return f"Previsión {self._year}"
+
+    def rows(self, d) -> list[Row]:
+        abiertos = [t for t in d["trimestres"] if t["estado"] != "cerrado"]
+        t = abiertos[0] if abiertos else d["trimestres"][-1]
+        q = t["trimestre"]
+        anual = d["anual"]
+        return [
+            (f"303 Q{q} ({t['estado']})", _fmt(t["iva_resultado"]), _color(t["iva_resultado"])),
+            (f"130 Q{q} ({t['estado']})", _fmt(t["m130"]["resultado"]), _color(t["m130"]["resultado"])),
+            ("303 ejercicio", _fmt(anual["iva_resultado"]), _color(anual["iva_resultado"])),
+            ("130 ejercicio", _fmt(anual["m130_a_ingresar"]), _color(anual["m130_a_ingresar"])),
+            ("Rendimiento neto", _fmt(anual["rendimiento"]), ""),
+        ]
+
+    def set_period(self, year: int) -> None:
+        self._year = year
+        self.refresh_data()
+
+
+class CuotasCard(DataCard):
     """Card showing the year's Cuotas de Autónomos (monthly payments)."""
 
-    def __init__(self, year: int) -> None:
-        super().__init__(id="cuotas-card", classes="card")
+    TABLES = (PagoAutonomo.__tablename__,)
+
+    def __init__(self, cache: dict, year: int) -> None:
+        super().__init__(cache, id="cuotas-card", classes="card")
         self._year = year
 
-    def compose(self) -> ComposeResult:
+    def cache_key(self) -> tuple:
+        return ("cuotas", self._year)
+
+    def load_data(self):
         start = date(self._year, 1, 1)
         end = date(self._year, 12, 31)
         with get_session() as s:
-            cuotas = list(
+            return list(
                 s.exec(
                     sql_select(PagoAutonomo)
                     .where(PagoAutonomo.fecha.between(start, end))
@@ -169,21 +397,38 @@ class CuotasCard(Static):
                 ).all()
             )
 
-        yield Label(f"Cuotas Autónomos {self._year}", classes="card-title")
+    def error_text(self) -> str:
+        return "Error cargando cuotas"
+
+    def title(self) -> str:
+        return f"Cuotas Autónomos {self._year}"
 
-        if not cuotas:
+    def rows(self, cuotas) -> list[Row]:
+        rows = []
+        total = Decimal("0")
+        for c in cuotas:
+            total += c.importe_eur
+            fecha_str = c.fecha.strftime("%d-%m-%Y")
+            label = f"{fecha_str}  {c.concepto or ''}".strip()
+            rows.append((label, _fmt(c.importe_eur), ""))
+        if rows:
+            rows.append(("Total", _fmt(total), "positive"))
+        return rows
+
+    def build(self, rows: list[Row]) -> ComposeResult:
+        yield Label(self.title(), classes="card-title")
+
+        if not rows:
             yield Label("Sin cuotas registradas", classes="kv-label")
             return
 
-        total = Decimal("0")
-        with VerticalScroll(classes="cuotas-scroll"):
-            for c in cuotas:
-                total += c.importe_eur
-                fecha_str = c.fecha.strftime("%d-%m-%Y")
-                label = f"{fecha_str}  {c.concepto or ''}".strip()
-                yield KVRow(label, _fmt(c.importe_eur))
+        *cuotas, total = rows
+        yield VerticalScroll(*(KVRow(*r) for r in cuotas), classes="cuotas-scroll")
+        yield KVRow(*total)
 
-        yield KVRow("Total", _fmt(total), "positive")
+    def set_period(self, year: int) -> None:
+        self._year = year
+        self.refresh_data()
 
 
 class DashboardTab(Widget):
@@ -219,6 +464,8 @@ class DashboardTab(Widget):
         today = date.today()
         self._year = today.year
         self._q = (today.month - 1) // 3 + 1
+        # (card, period) -> (data version, data); shared by all cards
+        self._cache: dict[tuple, tuple[tuple[int, ...], object]] = {}
 
     def compose(self) -> ComposeResult:
         years = [(str(y), str(y)) for y in range(date.today().year, date.today().year - 5, -1)]
@@ -242,32 +489,41 @@ class DashboardTab(Widget):
         return grid
 
     def _grid_children(self):
-        yield IVARow(self._year)
-        yield IRPFCard(self._year, self._q)
-        yield CuotasCard(self._year)
+        yield IVARow(self._cache, self._year)
+        yield IRPFCard(self._cache, self._year, self._q)
+        yield CobrosCard(self._cache)
+        yield CuotasCard(self._cache, self._year)
+        yield PrevisionCard(self._cache, self._year)
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "btn-refresh":
             try:
-                self._year = int(str(self.query_one("#sel-year", Select).value))
+                year = int(str(self.query_one("#sel-year", Select).value))
             except Exception:
                 return
+            if year == self._year:
+                # Explicit refresh: recompute every card. Writes by other
+                # processes already change the data version (see
+                # db.data_version), so cards also pick them up on show.
+                self._cache.clear()
+            self._year = year
             self._refresh_cards()
 
     def _refresh_cards(self) -> None:
-        async def _do_refresh() -> None:
-            try:
-                grid = self.query_one("#dashboard-grid")
-            except Exception:
-                return  # Grid might not exist yet
-
-            await grid.remove_children()
-            await grid.mount(IVARow(self._year))
-            await grid.mount(IRPFCard(self._year, self._q))
-            await grid.mount(CuotasCard(self._year))
-
-        self.run_worker(_do_refresh, group="dash-refresh", exclusive=True)
+        """Recompute only the cards whose tables changed since they were
+        cached; everything else is served from the cache in place."""
+        try:
+            self.query_one(IVARow).set_year(self._year)
+        except Exception:
+            return  # Grid might not exist yet
+        for card in self.query("#dashboard-grid > DataCard").results(DataCard):
+            card.set_period(self._year)
 
     def on_show(self) -> None:
         """Auto-refresh when screen becomes visible."""
         self._refresh_cards()
+
+    def on_hide(self) -> None:
+        """Cancel card loads still in flight when the user leaves the tab."""
+        for card in self.query(DataCard):
+            self.workers.cancel_group(card, "dash-load")
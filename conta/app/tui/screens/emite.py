@@ -1,11 +1,14 @@
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
+from textual import work
 from textual.app import ComposeResult
 from textual.widget import Widget
 from textual.widgets import Button, Input, Label, Select, Static
 
 from ...db import get_session
 from ...models import Actividad, FacturaEmitida
+from ...reglas import reglas_en
+from ...services.importes import porcentaje
 
 
 def _parse_date(raw: str) -> date:
@@ -58,6 +61,11 @@ class EmiteTab(Widget):
     }
     """
 
+    @property
+    def _reglas(self):
+        # Valores por defecto vigentes hoy (config/rules.yml)
+        return reglas_en(date.today())
+
     def compose(self) -> ComposeResult:
         yield Label("Nueva factura emitida", classes="card-title")
 
@@ -83,11 +91,13 @@ class EmiteTab(Widget):
 
         with Widget(classes="form-row"):
             yield Label("Tipo IVA (%):")
-            yield Input("21.00", id="fe-tipo-iva", placeholder="21.00")
+            yield Input(str(self._reglas.iva_general), id="fe-tipo-iva", placeholder="21.00")
 
         with Widget(classes="form-row"):
             yield Label("IRPF ret. (%):")
-            yield Input("15.00", id="fe-irpf", placeholder="0.00 o 15.00")
+            yield Input(
+                str(self._reglas.retencion(Actividad.musica)), id="fe-irpf", placeholder="0.00 o 15.00"
+            )
 
         with Widget(classes="form-row"):
             yield Label("Actividad:")
@@ -115,12 +125,17 @@ class EmiteTab(Widget):
         for fid in ["fe-numero", "fe-fecha", "fe-cliente", "fe-nif", "fe-notas"]:
             self.query_one(f"#{fid}", Input).value = ""
         self.query_one("#fe-base", Input).value = ""
-        self.query_one("#fe-tipo-iva", Input).value = "21.00"
-        self.query_one("#fe-irpf", Input).value = "15.00"
+        self.query_one("#fe-tipo-iva", Input).value = str(self._reglas.iva_general)
+        self.query_one("#fe-irpf", Input).value = str(self._reglas.retencion(Actividad.musica))
         self.query_one("#fe-actividad").value = Actividad.musica.value
         self.query_one("#emite-status", Static).update("")
         self.query_one("#emite-error", Static).update("")
 
+    def on_select_changed(self, event: Select.Changed) -> None:
+        # La retención por defecto depende de la actividad
+        if event.select.id == "fe-actividad" and event.value is not Select.BLANK:
+            self.query_one("#fe-irpf", Input).value = str(self._reglas.retencion(str(event.value)))
+
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "btn-emite-clear":
             self._clear()
@@ -153,21 +168,22 @@ class EmiteTab(Widget):
             except InvalidOperation:
                 raise ValueError(f"Base inválida: '{base_raw}'")
 
+            actividad_val = str(self.query_one("#fe-actividad", Select).value)
+            actividad = Actividad(actividad_val)
+            r = reglas_en(fecha)
+
             try:
-                tipo_iva = Decimal(self._get("fe-tipo-iva") or "21.00")
+                tipo_iva = Decimal(self._get("fe-tipo-iva") or r.iva_general)
             except InvalidOperation:
                 raise ValueError("Tipo IVA inválido")
 
             try:
-                irpf_pct = Decimal(self._get("fe-irpf") or "0.00")
+                irpf_pct = Decimal(self._get("fe-irpf") or r.retencion(actividad))
             except InvalidOperation:
                 raise ValueError("IRPF inválido")
 
-            actividad_val = str(self.query_one("#fe-actividad", Select).value)
-            actividad = Actividad(actividad_val)
-
-            cuota_iva = (base_eur * tipo_iva / Decimal("100")).quantize(Decimal("0.01"))
-            irpf_importe = (base_eur * irpf_pct / Decimal("100")).quantize(Decimal("0.01"))
+            cuota_iva = porcentaje(base_eur, tipo_iva)
+            irpf_importe = porcentaje(base_eur, irpf_pct)
 
             f = FacturaEmitida(
                 numero=numero,
@@ -184,12 +200,25 @@ class EmiteTab(Widget):
                 estado_cobro="Pendiente",
             )
 
+            self._persist(f, numero)
+
+        except Exception as exc:
+            error.update(f"Error: {exc}")
+
+    @work(thread=True, group="emite-save")
+    def _persist(self, f: FacturaEmitida, numero: str) -> None:
+        try:
             with get_session() as s:
                 s.add(f)
                 s.commit()
+        except Exception as exc:
+            self.app.call_from_thread(self._show_error, exc)
+            return
+        self.app.call_from_thread(self._saved, numero)
 
-            status.update(f"✓ Factura {numero} guardada correctamente")
-            self._clear()
+    def _saved(self, numero: str) -> None:
+        self._clear()
+        self.query_one("#emite-status", Static).update(f"✓ Factura {numero} guardada correctamente")
 
-        except Exception as exc:
-            error.update(f"Error: {exc}")
+    def _show_error(self, exc: Exception) -> None:
+        self.query_one("#emite-error", Static).update(f"Error: {exc}")
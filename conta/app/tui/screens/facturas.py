@@ -1,12 +1,16 @@
 from datetime import date
 from decimal import Decimal
+from textual import work
 from textual.app import ComposeResult
 from textual.binding import Binding
 from textual.widget import Widget
-from textual.widgets import Button, DataTable, Input, Label, Select, Static
+from textual.widgets import Button, Input, Label, Select, Static
+from textual.worker import get_current_worker
 
 from ...db import get_session
 from ...models import FacturaEmitida
+from ...services.consultas import pagina_facturas, totales_facturas
+from ..tabla_paginada import TablaPaginada
 from sqlmodel import select
 
 
@@ -22,6 +26,33 @@ def _fmt_date(d: date) -> str:
     return d.strftime("%d-%m-%Y")
 
 
+def _row_cells(f: FacturaEmitida) -> tuple:
+    return (
+        str(f.id or ""),
+        f.numero,
+        _fmt_date(f.fecha_emision),
+        _quarter(f.fecha_emision),
+        f.cliente_nombre,
+        _fmt(f.base_eur),
+        _fmt(f.cuota_iva),
+        _fmt(f.ret_irpf_importe),
+        _fmt(f.base_eur + f.cuota_iva - f.ret_irpf_importe),
+        _fmt(f.base_eur - f.ret_irpf_importe),
+        f.estado_cobro or "",
+        f.estado or "",
+        str(f.actividad.value if hasattr(f.actividad, "value") else f.actividad),
+    )
+
+
+def _sumar(totales: dict, f: FacturaEmitida, sign: int) -> dict:
+    return {
+        "n": totales["n"] + sign,
+        "base": totales["base"] + sign * f.base_eur,
+        "iva": totales["iva"] + sign * f.cuota_iva,
+        "irpf": totales["irpf"] + sign * f.ret_irpf_importe,
+    }
+
+
 COLUMNS = [
     ("ID", 4),
     ("Número", 10),
@@ -65,9 +96,9 @@ class FacturasTab(Widget):
         super().__init__()
         self._year: int | None = date.today().year
         self._quarter: int | None = None  # 1-4 or None for all
-        self._cliente: str = ""
-        self._facturas: list[FacturaEmitida] = []
+        self._texto: str = ""
         self._selected_id: int | None = None
+        self._totales: dict | None = None
 
     def compose(self) -> ComposeResult:
         with Widget(id="fact-filter"):
@@ -79,8 +110,8 @@ class FacturasTab(Widget):
                 value="",
                 id="sel-quarter",
             )
-            yield Label("Cliente:")
-            yield Input("", id="inp-cliente", placeholder="substring")
+            yield Label("Buscar:")
+            yield Input("", id="inp-cliente", placeholder="cliente, NIF, nº")
             yield Button("Filtrar", id="btn-filter", variant="primary")
 
         with Widget(id="fact-edit-bar"):
@@ -91,11 +122,17 @@ class FacturasTab(Widget):
             yield Button("Guardar", id="btn-save-estado", variant="success")
             yield Button("Cancelar", id="btn-cancel-estado")
 
-        yield DataTable(id="fact-table", zebra_stripes=True, cursor_type="row")
+        yield TablaPaginada(
+            _row_cells,
+            lambda f: (f.fecha_emision, f.id),
+            id="fact-table",
+            zebra_stripes=True,
+            cursor_type="row",
+        )
         yield Static("", id="fact-status")
 
     def on_mount(self) -> None:
-        table = self.query_one("#fact-table", DataTable)
+        table = self.query_one("#fact-table", TablaPaginada)
         for col_name, width in COLUMNS:
             table.add_column(col_name, width=width)
         self._load()
@@ -104,72 +141,33 @@ class FacturasTab(Widget):
         """Auto-refresh when screen becomes visible."""
         self._load()
 
+    def on_hide(self) -> None:
+        """Cancel any pending load when the user leaves the tab."""
+        self.workers.cancel_group(self, "fact-load")
+        self.query_one("#fact-table", TablaPaginada).cancel_loads()
+
     def _load(self) -> None:
-        with get_session() as s:
-            stmt = select(FacturaEmitida).order_by(FacturaEmitida.fecha_emision)
-            facturas = list(s.exec(stmt).all())
-
-        if self._year:
-            facturas = [f for f in facturas if f.fecha_emision.year == self._year]
-        if self._quarter:
-            facturas = [f for f in facturas if ((f.fecha_emision.month - 1) // 3) + 1 == self._quarter]
-        if self._cliente:
-            facturas = [
-                f for f in facturas
-                if self._cliente.lower() in f.cliente_nombre.lower()
-            ]
-
-        self._facturas = facturas
-        table = self.query_one("#fact-table", DataTable)
-        table.clear()
-
-        total_base = Decimal("0")
-        total_iva = Decimal("0")
-        total_irpf = Decimal("0")
-        total_total = Decimal("0")
-        total_percibido = Decimal("0")
-
-        for f in facturas:
-            row_total = f.base_eur + f.cuota_iva - f.ret_irpf_importe
-            row_percibido = f.base_eur - f.ret_irpf_importe
-            total_base += f.base_eur
-            total_iva += f.cuota_iva
-            total_irpf += f.ret_irpf_importe
-            total_total += row_total
-            total_percibido += row_percibido
-            table.add_row(
-                str(f.id or ""),
-                f.numero,
-                _fmt_date(f.fecha_emision),
-                _quarter(f.fecha_emision),
-                f.cliente_nombre,
-                _fmt(f.base_eur),
-                _fmt(f.cuota_iva),
-                _fmt(f.ret_irpf_importe),
-                _fmt(row_total),
-                _fmt(row_percibido),
-                f.estado_cobro or "",
-                f.estado or "",
-                str(f.actividad.value if hasattr(f.actividad, "value") else f.actividad),
-                key=str(f.id),
-            )
+        self._totales = None
+        filtros = {"year": self._year, "quarter": self._quarter, "texto": self._texto}
+        self.query_one("#fact-table", TablaPaginada).reset(
+            lambda after, limit: pagina_facturas(after, limit, **filtros)
+        )
+        self._fetch_totales(filtros)
 
-        if facturas:
-            table.add_row(*[""] * len(COLUMNS))
-            table.add_row(
-                "", "", "", "",
-                "TOTAL",
-                _fmt(total_base),
-                _fmt(total_iva),
-                _fmt(total_irpf),
-                _fmt(total_total),
-                _fmt(total_percibido),
-                "", "", "",
-            )
+    @work(thread=True, exclusive=True, group="fact-load")
+    def _fetch_totales(self, filtros: dict) -> None:
+        """Totals come from one aggregate query, not from the loaded rows."""
+        totales = totales_facturas(**filtros)
+        if get_current_worker().is_cancelled:
+            return
+        self.app.call_from_thread(self._show_totales, totales)
 
-        n = len(facturas)
+    def _show_totales(self, t: dict) -> None:
+        self._totales = t
+        total = t["base"] + t["iva"] - t["irpf"]
         self.query_one("#fact-status", Static).update(
-            f"{n} factura(s) — Base total: {_fmt(total_base)} €  |  "
+            f"{t['n']} factura(s) — Base: {_fmt(t['base'])} €  |  IVA: {_fmt(t['iva'])} €  |  "
+            f"IRPF: {_fmt(t['irpf'])} €  |  TOTAL: {_fmt(total)} €  |  "
             f"[e] editar estado  [r] recargar"
         )
 
@@ -179,7 +177,7 @@ class FacturasTab(Widget):
             self._year = int(year_raw) if year_raw.isdigit() else None
             q_val = self.query_one("#sel-quarter", Select).value
             self._quarter = int(str(q_val)) if q_val else None
-            self._cliente = self.query_one("#inp-cliente", Input).value.strip()
+            self._texto = self.query_one("#inp-cliente", Input).value.strip()
             self._load()
 
         elif event.button.id == "btn-save-estado":
@@ -189,11 +187,9 @@ class FacturasTab(Widget):
             self._hide_edit_bar()
 
     def action_edit_estado(self) -> None:
-        table = self.query_one("#fact-table", DataTable)
-        row_key = table.cursor_row
-        if row_key is None or row_key >= len(self._facturas):
+        f = self.query_one("#fact-table", TablaPaginada).item_at_cursor()
+        if f is None:
             return
-        f = self._facturas[row_key]
         self._selected_id = f.id
         # Pre-fill both fields with current values
         inp_estado = self.query_one("#inp-new-estado", Input)
@@ -217,10 +213,17 @@ class FacturasTab(Widget):
         
         new_estado = self.query_one("#inp-new-estado", Input).value.strip()
         new_estado_iva = self.query_one("#inp-new-estado-iva", Input).value.strip()
-        
+        factura_id = self._selected_id
+
+        self._hide_edit_bar()
+        self.query_one("#fact-table", TablaPaginada).loading = True
+        self._save_estado(factura_id, new_estado, new_estado_iva)
+
+    @work(thread=True, group="fact-save")
+    def _save_estado(self, factura_id: int, new_estado: str, new_estado_iva: str) -> None:
         with get_session() as s:
             f = s.exec(
-                select(FacturaEmitida).where(FacturaEmitida.id == self._selected_id)
+                select(FacturaEmitida).where(FacturaEmitida.id == factura_id)
             ).first()
             if f:
                 # Update both fields if they have values
@@ -230,8 +233,22 @@ class FacturasTab(Widget):
                     f.estado = new_estado_iva
                 s.add(f)
                 s.commit()
-        self._hide_edit_bar()
-        self._load()
+                s.refresh(f)
+        self.app.call_from_thread(self._apply_saved, f)
+
+    def _apply_saved(self, f: FacturaEmitida | None) -> None:
+        """Update only the edited row and shift the totals by its delta."""
+        table = self.query_one("#fact-table", TablaPaginada)
+        table.loading = False
+        if f is None:
+            return
+        old = table.upsert_item(f)
+        # Only existing invoices are edited here, so they are already in the
+        # aggregate totals. If the row was not loaded (the table was reset
+        # meanwhile), the freshly fetched totals count it as it is now.
+        if old is not None and self._totales is not None:
+            self._totales = _sumar(_sumar(self._totales, old, -1), f, +1)
+            self._show_totales(self._totales)
 
     def action_reload(self) -> None:
         self._load()
@@ -1,11 +1,14 @@
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from textual import work
 from textual.app import ComposeResult
 from textual.widget import Widget
 from textual.widgets import Button, Input, Label, Select, Static
 
 from ...db import get_session
 from ...models import GastoDeducible
+from ...reglas import reglas_en
+from ...services.importes import porcentaje
 
 
 def _parse_date(raw: str) -> date:
@@ -66,7 +69,7 @@ class GastoFormTab(Widget):
 
         with Widget(classes="form-row"):
             yield Label("Tipo IVA (%):")
-            yield Input("21.00", id="gf-tipo-iva", placeholder="21.00")
+            yield Input(str(reglas_en(date.today()).iva_general), id="gf-tipo-iva", placeholder="21.00")
 
         with Widget(classes="form-row"):
             yield Label("Cuota IVA (override):")
@@ -101,7 +104,7 @@ class GastoFormTab(Widget):
     def _clear(self) -> None:
         for fid in ["gf-proveedor", "gf-nif", "gf-fecha", "gf-base", "gf-cuota-iva", "gf-tipo"]:
             self.query_one(f"#{fid}", Input).value = ""
-        self.query_one("#gf-tipo-iva", Input).value = "21.00"
+        self.query_one("#gf-tipo-iva", Input).value = str(reglas_en(date.today()).iva_general)
         self.query_one("#gf-afecto", Input).value = "100.00"
         self.query_one("#gasto-status", Static).update("")
         self.query_one("#gasto-error", Static).update("")
@@ -135,7 +138,7 @@ class GastoFormTab(Widget):
                 raise ValueError(f"Base inválida: '{base_raw}'")
 
             try:
-                tipo_iva = Decimal(self._get("gf-tipo-iva") or "21.00")
+                tipo_iva = Decimal(self._get("gf-tipo-iva") or reglas_en(fecha).iva_general)
             except InvalidOperation:
                 raise ValueError("Tipo IVA inválido")
 
@@ -151,7 +154,7 @@ class GastoFormTab(Widget):
                 except InvalidOperation:
                     raise ValueError(f"Cuota IVA inválida: '{cuota_iva_raw}'")
             else:
-                cuota_iva = (base_eur * tipo_iva / Decimal("100")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+                cuota_iva = porcentaje(base_eur, tipo_iva)
             iva_deducible = str(self.query_one("#gf-iva-deducible", Select).value) == "si"
 
             g = GastoDeducible(
@@ -163,15 +166,29 @@ class GastoFormTab(Widget):
                 cuota_iva=cuota_iva,
                 afecto_pct=afecto_pct,
                 iva_deducible=iva_deducible,
+                cuota_iva_manual=bool(cuota_iva_raw),
                 tipo=self._get("gf-tipo") or None,
             )
 
+            self._persist(g, proveedor)
+
+        except Exception as exc:
+            error.update(f"Error: {exc}")
+
+    @work(thread=True, group="gasto-save")
+    def _persist(self, g: GastoDeducible, proveedor: str) -> None:
+        try:
             with get_session() as s:
                 s.add(g)
                 s.commit()
+        except Exception as exc:
+            self.app.call_from_thread(self._show_error, exc)
+            return
+        self.app.call_from_thread(self._saved, proveedor)
 
-            status.update(f"✓ Gasto de {proveedor} guardado correctamente")
-            self._clear()
+    def _saved(self, proveedor: str) -> None:
+        self._clear()
+        self.query_one("#gasto-status", Static).update(f"✓ Gasto de {proveedor} guardado correctamente")
 
-        except Exception as exc:
-            error.update(f"Error: {exc}")
+    def _show_error(self, exc: Exception) -> None:
+        self.query_one("#gasto-error", Static).update(f"Error: {exc}")
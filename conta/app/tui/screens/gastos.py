@@ -1,12 +1,16 @@
 from datetime import date
 from decimal import Decimal
+from textual import work
 from textual.app import ComposeResult
 from textual.binding import Binding
 from textual.widget import Widget
-from textual.widgets import Button, DataTable, Input, Label, Select, Static
+from textual.widgets import Button, Input, Label, Select, Static
+from textual.worker import get_current_worker
 
 from ...db import get_session
 from ...models import GastoDeducible
+from ...services.consultas import pagina_gastos, totales_gastos
+from ..tabla_paginada import TablaPaginada
 from sqlmodel import select
 
 
@@ -22,6 +26,21 @@ def _quarter(d: date) -> str:
     return f"{d.year}Q{((d.month - 1) // 3) + 1}"
 
 
+def _row_cells(g: GastoDeducible) -> tuple:
+    return (
+        str(g.id or ""),
+        g.proveedor,
+        _fmt_date(g.fecha),
+        _quarter(g.fecha),
+        _fmt(g.base_eur),
+        _fmt(g.tipo_iva),
+        _fmt(g.cuota_iva),
+        _fmt(g.afecto_pct),
+        "Sí" if g.iva_deducible else "No",
+        g.tipo or "",
+    )
+
+
 COLUMNS = [
     ("ID", 4),
     ("Proveedor", 22),
@@ -58,7 +77,8 @@ class GastosTab(Widget):
         super().__init__()
         self._year: int | None = date.today().year
         self._quarter: int | None = None
-        self._gastos: list = []
+        self._proveedor: str = ""
+        self._totales: dict | None = None
 
     def compose(self) -> ComposeResult:
         with Widget(id="gasto-filter"):
@@ -70,13 +90,21 @@ class GastosTab(Widget):
                 value="",
                 id="sel-gquarter",
             )
+            yield Label("Proveedor:")
+            yield Input("", id="inp-gproveedor", placeholder="nombre")
             yield Button("Filtrar", id="btn-gfilter", variant="primary")
 
-        yield DataTable(id="gasto-table", zebra_stripes=True, cursor_type="row")
+        yield TablaPaginada(
+            _row_cells,
+            lambda g: (g.fecha, g.id),
+            id="gasto-table",
+            zebra_stripes=True,
+            cursor_type="row",
+        )
         yield Static("", id="gasto-status")
 
     def on_mount(self) -> None:
-        table = self.query_one("#gasto-table", DataTable)
+        table = self.query_one("#gasto-table", TablaPaginada)
         for col_name, width in COLUMNS:
             table.add_column(col_name, width=width)
         self._load()
@@ -85,53 +113,31 @@ class GastosTab(Widget):
         """Auto-refresh when screen becomes visible."""
         self._load()
 
+    def on_hide(self) -> None:
+        """Cancel any pending load when the user leaves the tab."""
+        self.workers.cancel_group(self, "gasto-load")
+        self.query_one("#gasto-table", TablaPaginada).cancel_loads()
+
     def _load(self) -> None:
-        with get_session() as s:
-            stmt = select(GastoDeducible).order_by(GastoDeducible.fecha)
-            gastos = list(s.exec(stmt).all())
-
-        if self._year:
-            gastos = [g for g in gastos if g.fecha.year == self._year]
-        if self._quarter:
-            gastos = [g for g in gastos if ((g.fecha.month - 1) // 3) + 1 == self._quarter]
-
-        self._gastos = gastos
-        table = self.query_one("#gasto-table", DataTable)
-        table.clear()
-
-        total_base = Decimal("0")
-        total_iva = Decimal("0")
-
-        for g in gastos:
-            total_base += g.base_eur
-            total_iva += g.cuota_iva
-            table.add_row(
-                str(g.id or ""),
-                g.proveedor,
-                _fmt_date(g.fecha),
-                _quarter(g.fecha),
-                _fmt(g.base_eur),
-                _fmt(g.tipo_iva),
-                _fmt(g.cuota_iva),
-                _fmt(g.afecto_pct),
-                "Sí" if g.iva_deducible else "No",
-                g.tipo or "",
-                key=str(g.id),
-            )
+        self._totales = None
+        filtros = {"year": self._year, "quarter": self._quarter, "proveedor": self._proveedor}
+        self.query_one("#gasto-table", TablaPaginada).reset(
+            lambda after, limit: pagina_gastos(after, limit, **filtros)
+        )
+        self._fetch_totales(filtros)
 
-        if gastos:
-            table.add_row(*[""] * len(COLUMNS))
-            table.add_row(
-                "", "", "", "TOTAL",
-                _fmt(total_base),
-                "",
-                _fmt(total_iva),
-                "", "", "",
-            )
+    @work(thread=True, exclusive=True, group="gasto-load")
+    def _fetch_totales(self, filtros: dict) -> None:
+        """Totals come from one aggregate query, not from the loaded rows."""
+        totales = totales_gastos(**filtros)
+        if get_current_worker().is_cancelled:
+            return
+        self.app.call_from_thread(self._show_totales, totales)
 
-        n = len(gastos)
+    def _show_totales(self, t: dict) -> None:
+        self._totales = t
         self.query_one("#gasto-status", Static).update(
-            f"{n} gasto(s) — Base total: {_fmt(total_base)} €  |  IVA total: {_fmt(total_iva)} €  |  [d] eliminar  [r] recargar"
+            f"{t['n']} gasto(s) — Base total: {_fmt(t['base'])} €  |  IVA total: {_fmt(t['iva'])} €  |  [d] eliminar  [r] recargar"
         )
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
@@ -140,25 +146,41 @@ class GastosTab(Widget):
             self._year = int(year_raw) if year_raw.isdigit() else None
             q_val = self.query_one("#sel-gquarter", Select).value
             self._quarter = int(str(q_val)) if q_val else None
+            self._proveedor = self.query_one("#inp-gproveedor", Input).value.strip()
             self._load()
 
     def action_delete_gasto(self) -> None:
-        table = self.query_one("#gasto-table", DataTable)
-        row_key = table.cursor_row
-        if row_key is None or row_key >= len(self._gastos):
+        table = self.query_one("#gasto-table", TablaPaginada)
+        g = table.item_at_cursor()
+        if g is None:
             return
-        g = self._gastos[row_key]
+        table.loading = True
+        self._delete(g.id, g.proveedor)
+
+    @work(thread=True, group="gasto-save")
+    def _delete(self, gasto_id: int, proveedor: str) -> None:
         with get_session() as s:
             obj = s.exec(
-                select(GastoDeducible).where(GastoDeducible.id == g.id)
+                select(GastoDeducible).where(GastoDeducible.id == gasto_id)
             ).first()
             if obj:
                 s.delete(obj)
                 s.commit()
-        self.query_one("#gasto-status", Static).update(
-            f"✓ Gasto #{g.id} ({g.proveedor}) eliminado"
-        )
-        self._load()
+        self.app.call_from_thread(self._after_delete, gasto_id, proveedor)
+
+    def _after_delete(self, gasto_id: int, proveedor: str) -> None:
+        """Drop only the deleted row and subtract it from the totals."""
+        table = self.query_one("#gasto-table", TablaPaginada)
+        table.loading = False
+        old = table.remove_item(str(gasto_id))
+        if old is not None and self._totales is not None:
+            t = self._totales
+            self._show_totales({
+                "n": t["n"] - 1,
+                "base": t["base"] - old.base_eur,
+                "iva": t["iva"] - old.cuota_iva,
+            })
+        self.notify(f"✓ Gasto #{gasto_id} ({proveedor}) eliminado")
 
     def action_reload(self) -> None:
         self._load()
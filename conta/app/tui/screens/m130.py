@@ -1,5 +1,6 @@
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
+from textual import work
 from textual.app import ComposeResult
 from textual.widget import Widget
 from textual.widgets import Button, Input, Label, Select, Static
@@ -137,14 +138,28 @@ class M130Tab(Widget):
                 fecha_pago=fecha,
             )
 
+            self._persist(p)
+
+        except Exception as exc:
+            error.update(f"Error: {exc}")
+
+    @work(thread=True, group="m130-save")
+    def _persist(self, p: PagoFraccionado130) -> None:
+        try:
             with get_session() as s:
                 s.add(p)
                 s.commit()
+                s.refresh(p)
+        except Exception as exc:
+            self.app.call_from_thread(self._show_error, exc)
+            return
+        self.app.call_from_thread(self._saved, p.year, p.quarter, p.importe)
 
-            status.update(
-                f"✓ Pago M130 {year}Q{quarter} — {importe:.2f} € guardado correctamente"
-            )
-            self._clear()
+    def _saved(self, year: int, quarter: int, importe: Decimal) -> None:
+        self._clear()
+        self.query_one("#m130-status", Static).update(
+            f"✓ Pago M130 {year}Q{quarter} — {importe:.2f} € guardado correctamente"
+        )
 
-        except Exception as exc:
-            error.update(f"Error: {exc}")
+    def _show_error(self, exc: Exception) -> None:
+        self.query_one("#m130-error", Static).update(f"Error: {exc}")
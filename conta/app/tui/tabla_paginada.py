@@ -0,0 +1,140 @@
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from textual import work
+from textual.coordinate import Coordinate
+from textual.widgets import DataTable
+from textual.worker import get_current_worker
+
+
+class TablaPaginada(DataTable):
+    """DataTable que trae las filas por páginas a medida que se hace scroll.
+
+    Solo se consultan y se añaden a la tabla las filas visibles más un margen
+    de precarga; la siguiente página se pide (en un worker) cuando el scroll o
+    el cursor se acercan al final de lo ya cargado.
+
+    `fetch_page(after, limit)` devuelve los objetos que siguen a la clave
+    `after` (None para la primera página), `row_cells(obj)` las celdas de la
+    fila y `page_key(obj)` la clave de paginación del objeto.
+
+    Tras un cambio puntual (editar o borrar una fila) no hace falta recargar:
+    `upsert_item` y `remove_item` tocan solo la fila afectada, identificada
+    por `key=str(obj.id)`. Las celdas deben ser hashables (texto).
+    """
+
+    PAGE_SIZE = 200
+    PREFETCH = 50
+
+    def __init__(
+        self,
+        row_cells: Callable[[Any], Iterable[Any]],
+        page_key: Callable[[Any], Any],
+        **kwargs,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._row_cells = row_cells
+        self._page_key = page_key
+        self._fetch_page: Callable[[Any, int], list] | None = None
+        self._items: dict[str, Any] = {}
+        self._after: Any = None
+        self._exhausted = True
+        self._fetching = False
+        self._generation = 0
+
+    def reset(self, fetch_page: Callable[[Any, int], list]) -> None:
+        """Vacía la tabla y empieza a paginar con una nueva consulta."""
+        self.cancel_loads()
+        self._generation += 1
+        self._fetch_page = fetch_page
+        self._items = {}
+        self._after = None
+        self._exhausted = False
+        self.clear()
+        self.loading = True
+        self._request_page()
+
+    def cancel_loads(self) -> None:
+        self.workers.cancel_group(self, "page-load")
+        self._fetching = False
+        self.loading = False
+
+    def item_at_cursor(self) -> Any | None:
+        if not self.row_count:
+            return None
+        row_key = self.coordinate_to_cell_key(Coordinate(self.cursor_row, 0)).row_key
+        return self._items.get(row_key.value)
+
+    def upsert_item(self, obj: Any) -> Any | None:
+        """Refleja `obj` en la tabla actualizando solo las celdas que cambian,
+        o insertándolo en su posición si cae dentro de lo ya cargado.
+
+        Devuelve el objeto que había antes en esa fila (None si no estaba)."""
+        key = str(obj.id)
+        cells = tuple(self._row_cells(obj))
+        old = self._items.get(key)
+        if old is not None:
+            self._items[key] = obj
+            for column_key, old_value, new_value in zip(self.columns, self._row_cells(old), cells):
+                if old_value != new_value:
+                    self.update_cell(key, column_key, new_value)
+            return old
+
+        if not self._exhausted and (self._after is None or self._page_key(obj) > self._after):
+            return None  # Todavía no cargada: llegará con su página
+        self._items[key] = obj
+        self.add_row(*cells, key=key)
+        # sort() solo pasa las celdas a `key`: se traducen a la clave de
+        # paginación del objeto de cada fila (filas idénticas dan igual)
+        orden = {tuple(self.get_row(k)): self._page_key(o) for k, o in self._items.items()}
+        self.sort(key=lambda row_cells: orden[row_cells])
+        return None
+
+    def remove_item(self, key: str) -> Any | None:
+        """Quita la fila `key` si está cargada y devuelve su objeto."""
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.remove_row(key)
+        return old
+
+    def _request_page(self) -> None:
+        if self._fetching or self._exhausted or self._fetch_page is None:
+            return
+        self._fetching = True
+        self._load_page(self._generation, self._fetch_page, self._after)
+
+    @work(thread=True, exclusive=True, group="page-load")
+    def _load_page(self, generation: int, fetch_page, after) -> None:
+        items = fetch_page(after, self.PAGE_SIZE)
+        if get_current_worker().is_cancelled:
+            return
+        self.app.call_from_thread(self._append_page, generation, items)
+
+    def _append_page(self, generation: int, items: list) -> None:
+        if generation != self._generation:
+            return  # Página de una consulta anterior a reset()
+        if items:
+            self._after = self._page_key(items[-1])
+        self._exhausted = len(items) < self.PAGE_SIZE
+        for obj in items:
+            key = str(obj.id)
+            self._items[key] = obj
+            self.add_row(*self._row_cells(obj), key=key)
+        # Hasta aquí _fetching sigue activo: add_row puede mover el cursor y
+        # disparar _check_prefetch antes de que la página esté completa.
+        self._fetching = False
+        self.loading = False
+        self._check_prefetch()
+
+    def _check_prefetch(self) -> None:
+        visible_end = max(self.scroll_y + self.scrollable_content_region.height, self.cursor_row)
+        if visible_end + self.PREFETCH >= self.row_count:
+            self._request_page()
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        self._check_prefetch()
+
+    def watch_cursor_coordinate(self, old_coordinate: Coordinate, new_coordinate: Coordinate) -> None:
+        super().watch_cursor_coordinate(old_coordinate, new_coordinate)
+        self._check_prefetch()
@@ -0,0 +1,154 @@
+"""Prueba de carga de la API HTTP contra una base de datos SQLite local.
+
+Arranca `uvicorn conta.app.api:app` sobre la base indicada (o usa un servidor
+ya arrancado con --url), lanza peticiones concurrentes y muestra rendimiento,
+latencias y códigos de respuesta por endpoint.
+
+    python scripts/loadtest_api.py --db ./conta.db --concurrency 32 --requests 2000
+    python scripts/loadtest_api.py --url http://127.0.0.1:8000 --etag
+
+Con --etag cada hilo reenvía el último ETag de los endpoints agregados en
+If-None-Match, como haría un cliente con caché (las respuestas serán 304
+mientras los datos no cambien).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+
+def default_paths(year: int) -> list[str]:
+    return [
+        f"/iva/{year}Q1",
+        f"/iva/{year}Q2",
+        f"/irpf/{year}Q2",
+        f"/facturas/totales?year={year}",
+        f"/gastos/totales?year={year}",
+        f"/facturas?year={year}&limit=100",
+        f"/gastos?year={year}&limit=100",
+    ]
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit("uvicorn terminó antes de estar listo")
+        try:
+            urllib.request.urlopen(f"{url}/openapi.json", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    sys.exit(f"El servidor no respondió en {timeout:.0f} s")
+
+
+def request(url: str, etag: str | None) -> tuple[int, float, str | None]:
+    req = urllib.request.Request(url)
+    if etag:
+        req.add_header("If-None-Match", etag)
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            resp.read()
+            status, new_etag = resp.status, resp.headers.get("ETag")
+    except urllib.error.HTTPError as e:
+        # urllib trata 304 como error
+        status, new_etag = e.code, e.headers.get("ETag") or etag
+    except OSError:
+        status, new_etag = 0, None
+    return status, time.perf_counter() - t0, new_etag
+
+
+def worker(base_url: str, paths: list[str], n: int, offset: int, use_etag: bool):
+    etags: dict[str, str] = {}
+    results = []
+    for i in range(n):
+        path = paths[(offset + i) % len(paths)]
+        status, elapsed, etag = request(base_url + path, etags.get(path) if use_etag else None)
+        if etag:
+            etags[path] = etag
+        results.append((path, status, elapsed))
+    return results
+
+
+def pct(values: list[float], p: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(p) - 1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.getenv("CONTA_DB_PATH", "./conta.db"), help="Base SQLite a servir")
+    parser.add_argument("--url", help="Usar un servidor ya arrancado en vez de lanzar uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="Procesos uvicorn")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="Peticiones totales")
+    parser.add_argument("--year", type=int, default=date.today().year)
+    parser.add_argument("--path", action="append", dest="paths", help="Endpoint a probar (repetible)")
+    parser.add_argument("--etag", action="store_true", help="Revalidar con If-None-Match")
+    args = parser.parse_args()
+
+    paths = args.paths or default_paths(args.year)
+    proc = None
+    base_url = args.url
+    if base_url is None:
+        if not os.path.exists(args.db):
+            sys.exit(f"No existe la base de datos {args.db}")
+        base_url = f"http://127.0.0.1:{args.port}"
+        env = dict(os.environ, CONTA_DB_PATH=os.path.abspath(args.db))
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "conta.app.api:app", "--port", str(args.port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            env=env,
+        )
+        wait_ready(base_url, proc)
+    base_url = base_url.rstrip("/")
+
+    try:
+        per_worker, extra = divmod(args.requests, args.concurrency)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            futures = [
+                pool.submit(worker, base_url, paths, per_worker + (i < extra), i, args.etag)
+                for i in range(args.concurrency)
+            ]
+            results = [r for f in futures for r in f.result()]
+        wall = time.perf_counter() - t0
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    by_path: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, Counter] = defaultdict(Counter)
+    for path, status, elapsed in results:
+        by_path[path].append(elapsed * 1000)
+        statuses[path][status] += 1
+
+    print(f"{len(results)} peticiones, concurrencia {args.concurrency}: {wall:.2f} s, {len(results) / wall:.0f} req/s")
+    print(f"{'endpoint':42} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  estados")
+    for path in paths:
+        lat = by_path[path]
+        if not lat:
+            continue
+        codes = " ".join(f"{c}:{n}" for c, n in sorted(statuses[path].items()))
+        print(f"{path:42} {len(lat):6} {pct(lat, 50):8.1f} {pct(lat, 95):8.1f} {pct(lat, 99):8.1f}  {codes}")
+
+    failed = sum(n for c in statuses.values() for code, n in c.items() if code not in (200, 304))
+    if failed:
+        print(f"ERROR: {failed} peticiones fallidas")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
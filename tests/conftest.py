@@ -0,0 +1,10 @@
+"""Las pruebas usan una base de datos temporal, nunca la del usuario.
+
+conta.app.db crea el motor al importarse con CONTA_DB_PATH, así que se fija
+aquí, antes de que ningún módulo de pruebas lo importe.
+"""
+
+import os
+import tempfile
+
+os.environ["CONTA_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="conta-tests-"), "conta.db")
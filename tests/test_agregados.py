@@ -0,0 +1,81 @@
+"""Los totales mensuales (services.agregados) dan los mismos resultados que
+iva_trimestre e irpf_snapshot_acumulado, también con porcentajes de
+afectación no redondos e importes con fracciones de céntimo.
+"""
+
+import random
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from conta.app.db import get_session, init_db
+from conta.app.enums import Actividad
+from conta.app.models import FacturaEmitida, GastoDeducible, PagoAutonomo
+from conta.app.services import agregados
+from conta.app.services.irpf import irpf_snapshot_acumulado
+from conta.app.services.iva import iva_trimestre
+
+YEAR = 2025
+
+AFECTOS = ["100", "50", "33.33", "66.67", "12.35", "7.5"]
+
+
+def _importe(rng: random.Random, decimales: int) -> Decimal:
+    return Decimal(rng.randint(1, 10**(4 + decimales))).scaleb(-decimales)
+
+
+def _fecha(rng: random.Random) -> date:
+    return date(YEAR, rng.randint(1, 12), rng.randint(1, 28))
+
+
+@pytest.fixture(scope="module")
+def datos():
+    init_db()
+    rng = random.Random(0)
+    filas = []
+    for i in range(300):
+        # Una de cada diez facturas con la base (y la cuota) sin redondear
+        base = _importe(rng, 4 if i % 10 == 0 else 2)
+        filas.append(
+            FacturaEmitida(
+                numero=f"T-{i}",
+                fecha_emision=_fecha(rng),
+                cliente_nombre=f"Cliente {i % 7}",
+                base_eur=base,
+                cuota_iva=base * Decimal("0.21"),
+                ret_irpf_pct=Decimal("15"),
+                ret_irpf_importe=(base * Decimal("0.15")).quantize(Decimal("0.01")),
+                actividad=rng.choice(list(Actividad)),
+            )
+        )
+    for i in range(300):
+        base = _importe(rng, 3 if i % 10 == 0 else 2)
+        filas.append(
+            GastoDeducible(
+                proveedor=f"Proveedor {i % 5}",
+                fecha=_fecha(rng),
+                base_eur=base,
+                cuota_iva=(base * Decimal("0.21")).quantize(Decimal("0.01")),
+                afecto_pct=Decimal(rng.choice(AFECTOS)),
+                iva_deducible=i % 4 != 0,
+            )
+        )
+    for mes in range(1, 13):
+        filas.append(PagoAutonomo(fecha=date(YEAR, mes, 28), importe_eur=Decimal("293.945") if mes % 5 else Decimal("294")))
+    with get_session() as s:
+        s.add_all(filas)
+        s.commit()
+    return agregados.mensuales()
+
+
+@pytest.mark.parametrize("q", [1, 2, 3, 4])
+def test_303_igual_que_iva_trimestre(datos, q):
+    t = agregados.periodo(datos, YEAR, 3 * q - 2, 3 * q)
+    assert agregados.resultado_303(t) == iva_trimestre(YEAR, q)["resultado"]
+
+
+@pytest.mark.parametrize("q", [1, 2, 3, 4])
+def test_130_igual_que_irpf_snapshot_acumulado(datos, q):
+    acumulado = agregados.periodo(datos, YEAR, 1, 3 * q)
+    assert agregados.m130(YEAR, q, acumulado, Decimal("0.00")) == irpf_snapshot_acumulado(YEAR, q)
@@ -0,0 +1,86 @@
+"""Arranque del CLI: ninguna dependencia pesada se carga solo por importar
+`conta.app.cli` o pedir `conta --help` (cada comando importa lo que usa) y
+el import cabe en el presupuesto.
+
+Cada comprobación corre en un intérprete nuevo. CONTA_STARTUP_BUDGET_MS
+cambia el presupuesto (por defecto 250 ms, mejor de 5 imports en frío).
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+MODULE = "conta.app.cli"
+
+# Módulos que no deben aparecer al arrancar el CLI
+HEAVY = (
+    "fastapi",
+    "numpy",
+    "pandas",
+    "pdfplumber",
+    "sqlalchemy",
+    "sqlmodel",
+    "textual",
+    "uvicorn",
+    "weasyprint",
+)
+
+BUDGET_MS = float(os.getenv("CONTA_STARTUP_BUDGET_MS", "250"))
+RUNS = 5
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env)
+    assert proc.returncode == 0, proc.stderr
+    return proc
+
+
+def _cargados(codigo: str) -> list[str]:
+    """Paquetes de HEAVY en sys.modules tras ejecutar `codigo`."""
+    proc = _python(
+        "-c",
+        f"import contextlib, io, json, sys\n{codigo}\n"
+        f"print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}} & set({HEAVY!r}))))",
+    )
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def test_importar_cli_no_carga_dependencias_pesadas():
+    assert _cargados(f"import {MODULE}") == []
+
+
+@pytest.mark.parametrize("argv", [["--help"], ["iva", "--help"], ["verify", "--help"]])
+def test_help_no_carga_dependencias_pesadas(argv):
+    codigo = (
+        f"from {MODULE} import app\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        f"    app({argv!r}, standalone_mode=False)"
+    )
+    assert _cargados(codigo) == []
+
+
+def _import_ms() -> tuple[float, list[tuple[int, str]]]:
+    """Tiempo acumulado del import en frío y los imports más lentos."""
+    proc = _python("-X", "importtime", "-c", f"import {MODULE}")
+    tiempos: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, acumulado, nombre = line.split("|")
+        try:
+            tiempos[nombre.strip()] = int(acumulado)
+        except ValueError:
+            continue  # cabecera
+    lentos = sorted(((t, n) for n, t in tiempos.items() if n != MODULE), reverse=True)[:10]
+    return tiempos[MODULE] / 1000, lentos
+
+
+def test_import_cli_dentro_del_presupuesto():
+    ms, lentos = min((_import_ms() for _ in range(RUNS)), key=lambda r: r[0])
+    detalle = "\n".join(f"{t / 1000:8.1f} ms  {n}" for t, n in lentos)
+    assert ms <= BUDGET_MS, f"{MODULE}: {ms:.1f} ms > {BUDGET_MS:.0f} ms\n{detalle}"
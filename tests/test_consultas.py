@@ -0,0 +1,63 @@
+"""`--where cliente=` de set-estado/set-estado-iva: selección exacta de un
+cliente (id, NIF o nombre completo), nunca la búsqueda por prefijo."""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlmodel import select
+
+from conta.app.db import get_session, init_db
+from conta.app.enums import Actividad
+from conta.app.models import Cliente, FacturaEmitida
+from conta.app.services.consultas import actualizar_facturas, cliente_exacto
+
+YEAR = 2016
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _facturas():
+    init_db()
+    clientes = [("Álvarez Estudio", "B-1234 5678"), ("Alvarado", None), ("ÁLVAREZ ESTUDIO ", None)]
+    with get_session() as s:
+        s.add_all(
+            FacturaEmitida(
+                numero=f"W-{i}",
+                fecha_emision=date(YEAR, 1 + i, 1),
+                cliente_nombre=nombre,
+                cliente_nif=nif,
+                base_eur=Decimal("100.00"),
+                actividad=Actividad.musica,
+            )
+            for i, (nombre, nif) in enumerate(clientes)
+        )
+        s.commit()
+
+
+def _coinciden(valor: str) -> int:
+    return actualizar_facturas({"estado": "X"}, cliente_exacto(valor), dry_run=True, year=YEAR)
+
+
+def test_prefijo_no_selecciona():
+    assert _coinciden("alv") == 0
+
+
+def test_nombre_completo_sin_mayusculas():
+    # Las dos facturas con ese nombre, aunque la primera sea de un cliente con NIF
+    assert _coinciden("álvarez estudio") == 2
+    assert _coinciden("Alvarado") == 1
+
+
+def test_nif_normalizado():
+    assert _coinciden("b12345678") == 1
+
+
+def test_id_de_cliente():
+    with get_session() as s:
+        id_ = s.exec(select(Cliente.id).where(Cliente.nombre == "Alvarado")).one()
+    assert _coinciden(str(id_)) == 1
+
+
+def test_dry_run_no_actualiza():
+    with get_session() as s:
+        assert not s.exec(select(FacturaEmitida).where(FacturaEmitida.estado == "X")).all()
@@ -0,0 +1,76 @@
+"""Prueba diferencial del cálculo vectorial de importes frente a Decimal.
+
+Compara services.importes.porcentajes_centimos (NumPy) con
+services.importes.porcentaje (Decimal, ROUND_HALF_UP) sobre millones de
+pares (importe, porcentaje) aleatorios en céntimos. CONTA_TEST_FILAS cambia
+el número de filas (por defecto 2 millones).
+"""
+
+import os
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from conta.app.services.importes import porcentaje, porcentajes, porcentajes_centimos
+
+FILAS = int(os.getenv("CONTA_TEST_FILAS", "2000000"))
+
+# Tipos de IVA y retenciones habituales; el resto de porcentajes es aleatorio
+PCTS_HABITUALES = [0, 400, 1000, 2100, 700, 1500, 1900, 10000]
+
+
+def _generar(filas: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    importes = rng.integers(-10**9, 10**9, size=filas, dtype=np.int64)
+    # Un tercio de importes pequeños, donde los empates (x.xx5) son frecuentes
+    pequeños = rng.random(filas) < 1 / 3
+    importes[pequeños] = rng.integers(-10_000, 10_000, size=int(pequeños.sum()))
+    pcts = rng.integers(0, 10_001, size=filas, dtype=np.int64)
+    habituales = rng.random(filas) < 0.5
+    pcts[habituales] = rng.choice(PCTS_HABITUALES, size=int(habituales.sum()))
+    return importes, pcts
+
+
+def _esperado(importe: int, pct: int) -> int:
+    # Céntimos según el camino Decimal
+    return int(porcentaje(Decimal(importe).scaleb(-2), Decimal(pct).scaleb(-2)).scaleb(2))
+
+
+def _distintas(importes, pcts) -> list[tuple[int, int, int, int]]:
+    vectorial = porcentajes_centimos(importes, pcts).tolist()
+    return [
+        (i, p, v, e)
+        for i, p, v in zip(np.asarray(importes).tolist(), np.asarray(pcts).tolist(), vectorial)
+        if v != (e := _esperado(i, p))
+    ]
+
+
+def test_vectorial_igual_que_decimal():
+    importes, pcts = _generar(FILAS, seed=0)
+    assert _distintas(importes, pcts)[:10] == []
+
+
+def test_empates_se_redondean_al_alza_en_valor_absoluto():
+    # 50 % de un número impar de céntimos: siempre x.xx5
+    importes = np.array([1, -1, 5, -5, 15, -15, 999_999], dtype=np.int64)
+    pcts = np.full(len(importes), 5000, dtype=np.int64)
+    assert porcentajes_centimos(importes, pcts).tolist() == [1, -1, 3, -3, 8, -8, 500_000]
+    assert _distintas(importes, pcts) == []
+
+
+def test_productos_que_desbordan_int64():
+    importes = np.array([10**16, -(10**16) + 7, 3 * 10**15 + 1, 2**62, 123], dtype=np.int64)
+    pcts = np.array([2100, 1500, 10000, 7, 2100], dtype=np.int64)
+    assert _distintas(importes, pcts) == []
+
+
+def test_resultado_fuera_de_int64():
+    with pytest.raises(OverflowError):
+        porcentajes_centimos(np.array([2**62], dtype=np.int64), np.array([20000], dtype=np.int64))
+
+
+def test_porcentajes_usa_decimal_si_no_cabe_en_centimos():
+    importes = [Decimal("100.005"), Decimal("123456789012345678.91"), Decimal("10.00"), Decimal("-0.05")]
+    pcts = [Decimal("21"), Decimal("21"), Decimal("15.5"), Decimal("50")]
+    assert porcentajes(importes, pcts) == [porcentaje(i, p) for i, p in zip(importes, pcts)]
@@ -0,0 +1,63 @@
+"""Importes de `conta ingest`: un único formato de número por fichero.
+
+El separador decimal sale del delimitador del CSV (',' si se separa con ';')
+o se indica con --decimal; los importes que no encajan son errores de fila,
+no se interpretan con otro formato.
+"""
+
+from decimal import Decimal
+
+import pytest
+from sqlmodel import select
+
+from conta.app.db import get_session, init_db
+from conta.app.models import PagoAutonomo
+from conta.app.services.ingesta import ingestar, leer_filas, separador_decimal
+
+IMPORTES = ["1.500", "1.234,50", "1,234.50"]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _db():
+    init_db()
+
+
+def _ingestar(tmp_path, year: int, sep: str, decimal: str | None = None):
+    """Ingesta una cuota por importe de IMPORTES (mes 1, 2, ...) desde un CSV
+    separado por `sep`. Devuelve los importes guardados por mes (None si la
+    fila no se guardó) y las filas con error."""
+    path = tmp_path / "cuotas.csv"
+    filas = [f'{year}-0{n}-01{sep}"{v}"' for n, v in enumerate(IMPORTES, start=1)]
+    path.write_text("\n".join([f"fecha{sep}importe_eur", *filas]) + "\n", encoding="utf-8")
+    res = ingestar("cuota", leer_filas(path), decimal=decimal or separador_decimal(path))
+    with get_session() as s:
+        guardadas = {
+            c.fecha.month: c.importe_eur
+            for c in s.exec(select(PagoAutonomo).where(PagoAutonomo.fecha.between(f"{year}-01-01", f"{year}-12-31")))
+        }
+    return [guardadas.get(n) for n in range(1, len(IMPORTES) + 1)], [fila for fila, _ in res.errores]
+
+
+def test_csv_con_punto_y_coma_usa_coma_decimal(tmp_path):
+    importes, errores = _ingestar(tmp_path, 2017, ";")
+    assert importes == [Decimal("1500.00"), Decimal("1234.50"), None]
+    assert errores == [3]
+
+
+def test_csv_con_comas_usa_punto_decimal(tmp_path):
+    importes, errores = _ingestar(tmp_path, 2018, ",")
+    assert importes == [Decimal("1.50"), None, Decimal("1234.50")]
+    assert errores == [2]
+
+
+def test_separador_indicado(tmp_path):
+    importes, errores = _ingestar(tmp_path, 2019, ",", decimal=",")
+    assert importes == [Decimal("1500.00"), Decimal("1234.50"), None]
+    assert errores == [3]
+
+
+def test_error_indica_campo_y_formato(tmp_path):
+    path = tmp_path / "error.csv"
+    path.write_text('fecha;importe_eur\n2019-01-01;"1,234.50"\n', encoding="utf-8")
+    res = ingestar("cuota", leer_filas(path), dry_run=True, decimal=separador_decimal(path))
+    assert res.errores == [(1, "importe_eur: importe '1,234.50' con formato distinto de 1.234,50")]